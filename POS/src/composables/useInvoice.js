@@ -2,6 +2,7 @@ import { createResource } from "frappe-ui"
 import { computed, ref, toRaw } from "vue"
 import { isOffline } from "@/utils/offline"
 import { useSerialNumberStore } from "@/stores/serialNumber"
+import { useStockStore } from "@/stores/stock"
 import { CoalescingMutex } from "@/utils/mutex"
 import { logger } from "@/utils/logger"
 import { roundCurrency } from "@/utils/currency"
@@ -18,6 +19,8 @@ const submitMutex = new CoalescingMutex({
 export function useInvoice() {
 	// Serial Number Store for returning serials when items are removed
 	const serialStore = useSerialNumberStore()
+	// Stock Store owns the cart id under which the cart's stock is soft-reserved
+	const stockStore = useStockStore()
 
 	// State
 	const invoiceItems = ref([])
@@ -73,10 +76,11 @@ export function useInvoice() {
 
 	const validateCartItemsResource = createResource({
 		url: "pos_next.api.invoices.validate_cart_items",
-		makeParams({ items, pos_profile }) {
+		makeParams({ items, pos_profile, cart_id }) {
 			return {
 				items: JSON.stringify(items),
 				pos_profile: pos_profile,
+				cart_id: cart_id,
 			}
 		},
 		auto: false,
@@ -796,6 +800,7 @@ export function useInvoice() {
 			const result = await validateCartItemsResource.submit({
 				items: items,
 				pos_profile: posProfile.value,
+				cart_id: stockStore.cartId,
 			})
 			return result || []
 		} catch (error) {
@@ -958,6 +963,8 @@ export function useInvoice() {
 					// Transaction-level promo discount amount (member/promo rules only)
 					// Used to split GL between promo account and manual potongan penjualan
 					promo_discount_amount: promoDiscountAmount || 0,
+					// Soft stock reservation of this cart, released by the server on submit
+					cart_id: stockStore.cartId,
 				}
 
 	
@@ -984,6 +991,7 @@ export function useInvoice() {
 						throw detailedError
 					}
 
+					stockStore.rotateCart()
 					resetInvoice()
 					return result
 				} catch (error) {
@@ -3,12 +3,20 @@
  *
  * Listens to Socket.IO events for stock changes and notifies registered handlers.
  * Provides intelligent event management with deduplication and batching.
- * Each handler is responsible for filtering by warehouse and updating its cache.
+ * The server publishes stock updates to per-warehouse rooms, so a terminal must
+ * join the room of its warehouse with subscribeWarehouse() to receive them.
+ * Each handler is still responsible for filtering by warehouse and updating its cache.
+ *
+ * Gap recovery: every event carries the epoch and seq of its warehouse's stock
+ * feed. When a seq is skipped or the socket reconnects, the missed changes are
+ * replayed from get_stock_changes_since; when they are past the server's
+ * retention, resync handlers are asked to reload stock instead.
  *
  * Performance optimization: Batch delay and size are dynamically adjusted
  * based on device CPU cores and performance tier.
  */
 
+import { call } from "@/utils/apiWrapper"
 import { performanceConfig } from "@/utils/performanceConfig"
 import { logger } from "@/utils/logger"
 import { ref } from "vue"
@@ -19,7 +27,11 @@ const log = logger.create("RealtimeStock")
 const isListening = ref(false)
 const eventHandlers = new Set()
 const pendingUpdates = new Map()
+const resyncHandlers = new Set()
+const subscribedWarehouse = ref(null)
 let batchTimeout = null
+let feedPosition = null // { epoch, seq } of the last applied event of subscribedWarehouse
+let catchUpPromise = null
 
 /**
  * Batch update configuration - dynamically adjusted based on device performance
@@ -84,8 +96,33 @@ function handleStockUpdate(data) {
 		return
 	}
 
-	// Add updates to pending batch (deduplicate by item_code + warehouse)
-	data.stock_updates.forEach((update) => {
+	const warehouse = data.warehouses?.[0]
+	if (data.seq != null && feedPosition && warehouse === subscribedWarehouse.value) {
+		const sameEpoch = data.epoch === feedPosition.epoch
+
+		// Already applied through a catch-up replay
+		if (sameEpoch && data.seq <= feedPosition.seq) {
+			return
+		}
+
+		// Events were missed: apply this one and replay the gap
+		if (!sameEpoch || data.seq > feedPosition.seq + 1) {
+			queueUpdates(data.stock_updates)
+			catchUp()
+			return
+		}
+
+		feedPosition.seq = data.seq
+	}
+
+	queueUpdates(data.stock_updates)
+}
+
+/**
+ * Add updates to pending batch (deduplicate by item_code + warehouse)
+ */
+function queueUpdates(stockUpdates) {
+	stockUpdates.forEach((update) => {
 		const key = `${update.item_code}|${update.warehouse}`
 		pendingUpdates.set(key, update)
 	})
@@ -93,6 +130,70 @@ function handleStockUpdate(data) {
 	scheduleBatchUpdate()
 }
 
+/**
+ * Replay the stock changes of the subscribed warehouse since the last applied event.
+ * Without a known position this only records where the feed currently is.
+ */
+function catchUp() {
+	if (catchUpPromise) {
+		return catchUpPromise
+	}
+
+	const warehouse = subscribedWarehouse.value
+	if (!warehouse) {
+		return Promise.resolve()
+	}
+
+	catchUpPromise = (async () => {
+		try {
+			const response = await call("pos_next.api.items.get_stock_changes_since", {
+				warehouse,
+				seq: feedPosition?.seq ?? null,
+				epoch: feedPosition?.epoch ?? null,
+			})
+			const result = response?.message || response
+			if (!result || warehouse !== subscribedWarehouse.value) {
+				return
+			}
+
+			if (result.full_sync) {
+				log.warn(`Stock changes for ${warehouse} are past retention, reloading stock`)
+				resyncHandlers.forEach((handler) => {
+					try {
+						handler(warehouse)
+					} catch (error) {
+						log.error("Resync handler error", error)
+					}
+				})
+			} else if (result.stock_updates?.length) {
+				queueUpdates(result.stock_updates)
+			}
+
+			feedPosition = { epoch: result.epoch, seq: result.seq }
+		} catch (error) {
+			log.error("Failed to replay missed stock changes", error)
+		} finally {
+			catchUpPromise = null
+		}
+	})()
+
+	return catchUpPromise
+}
+
+/**
+ * Socket reconnected: rooms are lost with the old connection, so join again
+ * and replay whatever was published meanwhile
+ */
+function handleReconnect() {
+	const warehouse = subscribedWarehouse.value
+	if (!warehouse) {
+		return
+	}
+
+	window.frappe?.realtime?.doc_subscribe?.("Warehouse", warehouse)
+	catchUp()
+}
+
 /**
  * Handle invoice created event (optional, for future use)
  */
@@ -100,6 +201,34 @@ function handleInvoiceCreated(data) {
 	// Can be used to update sales dashboards, notifications, etc.
 }
 
+/**
+ * Join the realtime room of a warehouse, leaving the previous one
+ * @param {string|null} warehouse - Warehouse whose stock updates to receive
+ */
+function subscribeWarehouse(warehouse) {
+	if (subscribedWarehouse.value === warehouse) {
+		return
+	}
+
+	const realtime = window.frappe?.realtime
+	if (!realtime?.doc_subscribe) {
+		log.warn("Socket.IO not available, cannot join warehouse room")
+		return
+	}
+
+	if (subscribedWarehouse.value) {
+		realtime.doc_unsubscribe("Warehouse", subscribedWarehouse.value)
+	}
+	if (warehouse) {
+		realtime.doc_subscribe("Warehouse", warehouse)
+	}
+	subscribedWarehouse.value = warehouse || null
+	feedPosition = null
+
+	// Start following the new warehouse's feed from its current position
+	catchUp()
+}
+
 /**
  * Start listening to real-time events
  */
@@ -116,6 +245,7 @@ function startListening() {
 	// Subscribe to stock update events
 	window.frappe.realtime.on("pos_stock_update", handleStockUpdate)
 	window.frappe.realtime.on("pos_invoice_created", handleInvoiceCreated)
+	window.frappe.realtime.socket?.on("connect", handleReconnect)
 
 	isListening.value = true
 }
@@ -131,8 +261,11 @@ function stopListening() {
 	if (window.frappe?.realtime) {
 		window.frappe.realtime.off("pos_stock_update", handleStockUpdate)
 		window.frappe.realtime.off("pos_invoice_created", handleInvoiceCreated)
+		window.frappe.realtime.socket?.off("connect", handleReconnect)
 	}
 
+	subscribeWarehouse(null)
+
 	// Clear pending updates
 	if (batchTimeout) {
 		clearTimeout(batchTimeout)
@@ -186,12 +319,29 @@ export function useRealtimeStock() {
 		}
 	}
 
+	/**
+	 * Register a callback for when missed stock changes can't be replayed
+	 * @param {Function} handler - Called with the warehouse whose stock must be reloaded
+	 * @returns {Function} Cleanup function to unregister handler
+	 */
+	function onStockResync(handler) {
+		if (typeof handler !== "function") {
+			throw new Error("Handler must be a function")
+		}
+
+		resyncHandlers.add(handler)
+		return () => resyncHandlers.delete(handler)
+	}
+
 	// Note: Each handler is responsible for its own cleanup via the returned cleanup function.
 	// The singleton listener remains active as long as there are registered handlers.
 
 	return {
 		isListening,
+		subscribedWarehouse,
+		subscribeWarehouse,
 		onStockUpdate,
+		onStockResync,
 		flushUpdates,
 		startListening,
 		stopListening,
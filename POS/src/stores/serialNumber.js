@@ -20,7 +20,7 @@ export const useSerialNumberStore = defineStore("serialNumber", () => {
 	// STATE
 	// ========================================================================
 
-	// Cache: item_code -> { serials: [], warehouse, timestamp }
+	// Cache: item_code -> { serials: [], nextCursor, warehouse, timestamp }
 	const cache = ref(new Map())
 	const loading = ref(false)
 	const currentWarehouse = ref(null)
@@ -28,6 +28,9 @@ export const useSerialNumberStore = defineStore("serialNumber", () => {
 	// Cache TTL: 5 minutes (serials don't change often)
 	const CACHE_TTL = 5 * 60 * 1000
 
+	// Serials loaded per request; further pages are fetched on demand
+	const PAGE_SIZE = 500
+
 	// ========================================================================
 	// GETTERS
 	// ========================================================================
@@ -38,6 +41,10 @@ export const useSerialNumberStore = defineStore("serialNumber", () => {
 		return cached.serials
 	}
 
+	const hasMoreSerials = (itemCode) => {
+		return Boolean(cache.value.get(itemCode)?.nextCursor)
+	}
+
 	const isCacheValid = (itemCode) => {
 		const cached = cache.value.get(itemCode)
 		if (!cached) return false
@@ -86,22 +93,18 @@ export const useSerialNumberStore = defineStore("serialNumber", () => {
 		loading.value = true
 
 		try {
-			const response = await call("frappe.client.get_list", {
-				doctype: "Serial No",
-				filters: {
-					item_code: itemCode,
-					warehouse: currentWarehouse.value,
-					status: "Active",
-				},
-				fields: ["name as serial_no", "warehouse"],
-				limit_page_length: 500,
+			const page = await call("pos_next.api.items.get_serial_numbers", {
+				item_code: itemCode,
+				warehouse: currentWarehouse.value,
+				page_size: PAGE_SIZE,
 			})
 
-			const serials = response || []
+			const serials = page?.serials || []
 
 			// Update cache
 			cache.value.set(itemCode, {
 				serials,
+				nextCursor: page?.next_cursor || null,
 				warehouse: currentWarehouse.value,
 				timestamp: Date.now(),
 			})
@@ -116,6 +119,41 @@ export const useSerialNumberStore = defineStore("serialNumber", () => {
 		}
 	}
 
+	/**
+	 * Append the next page of serial numbers to the cached list
+	 */
+	const fetchMoreSerials = async (itemCode) => {
+		const cached = cache.value.get(itemCode)
+		if (!cached?.nextCursor) return getSerials(itemCode)
+
+		loading.value = true
+
+		try {
+			const page = await call("pos_next.api.items.get_serial_numbers", {
+				item_code: itemCode,
+				warehouse: cached.warehouse,
+				cursor: cached.nextCursor,
+				page_size: PAGE_SIZE,
+			})
+
+			const existingSerialNos = new Set(cached.serials.map((s) => s.serial_no))
+			for (const serial of page?.serials || []) {
+				if (!existingSerialNos.has(serial.serial_no)) {
+					cached.serials.push(serial)
+				}
+			}
+			cached.nextCursor = page?.next_cursor || null
+
+			log.success(`Loaded ${cached.serials.length} serials for ${itemCode}`)
+			return cached.serials
+		} catch (error) {
+			log.error(`Failed to fetch more serials for ${itemCode}`, error)
+			return cached.serials
+		} finally {
+			loading.value = false
+		}
+	}
+
 	/**
 	 * Remove consumed serials from cache (when added to cart)
 	 */
@@ -212,11 +250,13 @@ export const useSerialNumberStore = defineStore("serialNumber", () => {
 
 		// Getters
 		getSerials,
+		hasMoreSerials,
 		isCacheValid,
 
 		// Actions
 		setWarehouse,
 		fetchSerials,
+		fetchMoreSerials,
 		consumeSerials,
 		returnSerials,
 		clearCache,
@@ -1,7 +1,13 @@
 /**
  * Stock Management Store - Smart & Minimal
  *
- * Core Formula: Display Stock = Server Stock - Reserved Stock
+ * Core Formula: Display Stock = Server Stock - Reserved Stock - Held by Other Carts
+ *
+ * Reserved stock is this terminal's own cart. The cart is also reported to the
+ * server (debounced) as a soft reservation under cartId, and stock rows from the
+ * server carry cart_reserved_qty - what all carts in the warehouse hold - so
+ * carts being rung up on other terminals are deducted too. What this terminal
+ * last reported is subtracted from that total, since it is already in reserved.
  *
  * This store is a LOCAL CACHE, not the source of truth.
  * The server database is the source. This cache stays synchronized via:
@@ -22,32 +28,51 @@
 import { defineStore } from "pinia"
 import { ref, onMounted } from "vue"
 import { call } from "@/utils/apiWrapper"
+import { isOffline } from "@/utils/offline"
+import { generateUUID } from "@/utils/offline/uuid"
 import { offlineWorker } from "@/utils/offline/workerClient"
 import { logger } from "@/utils/logger"
 import { usePOSEventsStore } from "@/stores/posEvents"
+import { usePOSShiftStore } from "@/stores/posShift"
 
 const log = logger.create("Stock")
 
+// Delay before reporting cart changes to the server as a soft reservation
+const HOLD_SYNC_DELAY_MS = 1000
+
 export const useStockStore = defineStore("stock", () => {
 	// Get event store instance
 	const eventsStore = usePOSEventsStore()
+	const shiftStore = usePOSShiftStore()
 	// ========================================================================
 	// STATE - Just 2 Maps, that's it!
 	// ========================================================================
-	const server = ref(new Map()) // item_code -> { qty, warehouse, ts }
+	const server = ref(new Map()) // item_code -> { qty, held, warehouse, ts }
 	const reserved = ref(new Map()) // item_code -> qty
 	const warehouse = ref(null) // Current warehouse
 	const refreshing = ref(false) // Loading state
+	const cartId = ref(generateUUID()) // Identifies this terminal's cart in the server's reservations
+	const reported = ref(new Map()) // item_code -> qty held on the server for this cart
+	let holdSyncTimer = null
+	let hasServerHolds = false
 
 	// ========================================================================
 	// GETTERS - Functions that return reactive computed values
 	// ========================================================================
+	// Stock held by carts on other terminals (our own cart is in reserved)
+	const getHeldByOthers = (itemCode) => {
+		const held = Number(server.value.get(itemCode)?.held) || 0
+		if (!held) return 0
+		return Math.max(0, held - (reported.value.get(itemCode) || 0))
+	}
+
 	const getDisplayStock = (itemCode) => {
 		// Always return the actual calculated stock (can be negative)
 		// Display is independent of whether negative stock sales are allowed
 		return (
 			(server.value.get(itemCode)?.qty || 0) -
-			(reserved.value.get(itemCode) || 0)
+			(reserved.value.get(itemCode) || 0) -
+			getHeldByOthers(itemCode)
 		)
 	}
 
@@ -55,6 +80,7 @@ export const useStockStore = defineStore("stock", () => {
 		code: itemCode,
 		server: server.value.get(itemCode)?.qty || 0,
 		reserved: reserved.value.get(itemCode) || 0,
+		heldByOthers: getHeldByOthers(itemCode),
 		display: getDisplayStock(itemCode),
 		warehouse: server.value.get(itemCode)?.warehouse || warehouse.value,
 	})
@@ -68,14 +94,69 @@ export const useStockStore = defineStore("stock", () => {
 		items?.forEach((item) =>
 			server.value.set(item.item_code, {
 				qty: item.actual_qty ?? item.stock_qty ?? 0,
+				held: item.cart_reserved_qty || 0,
 				warehouse: item.warehouse || warehouse.value,
 				ts: Date.now(),
 			}),
 		)
 
+	// Report the cart to the server as a soft reservation (debounced)
+	// An empty cart releases the reservation; a failed report just expires server-side
+	const scheduleHoldSync = (cartItems) => {
+		if (holdSyncTimer) {
+			clearTimeout(holdSyncTimer)
+		}
+
+		const items = (cartItems || [])
+			.filter((item) => item?.item_code && Number(item.quantity) > 0)
+			.map((item) => ({
+				item_code: item.item_code,
+				warehouse: item.warehouse || warehouse.value,
+				qty: Number(item.quantity),
+				conversion_factor: Number(item.conversion_factor) || 1,
+				stock_qty: Number(item.quantity) * (Number(item.conversion_factor) || 1),
+				is_stock_item: Boolean(item.is_stock_item ?? 1),
+			}))
+		if (!items.length && !hasServerHolds) return
+
+		holdSyncTimer = setTimeout(async () => {
+			holdSyncTimer = null
+			if (isOffline()) return
+
+			try {
+				await call("pos_next.api.invoices.validate_cart_items", {
+					items: JSON.stringify(items),
+					pos_profile: shiftStore.profileName,
+					cart_id: cartId.value,
+				})
+				hasServerHolds = items.length > 0
+				reported.value = items
+					.filter((item) => item.is_stock_item && item.warehouse === warehouse.value)
+					.reduce(
+						(held, item) => held.set(item.item_code, (held.get(item.item_code) || 0) + item.stock_qty),
+						new Map(),
+					)
+			} catch (error) {
+				log.warn("Failed to report cart reservation", error)
+			}
+		}, HOLD_SYNC_DELAY_MS)
+	}
+
+	// Start a new cart after submission (the server released the old one)
+	const rotateCart = () => {
+		if (holdSyncTimer) {
+			clearTimeout(holdSyncTimer)
+			holdSyncTimer = null
+		}
+		hasServerHolds = false
+		reported.value = new Map()
+		cartId.value = generateUUID()
+	}
+
 	// Update reservations from cart
 	const reserve = (cartItems) => {
 		reserved.value.clear()
+		scheduleHoldSync(cartItems)
 
 		// Early return for empty or invalid cart
 		if (!cartItems || !Array.isArray(cartItems) || cartItems.length === 0) {
@@ -106,6 +187,7 @@ export const useStockStore = defineStore("stock", () => {
 		stockUpdates?.forEach((stockUpdate) =>
 			server.value.set(stockUpdate.item_code, {
 				qty: stockUpdate.actual_qty ?? stockUpdate.stock_qty,
+				held: stockUpdate.cart_reserved_qty || 0,
 				warehouse: stockUpdate.warehouse || warehouse.value,
 				ts: Date.now(),
 			}),
@@ -179,6 +261,7 @@ export const useStockStore = defineStore("stock", () => {
 		reserved,
 		warehouse,
 		refreshing,
+		cartId,
 
 		// Getters
 		getDisplayStock,
@@ -187,6 +270,7 @@ export const useStockStore = defineStore("stock", () => {
 		// Actions
 		init,
 		reserve,
+		rotateCart,
 		update,
 		refresh,
 		setWarehouse: (targetWarehouse) => (warehouse.value = targetWarehouse),
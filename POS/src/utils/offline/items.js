@@ -164,6 +164,7 @@ export const updateItemBatchSerialData = async (batchSerialDataMap) => {
 					await db.items.update(itemCode, {
 						batch_no_data: data.batch_no_data || [],
 						serial_no_data: data.serial_no_data || [],
+						serial_no_count: data.serial_no_count || 0,
 					})
 				}
 			},
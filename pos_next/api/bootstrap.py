@@ -30,16 +30,21 @@ from frappe.query_builder import DocType
 from frappe.query_builder.functions import Coalesce
 
 from pos_next.api.constants import POS_SETTINGS_FIELDS, DEFAULT_POS_SETTINGS
+from pos_next.services.content_version import versioned_response
 
 
 @frappe.whitelist()
-def get_initial_data():
+def get_initial_data(since_version=None):
 	"""
 	Fetch all initial data needed for POS application startup.
 
 	This is the main bootstrap endpoint called when the POS app loads.
 	It combines multiple data sources into a single response.
 
+	Pass `since_version` (the version from a previous reply) to get a
+	versioned_response() wrapper; the version covers the profile's settings
+	plus the user's open shift and language.
+
 	Returns:
 		dict: {
 			success: bool,
@@ -57,6 +62,18 @@ def get_initial_data():
 	if frappe.session.user == "Guest":
 		frappe.throw(_("Authentication required"), frappe.AuthenticationError)
 
+	if since_version is not None:
+		shift = _get_open_shift()
+		return versioned_response(
+			"settings",
+			shift["pos_profile"] if shift else None,
+			since_version,
+			get_initial_data,
+			frappe.session.user,
+			shift["name"] if shift else "",
+			_get_user_language(),
+		)
+
 	result = {
 		"success": True,
 		"locale": _get_user_language(),
@@ -7,8 +7,18 @@ import json
 import frappe
 from frappe import _
 from frappe.utils import flt, cint, nowdate, nowtime, get_datetime, cstr, getdate
-from erpnext.stock.doctype.batch.batch import get_batch_qty, get_batch_no
+from erpnext.stock.doctype.batch.batch import get_batch_no
 from erpnext.accounts.doctype.sales_invoice.sales_invoice import get_bank_cash_account
+from pos_next.services.batch_index import get_available_batches, get_batch_quantities
+from pos_next.services.cart_reservations import get_held_qty, hold_cart, release_cart
+from pos_next.services.currency_cache import (
+    get_company_currency,
+    get_exchange_rate,
+    get_price_list_currency,
+)
+from pos_next.services.stock_broadcaster import queue_stock_changes
+from pos_next.services.submit_context import get_submit_context
+from pos_next.services.tree_cache import get_ancestors
 
 try:
     from erpnext.accounts.doctype.pricing_rule.pricing_rule import (
@@ -31,13 +41,7 @@ def _get_return_validity_days(pos_profile):
     """Get return_validity_days from POS Settings for a given POS Profile."""
     if not pos_profile:
         return 0
-    return cint(
-        frappe.db.get_value(
-            "POS Settings",
-            {"pos_profile": pos_profile},
-            "return_validity_days",
-        ) or 0
-    )
+    return get_submit_context(pos_profile).return_validity_days
 
 
 def standardize_pricing_rules(items):
@@ -162,39 +166,97 @@ def get_payment_account(mode_of_payment, company):
 # ==========================================
 
 
-def _get_available_stock(item):
-    """Return available stock qty for an item row."""
-    warehouse = item.get("warehouse")
-    batch_no = item.get("batch_no")
-    item_code = item.get("item_code")
+def _get_available_stock_map(items):
+    """Return available stock for item rows, keyed like ``_stock_key``.
 
-    if not item_code or not warehouse:
-        return 0
+    All Bin quantities come from one grouped query and all batch quantities
+    from another, however many rows the invoice has.
+    """
+    bin_pairs = set()
+    batch_pairs = set()
+    for d in items:
+        key = _stock_key(d)
+        if not key:
+            continue
+        if key[0] == "batch":
+            batch_pairs.add(key[1:])
+        else:
+            bin_pairs.add(key[1:])
+
+    available = {}
+    if bin_pairs:
+        item_codes = sorted({item_code for item_code, _warehouse in bin_pairs})
+        warehouses = sorted({warehouse for _item_code, warehouse in bin_pairs})
+        bins = frappe.get_all(
+            "Bin",
+            filters={"item_code": ["in", item_codes], "warehouse": ["in", warehouses]},
+            fields=["item_code", "warehouse", "actual_qty"],
+        )
+        bin_qty = {(b.item_code, b.warehouse): flt(b.actual_qty) for b in bins}
+        for pair in bin_pairs:
+            available[("item", *pair)] = bin_qty.get(pair, 0)
 
-    if batch_no:
-        return get_batch_qty(batch_no, warehouse) or 0
+    for pair, qty in get_batch_quantities(batch_pairs).items():
+        available[("batch", *pair)] = qty
 
-    # Get stock from Bin
-    bin_qty = frappe.db.get_value(
-        "Bin", {"item_code": item_code, "warehouse": warehouse}, "actual_qty"
-    )
-    return flt(bin_qty) or 0
+    return available
 
 
-def _collect_stock_errors(items):
-    """Return list of items exceeding available stock."""
-    errors = []
+def _stock_key(item):
+    """Key of the stock an item row draws from: its batch if set, else its Bin."""
+    item_code = item.get("item_code")
+    warehouse = item.get("warehouse")
+    if not item_code or not warehouse:
+        return None
+    if item.get("batch_no"):
+        return ("batch", item.get("batch_no"), warehouse)
+    return ("item", item_code, warehouse)
+
+
+def _collect_stock_errors(items, cart_id=None):
+    """Return list of items exceeding available stock.
+
+    Rows drawing from the same Bin or batch are checked together against it.
+    With ``cart_id``, stock held by other carts (see cart_reservations) is
+    not available to this cart.
+    """
+    requested_by_key = {}
+    rows_by_key = {}
     for d in items:
         if flt(d.get("qty")) < 0:
             continue
 
-        available = _get_available_stock(d)
+        key = _stock_key(d)
+        if not key:
+            # Rows without item or warehouse have nothing available
+            key = ("missing", d.get("item_code"), d.get("warehouse"))
         requested = flt(
             d.get("stock_qty")
             or (flt(d.get("qty")) * flt(d.get("conversion_factor") or 1))
         )
+        requested_by_key[key] = requested_by_key.get(key, 0) + requested
+        rows_by_key.setdefault(key, d)
+
+    if not requested_by_key:
+        return []
+
+    available_by_key = _get_available_stock_map(rows_by_key.values())
+
+    if cart_id:
+        codes_by_warehouse = {}
+        for kind, item_code, warehouse in requested_by_key:
+            if kind == "item":
+                codes_by_warehouse.setdefault(warehouse, set()).add(item_code)
+        for warehouse, codes in codes_by_warehouse.items():
+            for item_code, qty in get_held_qty(codes, warehouse, exclude_cart=cart_id).items():
+                key = ("item", item_code, warehouse)
+                available_by_key[key] = available_by_key.get(key, 0) - qty
 
+    errors = []
+    for key, requested in requested_by_key.items():
+        available = available_by_key.get(key, 0)
         if requested > available:
+            d = rows_by_key[key]
             errors.append(
                 {
                     "item_code": d.get("item_code"),
@@ -208,7 +270,11 @@ def _collect_stock_errors(items):
 
 
 def _should_block(pos_profile):
-    """Check if sale should be blocked for insufficient stock."""
+    """Check if sale should be blocked for insufficient stock.
+
+    Stock Settings is a cached single; the POS Settings and POS Profile flags
+    come from the profile's submit context.
+    """
     # First check global ERPNext Stock Settings
     allow_negative = cint(
         frappe.db.get_single_value("Stock Settings", "allow_negative_stock") or 0
@@ -216,39 +282,33 @@ def _should_block(pos_profile):
     if allow_negative:
         return False
 
-    # Check POS Settings for the specific profile
-    if pos_profile:
-        # Check if POS Settings allows negative stock
-        pos_settings_allow_negative = cint(
-            frappe.db.get_value(
-                "POS Settings",
-                {"pos_profile": pos_profile},
-                "allow_negative_stock"
-            ) or 0
-        )
-        if pos_settings_allow_negative:
-            return False
+    # Default to blocking if no profile specified
+    if not pos_profile:
+        return True
 
-        # Try to get custom field (may not exist in vanilla ERPNext)
-        block_sale = cint(
-            frappe.db.get_value(
-                "POS Profile", pos_profile, "posa_block_sale_beyond_available_qty"
-            )
-            or 1
-        )
-        return bool(block_sale)
+    context = get_submit_context(pos_profile)
 
-    # Default to blocking if no profile specified
-    return True
+    # Check if POS Settings allows negative stock
+    if context.allow_negative_stock:
+        return False
+
+    return bool(cint(context.block_sale or 1))
 
 
 def _validate_stock_on_invoice(invoice_doc):
-    """Validate stock availability before submission."""
+    """Validate stock availability before submission.
+
+    The block policy is evaluated first, so nothing is queried for profiles
+    that allow negative stock.
+    """
     if invoice_doc.doctype == "Sales Invoice" and not cint(
         getattr(invoice_doc, "update_stock", 0)
     ):
         return
 
+    if not _should_block(invoice_doc.pos_profile):
+        return
+
     # Collect all stock items to check
     items_to_check = [d.as_dict() for d in invoice_doc.items if d.get("is_stock_item")]
 
@@ -259,35 +319,78 @@ def _validate_stock_on_invoice(invoice_doc):
     # Check for stock errors
     errors = _collect_stock_errors(items_to_check)
 
-    # Throw error if stock insufficient and blocking is enabled
-    if errors and _should_block(invoice_doc.pos_profile):
+    # Throw error if stock insufficient
+    if errors:
         frappe.throw(frappe.as_json({"errors": errors}), frappe.ValidationError)
 
 
+def _set_conversion_rates(invoice_doc, company):
+    """Fill missing exchange rates from the per-day currency cache.
+
+    ERPNext's set_missing_values only looks rates up when they are empty, so
+    seeding them here saves those lookups on every save. Rates the client
+    sent, or that the cache doesn't know, are left for ERPNext.
+    """
+    company_currency = get_company_currency(company)
+    if not company_currency:
+        return
+
+    posting_date = invoice_doc.get("posting_date") or nowdate()
+    currency = invoice_doc.get("currency") or company_currency
+    if not flt(invoice_doc.get("conversion_rate")):
+        rate = get_exchange_rate(currency, company_currency, posting_date)
+        if rate:
+            invoice_doc.conversion_rate = rate
+
+    price_list = invoice_doc.get("selling_price_list")
+    if price_list and not flt(invoice_doc.get("plc_conversion_rate")):
+        price_list_currency = get_price_list_currency(price_list) or company_currency
+        rate = get_exchange_rate(price_list_currency, company_currency, posting_date)
+        if rate:
+            invoice_doc.price_list_currency = price_list_currency
+            invoice_doc.plc_conversion_rate = rate
+
+
 def _auto_set_return_batches(invoice_doc):
     """Assign batch numbers for return invoices without a source invoice.
 
     When an item requires a batch number, this function allocates the first
-    available batch in FIFO order. If no batches exist in the selected
-    warehouse, an informative error is raised.
+    batch with stock in the selected warehouse, in FEFO order. Disabled and
+    expired batches count: goods from them can still come back. If no batches
+    exist in the selected warehouse, an informative error is raised.
     """
     if not invoice_doc.get("is_return") or invoice_doc.get("return_against"):
         return
 
-    for d in invoice_doc.items:
-        if not d.get("item_code") or not d.get("warehouse"):
-            continue
+    rows = [
+        d for d in invoice_doc.items
+        if d.get("item_code") and d.get("warehouse") and not d.get("batch_no")
+    ]
+    if not rows:
+        return
 
-        has_batch = frappe.db.get_value("Item", d.item_code, "has_batch_no")
-        if has_batch and not d.get("batch_no"):
-            batch_list = (
-                get_batch_qty(item_code=d.item_code, warehouse=d.warehouse) or []
-            )
-            batch_list = [b for b in batch_list if flt(b.get("qty")) > 0]
+    batch_items = set(
+        frappe.get_all(
+            "Item",
+            filters={"name": ["in", list({d.item_code for d in rows})], "has_batch_no": 1},
+            pluck="name",
+        )
+    )
 
+    # One availability query per warehouse, covering all its batch items
+    rows_by_warehouse = {}
+    for d in rows:
+        if d.item_code in batch_items:
+            rows_by_warehouse.setdefault(d.warehouse, []).append(d)
+
+    for warehouse, warehouse_rows in rows_by_warehouse.items():
+        batches = get_available_batches(
+            [d.item_code for d in warehouse_rows], warehouse, sellable_only=False
+        )
+        for d in warehouse_rows:
+            batch_list = batches.get(d.item_code)
             if batch_list:
-                # FIFO: batches are already sorted by posting/expiry in ERPNext
-                d.batch_no = batch_list[0].get("batch_no")
+                d.batch_no = batch_list[0]["batch_no"]
             else:
                 frappe.throw(
                     _("No batches available in {0} for {1}.").format(
@@ -302,11 +405,16 @@ def _auto_set_return_batches(invoice_doc):
 
 
 @frappe.whitelist()
-def validate_cart_items(items, pos_profile=None):
+def validate_cart_items(items, pos_profile=None, cart_id=None):
     """Validate cart items for available stock.
 
     Returns a list of item dicts where requested quantity exceeds availability.
     This can be used on the front-end for pre-submission checks.
+
+    With ``cart_id`` and a valid ``pos_profile`` the cart's stock items are
+    also recorded as a soft reservation of the session user's cart, replacing
+    its previous one (an empty cart releases it), and stock held by other
+    carts counts as unavailable.
     """
     if isinstance(items, str):
         items = json.loads(items)
@@ -314,16 +422,50 @@ def validate_cart_items(items, pos_profile=None):
     if pos_profile and not frappe.db.exists("POS Profile", pos_profile):
         pos_profile = None
 
+    if cart_id and pos_profile:
+        _hold_cart_items(cart_id, items)
+
     if not _should_block(pos_profile):
         return []
 
-    errors = _collect_stock_errors(items)
+    errors = _collect_stock_errors(items, cart_id=cart_id)
     if not errors:
         return []
 
     return errors
 
 
+def _hold_cart_items(cart_id, items):
+    """Replace the soft reservation of the session user's cart and broadcast the stock it moved.
+
+    Rows at warehouses the user cannot read are not held.
+    """
+    holds = {}
+    allowed_warehouses = {}
+    for d in items:
+        warehouse = d.get("warehouse")
+        if not d.get("item_code") or not warehouse or not cint(d.get("is_stock_item", 1)):
+            continue
+        if warehouse not in allowed_warehouses:
+            allowed_warehouses[warehouse] = bool(
+                frappe.db.exists("Warehouse", warehouse)
+                and frappe.has_permission("Warehouse", doc=warehouse)
+            )
+        if not allowed_warehouses[warehouse]:
+            continue
+        requested = flt(
+            d.get("stock_qty")
+            or (flt(d.get("qty")) * flt(d.get("conversion_factor") or 1))
+        )
+        if requested > 0:
+            pair = (warehouse, d.get("item_code"))
+            holds[pair] = holds.get(pair, 0) + requested
+
+    changed = hold_cart(cart_id, holds)
+    if changed:
+        queue_stock_changes(changed)
+
+
 @frappe.whitelist()
 def validate_return_items(original_invoice_name, return_items, doctype="Sales Invoice"):
     """Ensure that return items do not exceed the quantity from the original invoice.
@@ -470,6 +612,8 @@ def update_invoice(data):
             pos_profile_doc.company if pos_profile_doc else None
         )
 
+        _set_conversion_rates(invoice_doc, company)
+
         if company and invoice_doc.get("payments") and doctype == "Sales Invoice":
             for payment in invoice_doc.payments:
                 mode_of_payment = payment.get("mode_of_payment")
@@ -621,12 +765,7 @@ def update_invoice(data):
         # Auto-allow zero valuation rate for zero-price items if setting is enabled
         if doctype == "Sales Invoice" and pos_profile:
             try:
-                allow_zero_val = cint(
-                    frappe.db.get_value(
-                        "POS Settings", {"pos_profile": pos_profile}, "allow_zero_valuation"
-                    ) or 0
-                )
-                if allow_zero_val:
+                if get_submit_context(pos_profile).allow_zero_valuation:
                     for item in invoice_doc.get("items", []):
                         if flt(item.rate or 0) == 0 or flt(item.price_list_rate or 0) == 0:
                             item.allow_zero_valuation_rate = 1
@@ -644,15 +783,10 @@ def update_invoice(data):
 
         if pos_profile:
             try:
-                # Check if field exists before querying (may not exist on all ERPNext versions)
-                if frappe.db.has_column("POS Settings", "disable_rounded_total"):
-                    pos_settings_value = frappe.db.get_value(
-                        "POS Settings",
-                        {"pos_profile": pos_profile},
-                        "disable_rounded_total"
-                    )
-                    if pos_settings_value is not None:
-                        disable_rounded = cint(pos_settings_value)
+                # None when unset or the field doesn't exist on this ERPNext version
+                pos_settings_value = get_submit_context(pos_profile).disable_rounded_total
+                if pos_settings_value is not None:
+                    disable_rounded = cint(pos_settings_value)
             except Exception as e:
                 # Log error but continue with default
                 frappe.log_error(f"Error loading rounding setting: {str(e)}", "POS Invoice Creation")
@@ -1198,9 +1332,7 @@ def submit_invoice(invoice=None, data=None):
         # as separate positive/negative lines for cleaner reporting.
         if invoice_doc.get("is_return") and pos_profile:
             try:
-                retur_account = frappe.db.get_value(
-                    "POS Profile", pos_profile, "custom_retur"
-                )
+                retur_account = get_submit_context(pos_profile).retur_account
                 if retur_account:
                     for item in invoice_doc.get("items", []):
                         item.income_account = retur_account
@@ -1347,20 +1479,8 @@ def submit_invoice(invoice=None, data=None):
                     if expense_account:
                         invoice_doc.loyalty_redemption_account = expense_account
 
-        # Check if POS Settings allows negative stock
-        pos_settings_allow_negative = False
-        if pos_profile:
-            pos_settings_allow_negative = cint(
-                frappe.db.get_value(
-                    "POS Settings",
-                    {"pos_profile": pos_profile},
-                    "allow_negative_stock"
-                ) or 0
-            )
-
-        # Validate stock availability only if negative stock is not allowed
-        if not pos_settings_allow_negative:
-            _validate_stock_on_invoice(invoice_doc)
+        # Validate stock availability (skipped when the stock policy allows negative stock)
+        _validate_stock_on_invoice(invoice_doc)
 
         # ERPNext might overwrite remarks for Returns during validation. Reinforce it.
         frontend_remarks = invoice.get("remarks") or data.get("remarks")
@@ -1381,22 +1501,12 @@ def submit_invoice(invoice=None, data=None):
             invoice_doc.flags.pos_next_discount_amount = discount_amount
 
             # Wire discount account from POS Profile to balance the discount GL entry.
-            # Use has_column() first to avoid MySQL 1054 errors on non-existent fields.
+            # The submit context only reads the discount account fields that exist.
             if pos_profile:
-                _diskon_akun = None
-                for _fn in ("custom_diskon_akun", "diskon_akun", "discount_account"):
-                    if not frappe.db.has_column("POS Profile", _fn):
-                        continue
-                    try:
-                        _val = frappe.db.get_value("POS Profile", pos_profile, _fn)
-                        if _val:
-                            _diskon_akun = _val
-                            break
-                    except Exception:
-                        pass
+                submit_context = get_submit_context(pos_profile)
+                _diskon_akun = submit_context.discount_account
                 if _diskon_akun:
-                    meta = frappe.get_meta("Sales Invoice")
-                    if meta.has_field("additional_discount_account"):
+                    if submit_context.has_additional_discount_account:
                         invoice_doc.additional_discount_account = _diskon_akun
                     invoice_doc.flags.pos_next_diskon_akun = _diskon_akun
 
@@ -1406,11 +1516,14 @@ def submit_invoice(invoice=None, data=None):
         try:
             audit_rules = data.get("applied_audit_rules") or []
             if audit_rules:
-                pr_fieldname = None
-                for _f in frappe.get_meta("Sales Invoice").fields:
-                    if _f.fieldtype == "Table" and _f.options == "Pricing Rule Detail":
-                        pr_fieldname = _f.fieldname
-                        break
+                if pos_profile:
+                    pr_fieldname = get_submit_context(pos_profile).pricing_rule_detail_field
+                else:
+                    pr_fieldname = None
+                    for _f in frappe.get_meta("Sales Invoice").fields:
+                        if _f.fieldtype == "Table" and _f.options == "Pricing Rule Detail":
+                            pr_fieldname = _f.fieldname
+                            break
 
                 if pr_fieldname:
                     invoice_doc.set(pr_fieldname, [])
@@ -1432,7 +1545,11 @@ def submit_invoice(invoice=None, data=None):
         # This lets get_gl_entries split: promo → custom_discount_account,
         # manual → diskon_akun (Potongan Penjualan).
         promo_da = flt(data.get("promo_discount_amount") or 0)
-        if frappe.db.has_column("Sales Invoice", "custom_promo_discount_amount"):
+        if (
+            get_submit_context(pos_profile).has_promo_discount_amount
+            if pos_profile
+            else frappe.db.has_column("Sales Invoice", "custom_promo_discount_amount")
+        ):
             invoice_doc.custom_promo_discount_amount = promo_da
 
         # Resolve the promo account from transaction-level rules now (while we
@@ -1470,6 +1587,12 @@ def submit_invoice(invoice=None, data=None):
         invoice_doc.submit()
         invoice_submitted = True
 
+        # The sold stock is now in Bin; stop holding it for the cart
+        cart_id = data.get("cart_id")
+        if cart_id:
+            user = frappe.session.user
+            frappe.db.after_commit.add(lambda: queue_stock_changes(release_cart(cart_id, user)))
+
         # ── Grand Total Integrity Check ──────────────────────────────────────
         # Compare the grand_total the UI displayed (sent by frontend as
         # data.ui_grand_total) with the grand_total ERPNext actually recorded
@@ -2607,8 +2730,7 @@ def _item_qualifies_for_rule(item_doc, rule_doc):
             return True
         # Also check ancestors — rule may target a parent group
         try:
-            from frappe.utils.nestedset import get_ancestors_of
-            ancestors = get_ancestors_of("Item Group", item_group) if item_group else []
+            ancestors = get_ancestors("Item Group", item_group) if item_group else []
             return bool(rule_groups & set(ancestors))
         except Exception:
             return False
@@ -2733,8 +2855,16 @@ def apply_offers(invoice_data, selected_offers=None):
         if not pricing_items:
             return {"items": items}
 
-        company_currency = frappe.get_cached_value(
-            "Company", profile.company, "default_currency"
+        # Currencies and exchange rates come from the per-day currency cache
+        company_currency = get_company_currency(profile.company)
+        currency = invoice.get("currency") or profile.get("currency") or company_currency
+        price_list = invoice.get("price_list") or profile.get("selling_price_list")
+        posting_date = invoice.get("posting_date") or nowdate()
+        conversion_rate = flt(invoice.get("conversion_rate")) or get_exchange_rate(
+            currency, company_currency, posting_date
+        )
+        plc_conversion_rate = flt(invoice.get("plc_conversion_rate")) or get_exchange_rate(
+            get_price_list_currency(price_list) or currency, company_currency, posting_date
         )
 
         # Get customer details if customer is provided
@@ -2777,16 +2907,12 @@ def apply_offers(invoice_data, selected_offers=None):
                 "doctype": invoice.get("doctype") or "Sales Invoice",
                 "name": invoice.get("name") or "POS-INVOICE",
                 "company": profile.company,
-                "transaction_date": invoice.get("posting_date") or nowdate(),
-                "posting_date": invoice.get("posting_date") or nowdate(),
-                "currency": invoice.get("currency")
-                or profile.get("currency")
-                or company_currency,
-                "conversion_rate": flt(invoice.get("conversion_rate") or 1) or 1,
-                "plc_conversion_rate": flt(invoice.get("plc_conversion_rate") or 1)
-                or 1,
-                "price_list": invoice.get("price_list")
-                or profile.get("selling_price_list"),
+                "transaction_date": posting_date,
+                "posting_date": posting_date,
+                "currency": currency,
+                "conversion_rate": conversion_rate or 1,
+                "plc_conversion_rate": plc_conversion_rate or 1,
+                "price_list": price_list,
                 "customer": customer,
                 "customer_group": customer_group,
                 "territory": territory,
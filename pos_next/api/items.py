@@ -1,15 +1,35 @@
 # Copyright (c) 2024, POS Next and contributors
 # For license information, please see license.txt
 
+import base64
 import json
 from collections import defaultdict
 
 import frappe
-from erpnext.stock.doctype.batch.batch import get_batch_qty
 from erpnext.stock.get_item_details import get_item_details as erpnext_get_item_details
 from frappe import _
 from frappe.query_builder import DocType, functions as fn
-from frappe.utils import flt, nowdate
+from frappe.utils import add_to_date, cint, flt, get_datetime, now_datetime, nowdate
+
+from pos_next.services.barcode_map import get_snapshot, lookup_barcode, set_snapshot
+from pos_next.services.batch_index import get_available_batches
+from pos_next.services.bundle_availability import (
+	get_bundle_codes,
+	get_bundle_definitions,
+	get_cached_availability,
+	store_availability,
+)
+from pos_next.services.cart_reservations import apply_cart_reservations, get_cart_reservations
+from pos_next.services.content_version import get_version, versioned_response
+from pos_next.services.currency_cache import get_company_currency, get_exchange_rate, get_price_list_currency
+from pos_next.services.item_search import get_search_condition
+from pos_next.services.price_matrix import get_display_price, get_item_prices
+from pos_next.services.serial_index import count_serials, get_serial_page, get_serial_previews
+from pos_next.services.single_flight import single_flight
+from pos_next.services.stock_feed import get_changes_since as get_stock_feed_changes
+from pos_next.services.stock_matrix import get_stock_matrix, get_warehouse_directory
+from pos_next.services.thumbnails import attach_thumbnails, get_items_with_new_thumbnails, get_thumbnail_urls
+from pos_next.services.tree_cache import expand_group, get_ancestors, get_descendants, is_group
 
 ITEM_RESULT_FIELDS = [
 	"name as item_code",
@@ -30,27 +50,77 @@ ITEM_RESULT_FIELDS = [
 
 ITEM_RESULT_COLUMNS = ",\n\t".join(ITEM_RESULT_FIELDS)
 
+# Columnar catalog format: low-cardinality columns sent as indexes into a shared
+# dictionary (column -> dictionary name). UOM columns share one dictionary so
+# item_uoms/uom_prices can reference it too.
+COLUMNAR_DICTIONARY_COLUMNS = {
+	"item_group": "item_group",
+	"brand": "brand",
+	"stock_uom": "uom",
+	"uom": "uom",
+	"price_uom": "uom",
+	"warehouse": "warehouse",
+	"custom_company": "company",
+}
+
+# NDJSON export: items enriched and written per line
+EXPORT_CHUNK_SIZE = 500
+
+# Delta sync: above this many changed items a full reload is cheaper than a delta
+DELTA_SYNC_MAX_ITEMS = 5000
+# Delta sync: watermark is moved back by this much to cover transactions that
+# were still in flight (modified set, not yet committed) when the cursor was taken
+DELTA_SYNC_OVERLAP_SECONDS = 5
+
+# Facet counts: keyed by the catalog content version, which Item changes bump
+ITEM_FACETS_KEY = "pos_next:item_facets:{0}:{1}:{2}"
+ITEM_FACETS_TTL = 24 * 60 * 60
+
+
+def _encode_cursor(values):
+	"""Encode cursor values as an opaque, URL-safe continuation token."""
+	raw = json.dumps(values, default=str, separators=(",", ":"))
+	return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(token):
+	"""Decode a continuation token produced by _encode_cursor()."""
+	try:
+		return json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+	except (ValueError, TypeError):
+		frappe.throw(_("Invalid cursor: {0}").format(token))
+
 
 def get_stock_availability(item_code, warehouse):
 	"""Return total available quantity for an item in the given warehouse."""
 	if not warehouse:
 		return 0.0
 
-	warehouses = [warehouse]
-	if frappe.db.get_value("Warehouse", warehouse, "is_group"):
-		# Include all child warehouses when a group warehouse is set
-		warehouses = frappe.db.get_descendants("Warehouse", warehouse) or []
+	return get_stock_availability_bulk([item_code], warehouse).get(item_code, 0.0)
+
+
+def get_stock_availability_bulk(item_codes, warehouse):
+	"""Return {item_code: available quantity} for several items in one Bin query."""
+	if not warehouse or not item_codes:
+		return {}
+
+	# Include all child warehouses when a group warehouse is set
+	warehouses = expand_group("Warehouse", warehouse)
+
+	if not warehouses:
+		return {}
 
 	Bin = DocType("Bin")
 	result = (
 		frappe.qb.from_(Bin)
-		.select(fn.Sum(Bin.actual_qty).as_("actual_qty"))
-		.where(Bin.item_code == item_code)
+		.select(Bin.item_code, fn.Sum(Bin.actual_qty).as_("actual_qty"))
+		.where(Bin.item_code.isin(item_codes))
 		.where(Bin.warehouse.isin(warehouses))
+		.groupby(Bin.item_code)
 		.run(as_dict=True)
 	)
 
-	return flt(result[0].actual_qty) if result and result[0].actual_qty else 0.0
+	return {row.item_code: flt(row.actual_qty) if row.actual_qty else 0.0 for row in result}
 
 
 def get_item_detail(item, doc=None, warehouse=None, price_list=None, company=None):
@@ -75,17 +145,19 @@ def get_item_detail(item, doc=None, warehouse=None, price_list=None, company=Non
 
 	Serial Number Tracking:
 	=======================
-	For items with has_serial_no=1, returns all available serial numbers:
+	For items with has_serial_no=1, returns the count of available serial
+	numbers and the first page of them by name:
 	- Only Active serial numbers
 	- From specified warehouse only
 	- Serial numbers are unique identifiers for individual units
+	- The rest are paged in with get_serial_numbers
 
 	Multi-Currency Pricing:
 	=======================
 	Handles price lists in different currencies with automatic conversion:
 	- Fetches exchange rates from price list currency to company currency
 	- Applies conversion factors (plc_conversion_rate)
-	- Falls back to 1:1 if exchange rate unavailable (with error logging)
+	- Leaves the rates unset for ERPNext to resolve if no exchange rate is found (the miss is logged)
 
 	UOM (Unit of Measure) Handling:
 	================================
@@ -110,7 +182,8 @@ def get_item_detail(item, doc=None, warehouse=None, price_list=None, company=Non
 			  - All ERPNext item_details (rate, tax, etc.)
 			  - actual_qty: Stock available in warehouse
 			  - batch_no_data: List of available batches with expiry dates
-			  - serial_no_data: List of available serial numbers
+			  - serial_no_data: First available serial numbers
+			  - serial_no_count: Total available serial numbers
 			  - max_discount: Maximum discount allowed
 			  - item_uoms: Alternative UOMs with conversion factors
 			  - item_group, brand: For offer eligibility checking
@@ -128,22 +201,46 @@ def get_item_detail(item, doc=None, warehouse=None, price_list=None, company=Non
 		... 	company="My Company"
 		... )
 		>>> print(details["serial_no_data"])
-		[{"serial_no": "SN001"}, {"serial_no": "SN002"}]
+		[{"serial_no": "SN001", "warehouse": "Main Store"}, {"serial_no": "SN002", "warehouse": "Main Store"}]
+		>>> print(details["serial_no_count"])
+		2
 
 	Database Queries:
 		- Batches: 1 query (only if has_batch_no=1)
-		- Serial Numbers: 1 query (only if has_serial_no=1)
+		- Serial Numbers: 2 queries, count and first page (only if has_serial_no=1)
 		- Item Details: 1 query via ERPNext's get_item_details
 		- Stock: 1 query (only if is_stock_item=1)
 		- UOMs: 1 query for conversion details
-		Total: 2-5 queries depending on item type
+		Total: 2-6 queries depending on item type
 	"""
 	# Parse item data (accept both JSON string and dict)
 	item = json.loads(item) if isinstance(item, str) else item
+	return get_item_detail_bulk([item], doc, warehouse, price_list, company)[0]
+
+
+def get_item_detail_bulk(items, doc=None, warehouse=None, price_list=None, company=None):
+	"""
+	Resolve get_item_detail for a list of items sharing one warehouse/price list/company.
+
+	Returns one result per input item, in order, identical to calling
+	get_item_detail on each. The per-item lookups are batched: currency once,
+	one query each for Item fields, available batches, serial numbers, Bin
+	stock and UOM conversions, and per-UOM prices from the price matrix. Only
+	ERPNext's get_item_details (pricing rules, taxes) still runs per item,
+	since its logic lives in ERPNext.
+
+	Args:
+		items (list[dict]): Item dicts as accepted by get_item_detail
+		doc, warehouse, price_list, company: As for get_item_detail
+
+	Returns:
+		list[dict]: get_item_detail results in input order
+	"""
 	today = nowdate()
-	item_code = item.get("item_code")
-	batch_no_data = []
-	serial_no_data = []
+	item_codes = list(dict.fromkeys(item.get("item_code") for item in items))
+	batch_codes = list(dict.fromkeys(item.get("item_code") for item in items if item.get("has_batch_no")))
+	serial_codes = list(dict.fromkeys(item.get("item_code") for item in items if item.get("has_serial_no")))
+	stock_codes = list(dict.fromkeys(item.get("item_code") for item in items if item.get("is_stock_item")))
 
 	# ===========================================================================
 	# BATCH TRACKING: Get available batches with expiry filtering
@@ -153,38 +250,17 @@ def get_item_detail(item, doc=None, warehouse=None, price_list=None, company=Non
 	# 2. Non-expired batches (expiry_date > today or no expiry)
 	# 3. Enabled batches (disabled = 0)
 	#
-	# Sorted by: Expiry date (FIFO - First to Expire, First Out)
+	# Sorted by: Expiry date (FEFO - First to Expire, First Out)
 	#
 	# Use Case: POS cashier selects batch when adding item to cart
 	# Example: Medicine "ABC" has 3 batches:
 	#   - Batch A: 50 qty, expires in 2 days → INCLUDED (sell first!)
 	#   - Batch B: 100 qty, expires in 30 days → INCLUDED
 	#   - Batch C: 20 qty, expired yesterday → EXCLUDED
-	if warehouse and item.get("has_batch_no"):
-		# Get all batches with available quantity for this item in warehouse
-		batch_list = get_batch_qty(warehouse=warehouse, item_code=item_code)
-		if batch_list:
-			for batch in batch_list:
-				# Filter 1: Only batches with available stock
-				if batch.qty > 0 and batch.batch_no:
-					# Fetch batch metadata (expiry, manufacturing dates, disabled status)
-					batch_doc = frappe.get_cached_doc("Batch", batch.batch_no)
-
-					# Filter 2: Exclude expired batches
-					# Filter 3: Exclude disabled batches
-					is_not_expired = (
-						str(batch_doc.expiry_date) > str(today)
-						or batch_doc.expiry_date in ["", None]
-					)
-					is_enabled = batch_doc.disabled == 0
-
-					if is_not_expired and is_enabled:
-						batch_no_data.append({
-							"batch_no": batch.batch_no,
-							"batch_qty": batch.qty,
-							"expiry_date": batch_doc.expiry_date,
-							"manufacturing_date": batch_doc.manufacturing_date,
-						})
+	batch_no_map = {}
+	if warehouse and batch_codes:
+		# One ledger query for all items, joined to Batch and already in FEFO order
+		batch_no_map = get_available_batches(batch_codes, warehouse)
 
 	# ===========================================================================
 	# SERIAL NUMBER TRACKING: Get available serial numbers
@@ -202,111 +278,131 @@ def get_item_detail(item, doc=None, warehouse=None, price_list=None, company=Non
 	#   - SN002 (Active, Main Store) → INCLUDED
 	#   - SN003 (Delivered, Main Store) → EXCLUDED (already sold)
 	#   - SN004 (Active, Branch Store) → EXCLUDED (different warehouse)
-	if warehouse and item.get("has_serial_no"):
-		serial_no_data = frappe.get_all(
-			"Serial No",
-			filters={
-				"item_code": item_code,
-				"status": "Active",  # Only available serial numbers
-				"warehouse": warehouse,  # From specified warehouse only
-			},
-			fields=["name as serial_no"],
-		)
-
-	item["selling_price_list"] = price_list
-
-	# Handle multi-currency
+	#
+	# Only the count and the first page are returned; electronics stores can
+	# hold thousands of serials per SKU, so the rest come from get_serial_numbers.
+	serial_no_map = {}
+	if warehouse and serial_codes:
+		serial_no_map = get_serial_previews(serial_codes, warehouse)
+
+	# Handle multi-currency (same for every item, resolved once)
+	currency_args = {}
+	company_currency = None
 	if company:
-		company_currency = frappe.db.get_value("Company", company, "default_currency")
-		price_list_currency = company_currency
-		if price_list:
-			price_list_currency = (
-				frappe.db.get_value("Price List", price_list, "currency") or company_currency
-			)
-
-		exchange_rate = 1
-		if price_list_currency != company_currency:
-			from erpnext.setup.utils import get_exchange_rate
-
-			try:
-				exchange_rate = get_exchange_rate(price_list_currency, company_currency, today)
-			except Exception:
-				frappe.log_error(
-					f"Missing exchange rate from {price_list_currency} to {company_currency}",
-					"POS Next",
-				)
-
-		item["price_list_currency"] = price_list_currency
-		item["plc_conversion_rate"] = exchange_rate
-		item["conversion_rate"] = exchange_rate
+		# Currencies and the exchange rate come from the per-day currency cache
+		company_currency = get_company_currency(company)
+		price_list_currency = get_price_list_currency(price_list) or company_currency
 
+		currency_args = {"price_list_currency": price_list_currency}
 		if doc:
 			doc.price_list_currency = price_list_currency
-			doc.plc_conversion_rate = exchange_rate
-			doc.conversion_rate = exchange_rate
-
-	# Add company to the item args
-	if company:
-		item["company"] = company
 
-	# Create a proper doc structure with company
-	if not doc and company:
-		doc = frappe._dict({"doctype": "Sales Invoice", "company": company})
+		# A missing rate (0) is left unset for ERPNext to resolve, as _set_conversion_rates does
+		exchange_rate = get_exchange_rate(price_list_currency, company_currency, today)
+		if exchange_rate:
+			currency_args["plc_conversion_rate"] = exchange_rate
+			currency_args["conversion_rate"] = exchange_rate
+			if doc:
+				doc.plc_conversion_rate = exchange_rate
+				doc.conversion_rate = exchange_rate
 
 	# Fetch all needed Item fields in a single query (performance optimization)
-	item_data = frappe.db.get_value(
-		"Item",
-		item_code,
-		["max_discount", "item_group", "brand", "stock_uom"],
-		as_dict=True
-	) or {}
+	item_data_map = {
+		row.name: row
+		for row in frappe.get_all(
+			"Item",
+			filters={"name": ["in", item_codes]},
+			fields=["name", "max_discount", "item_group", "brand", "stock_uom"],
+		)
+	} if item_codes else {}
+
+	stock_map = get_stock_availability_bulk(stock_codes, warehouse) if warehouse and stock_codes else {}
+
+	# Per-UOM prices from the shared price matrix, in the transaction currency
+	transaction_currency = (doc and doc.get("currency")) or company_currency
+	uom_prices_map = get_item_prices(item_codes, price_list, transaction_currency) if price_list else {}
+
+	uom_rows = defaultdict(list)
+	if item_codes:
+		for row in frappe.get_all(
+			"UOM Conversion Detail",
+			filters={"parent": ["in", item_codes]},
+			fields=["parent", "uom", "conversion_factor"],
+		):
+			uom_rows[row.parent].append(row)
+
+	results = []
+	for item in items:
+		item_code = item.get("item_code")
+		item["selling_price_list"] = price_list
+		item.update(currency_args)
+
+		# Add company to the item args
+		if company:
+			item["company"] = company
 
-	# Prepare args dict for get_item_details - only include necessary fields
-	args = frappe._dict(
-		{
-			"doctype": "Sales Invoice",
-			"item_code": item.get("item_code"),
-			"company": item.get("company"),
-			"qty": item.get("qty", 1),
-			"uom": item.get("uom"),  # Include UOM to fetch correct price list rate
-			"selling_price_list": item.get("selling_price_list"),
-			"price_list_currency": item.get("price_list_currency"),
-			"plc_conversion_rate": item.get("plc_conversion_rate"),
-			"conversion_rate": item.get("conversion_rate"),
-		}
-	)
+		# Create a proper doc structure with company
+		item_doc = doc
+		if not item_doc and company:
+			item_doc = frappe._dict({"doctype": "Sales Invoice", "company": company})
 
-	res = erpnext_get_item_details(args, doc)
+		item_data = item_data_map.get(item_code) or {}
 
-	if item.get("is_stock_item") and warehouse:
-		res["actual_qty"] = get_stock_availability(item_code, warehouse)
+		# Prepare args dict for get_item_details - only include necessary fields
+		args = frappe._dict(
+			{
+				"doctype": "Sales Invoice",
+				"item_code": item.get("item_code"),
+				"company": item.get("company"),
+				"qty": item.get("qty", 1),
+				"uom": item.get("uom"),  # Include UOM to fetch correct price list rate
+				"selling_price_list": item.get("selling_price_list"),
+				"price_list_currency": item.get("price_list_currency"),
+				"plc_conversion_rate": item.get("plc_conversion_rate"),
+				"conversion_rate": item.get("conversion_rate"),
+			}
+		)
 
-	res["max_discount"] = item_data.get("max_discount")
-	res["batch_no_data"] = batch_no_data
-	res["serial_no_data"] = serial_no_data
-	res["item_group"] = item_data.get("item_group")
-	res["brand"] = item_data.get("brand")
+		res = erpnext_get_item_details(args, item_doc)
 
-	# Add UOMs data
-	uoms = frappe.get_all(
-		"UOM Conversion Detail",
-		filters={"parent": item_code},
-		fields=["uom", "conversion_factor"],
-	)
+		if item.get("is_stock_item") and warehouse:
+			res["actual_qty"] = stock_map.get(item_code, 0.0)
 
-	# Add stock UOM if not already in uoms list
-	stock_uom = item_data.get("stock_uom")
-	if stock_uom and not any(u.get("uom") == stock_uom for u in uoms):
-		uoms.append({"uom": stock_uom, "conversion_factor": 1.0})
+		res["max_discount"] = item_data.get("max_discount")
+		res["batch_no_data"] = list(batch_no_map.get(item_code, [])) if warehouse and item.get("has_batch_no") else []
+		serial_preview = serial_no_map.get(item_code) if warehouse and item.get("has_serial_no") else None
+		res["serial_no_data"] = list(serial_preview["serials"]) if serial_preview else []
+		res["serial_no_count"] = serial_preview["count"] if serial_preview else 0
+		res["item_group"] = item_data.get("item_group")
+		res["brand"] = item_data.get("brand")
 
-	res["item_uoms"] = uoms
+		# Add UOMs data (copied per result - the stock UOM is appended below)
+		uoms = [
+			frappe._dict({"uom": row.uom, "conversion_factor": row.conversion_factor})
+			for row in uom_rows.get(item_code, [])
+		]
 
-	return res
+		# Add stock UOM if not already in uoms list
+		stock_uom = item_data.get("stock_uom")
+		if stock_uom and not any(u.get("uom") == stock_uom for u in uoms):
+			uoms.append({"uom": stock_uom, "conversion_factor": 1.0})
+
+		res["item_uoms"] = uoms
+		res["uom_prices"] = uom_prices_map.get(item_code, {})
+		results.append(res)
+
+	return results
 
 
 @frappe.whitelist()
 def search_by_barcode(barcode, pos_profile):
-	"""Search item by barcode"""
+	"""
+	Search item by barcode.
+
+	Barcodes resolve through the Redis barcode map, and plain (non batch/serial)
+	items are answered from a short-lived per-profile snapshot, so repeat scans
+	of the same product skip SQL entirely. See pos_next.services.barcode_map.
+	"""
 	try:
 		# Parse pos_profile if it's a JSON string
 		if isinstance(pos_profile, str):
@@ -322,14 +418,22 @@ def search_by_barcode(barcode, pos_profile):
 		if not pos_profile:
 			frappe.throw(_("POS Profile is required"))
 
-		# Search for item by barcode - also get UOM if barcode has specific UOM
-		barcode_data = frappe.db.get_value(
-			"Item Barcode", {"barcode": barcode}, ["parent", "uom"], as_dict=True
-		)
+		# Scanners may pad the code with whitespace
+		if isinstance(barcode, str):
+			barcode = barcode.strip()
+
+		# Resolve through the Redis barcode map; None means it isn't built yet
+		entry = lookup_barcode(barcode)
+		if entry is None:
+			barcode_data = frappe.db.get_value(
+				"Item Barcode", {"barcode": barcode}, ["parent", "uom"], as_dict=True
+			)
+			if barcode_data:
+				entry = {"item_code": barcode_data.parent, "uom": barcode_data.uom}
 
-		if barcode_data:
-			item_code = barcode_data.parent
-			barcode_uom = barcode_data.uom
+		if entry:
+			item_code = entry["item_code"]
+			barcode_uom = entry["uom"]
 		else:
 			# Try searching in item code field directly
 			item_code = frappe.db.get_value("Item", {"name": barcode})
@@ -349,19 +453,33 @@ def search_by_barcode(barcode, pos_profile):
 		if not pos_profile_doc.company:
 			frappe.throw(_("Company not set in POS Profile {0}").format(pos_profile))
 
-		# Get item doc
-		item_doc = frappe.get_cached_doc("Item", item_code)
+		# The map carries the item flags; only fall back to the Item doc without it
+		if "is_sales_item" not in (entry or {}):
+			item_doc = frappe.get_cached_doc("Item", item_code)
+			entry = {
+				"is_sales_item": item_doc.is_sales_item,
+				"has_batch_no": item_doc.has_batch_no,
+				"has_serial_no": item_doc.has_serial_no,
+				"is_stock_item": item_doc.is_stock_item,
+			}
 
 		# Check if item is allowed for sales
-		if not item_doc.is_sales_item:
+		if not entry["is_sales_item"]:
 			frappe.throw(_("Item {0} is not allowed for sales").format(item_code))
 
+		# Batch and serial lists change with every sale, so only plain items use snapshots
+		use_snapshot = not (entry["has_batch_no"] or entry["has_serial_no"])
+		if use_snapshot:
+			item_details = get_snapshot(item_code, pos_profile, barcode_uom)
+			if item_details:
+				return item_details
+
 		# Prepare item dict for get_item_detail
 		item = {
 			"item_code": item_code,
-			"has_batch_no": item_doc.has_batch_no or 0,
-			"has_serial_no": item_doc.has_serial_no or 0,
-			"is_stock_item": item_doc.is_stock_item or 0,
+			"has_batch_no": entry["has_batch_no"] or 0,
+			"has_serial_no": entry["has_serial_no"] or 0,
+			"is_stock_item": entry["is_stock_item"] or 0,
 			"pos_profile": pos_profile,
 		}
 
@@ -377,6 +495,9 @@ def search_by_barcode(barcode, pos_profile):
 			company=pos_profile_doc.company,
 		)
 
+		if use_snapshot:
+			set_snapshot(item_code, pos_profile, barcode_uom, item_details)
+
 		return item_details
 	except Exception as e:
 		frappe.log_error(frappe.get_traceback(), "Search by Barcode Error")
@@ -430,6 +551,7 @@ def get_batch_serial_details(item_code, warehouse):
 			"has_serial_no": has_serial_no,
 			"batches": [],
 			"serial_nos": [],
+			"serial_no_count": 0,
 		}
 
 		if has_batch_no:
@@ -450,22 +572,12 @@ def get_batch_serial_details(item_code, warehouse):
 			)
 			result["batches"] = batches
 
-		if has_serial_no:
-			# Get available serial numbers using Query Builder
-			SerialNo = DocType("Serial No")
-			serial_nos = (
-				frappe.qb.from_(SerialNo)
-				.select(
-					SerialNo.name.as_("serial_no"),
-					SerialNo.warehouse
-				)
-				.where(SerialNo.item_code == item_code)
-				.where(SerialNo.warehouse == warehouse)
-				.where(SerialNo.status == "Active")
-				.orderby(SerialNo.creation)
-				.run(as_dict=True)
-			)
-			result["serial_nos"] = serial_nos
+		if has_serial_no and warehouse:
+			# Count plus the first page; the rest is paged in with get_serial_numbers
+			preview = get_serial_previews([item_code], warehouse).get(item_code)
+			if preview:
+				result["serial_nos"] = preview["serials"]
+				result["serial_no_count"] = preview["count"]
 
 		return result
 	except Exception as e:
@@ -473,6 +585,43 @@ def get_batch_serial_details(item_code, warehouse):
 		frappe.throw(_("Error fetching batch/serial details: {0}").format(str(e)))
 
 
+@frappe.whitelist()
+def get_serial_numbers(item_code, warehouse, search_term=None, cursor=None, page_size=None, count_only=0):
+	"""
+	Page through the Active serial numbers of an item.
+
+	Item lookups return only the first page of serials plus a count; this
+	endpoint serves the rest on demand.
+
+	Args:
+		item_code (str): Serial-tracked item
+		warehouse (str): Warehouse (group warehouses include their children)
+		search_term (str, optional): Only serials whose name starts with it
+		cursor (str, optional): next_cursor of the previous page
+		page_size (int, optional): Serials per page (default 100, max 500)
+		count_only (int): 1 to return only the number of matching serials
+
+	Returns:
+		dict: {"count": int} when count_only, otherwise
+			{"serials": [{"serial_no", "warehouse"}, ...], "next_cursor": str or None}
+	"""
+	try:
+		search_term = (search_term or "").strip()
+		if cint(count_only):
+			return {"count": count_serials([item_code], warehouse, search_term).get(item_code, 0)}
+
+		return get_serial_page(
+			item_code,
+			warehouse,
+			cursor=cursor or None,
+			prefix=search_term,
+			page_size=page_size,
+		)
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Get Serial Numbers Error")
+		frappe.throw(_("Error fetching serial numbers: {0}").format(str(e)))
+
+
 @frappe.whitelist()
 def get_item_variants(template_item, pos_profile):
 	"""Get all variants for a template item with prices and stock"""
@@ -541,27 +690,10 @@ def get_item_variants(template_item, pos_profile):
 					{"uom": uom["uom"], "conversion_factor": uom["conversion_factor"]}
 				)
 
-		# Get all UOM-specific prices for variants using Query Builder
-		uom_prices_map = {}
-		if variant_codes:
-			ItemPrice = DocType("Item Price")
-			prices = (
-				frappe.qb.from_(ItemPrice)
-				.select(
-					ItemPrice.item_code,
-					ItemPrice.uom,
-					ItemPrice.price_list_rate
-				)
-				.where(ItemPrice.item_code.isin(variant_codes))
-				.where(ItemPrice.price_list == pos_profile_doc.selling_price_list)
-				.orderby(ItemPrice.item_code)
-				.orderby(ItemPrice.uom)
-				.run(as_dict=True)
-			)
-			for price in prices:
-				if price["item_code"] not in uom_prices_map:
-					uom_prices_map[price["item_code"]] = {}
-				uom_prices_map[price["item_code"]][price["uom"]] = price["price_list_rate"]
+		# Get all UOM-specific prices for variants from the shared price matrix
+		uom_prices_map = get_item_prices(
+			variant_codes, pos_profile_doc.selling_price_list, pos_profile_doc.currency
+		)
 
 		# Get all variant attributes in a single query (performance optimization)
 		attributes_map = {}
@@ -597,12 +729,13 @@ def get_item_variants(template_item, pos_profile):
 			# Get variant attributes from preloaded map
 			variant["attributes"] = attributes_map.get(variant["item_code"], {})
 
-			# Get price from preloaded map (check stock UOM first, then any UOM)
-			variant_prices = uom_prices_map.get(variant["item_code"], {})
-			price = variant_prices.get(variant["stock_uom"])
-			if not price and variant_prices:
-				# Fallback to first available price if stock UOM price not found
-				price = next(iter(variant_prices.values()), None)
+			# Get price from preloaded map (stock UOM first, then any UOM converted to stock UOM)
+			conversion_factors = {
+				uom["uom"]: uom["conversion_factor"] for uom in uom_map.get(variant["item_code"], [])
+			}
+			price, _price_uom = get_display_price(
+				uom_prices_map.get(variant["item_code"], {}), variant["stock_uom"], conversion_factors
+			)
 			variant["rate"] = price or 0
 
 			# Get stock from pre-loaded stock map (performance optimization)
@@ -625,37 +758,36 @@ def get_item_variants(template_item, pos_profile):
 
 
 def _get_item_group_with_descendants(item_group):
-	"""Get an item group and all its descendants using nested set model."""
+	"""Get an item group and all its descendants from the cached Item Group closure."""
 	if not item_group:
 		return []
 
-	ItemGroup = DocType("Item Group")
+	if not is_group("Item Group", item_group):
+		return [item_group]
 
-	# Get lft, rgt for the item group to find descendants
-	group_data = (
-		frappe.qb.from_(ItemGroup)
-		.select(ItemGroup.lft, ItemGroup.rgt, ItemGroup.is_group)
-		.where(ItemGroup.name == item_group)
-		.run(as_dict=True)
-	)
+	return [item_group] + get_descendants("Item Group", item_group)
 
-	if not group_data:
-		return [item_group]
 
-	group = group_data[0]
-	if not group.is_group:
-		return [item_group]
+def _get_min_variant_prices(template_codes, price_list, currency=None):
+	"""Return {template: lowest enabled-variant price} from the shared price matrix."""
+	if not template_codes or not price_list:
+		return {}
 
-	# Get all descendants using lft/rgt range
-	descendants = (
-		frappe.qb.from_(ItemGroup)
-		.select(ItemGroup.name)
-		.where(ItemGroup.lft > group.lft)
-		.where(ItemGroup.rgt < group.rgt)
-		.run(pluck="name")
+	variants = frappe.get_all(
+		"Item",
+		filters={"variant_of": ["in", template_codes], "disabled": 0},
+		fields=["name", "variant_of"],
 	)
+	prices = get_item_prices([variant.name for variant in variants], price_list, currency)
+
+	min_prices = {}
+	for variant in variants:
+		for rate in prices.get(variant.name, {}).values():
+			if variant.variant_of not in min_prices or rate < min_prices[variant.variant_of]:
+				min_prices[variant.variant_of] = rate
 
-	return [item_group] + list(descendants)
+	# Zero/empty minimums mean "no derived price", as the per-template lookup did
+	return {template: rate for template, rate in min_prices.items() if rate}
 
 
 def _build_item_base_conditions(pos_profile_doc, item_group=None, exclude_variants=True):
@@ -815,11 +947,8 @@ def _calculate_bundle_availability_bulk(bundle_codes, warehouse):
 	# Example:
 	#   Input: "Main Store" (group warehouse)
 	#   Output: ["Main Store - A", "Main Store - B", "Main Store - C"]
-	warehouses = [warehouse]
-	if frappe.db.get_value("Warehouse", warehouse, "is_group"):
-		child_warehouses = frappe.db.get_descendants("Warehouse", warehouse)
-		# Fallback to original warehouse if no children found
-		warehouses = child_warehouses or [warehouse]
+	# Fallback to original warehouse if no children found
+	warehouses = expand_group("Warehouse", warehouse) or [warehouse]
 
 	# ===========================================================================
 	# STEP 4: Fetch Stock Availability for All Components (Bulk Query)
@@ -891,14 +1020,44 @@ def _calculate_bundle_availability_bulk(bundle_codes, warehouse):
 	return bundle_availability
 
 
+def _get_bundle_availability(item_codes, warehouse):
+	"""
+	Cached front of _calculate_bundle_availability_bulk.
+
+	Bundles are detected from the cached bundle definitions and their
+	availability read from the per-warehouse Redis hash; only bundles missing
+	from it are calculated (see pos_next.services.bundle_availability).
+	"""
+	if not item_codes or not warehouse:
+		return {}
+
+	bundle_codes = get_bundle_codes(item_codes)
+	if not bundle_codes:
+		return {}
+
+	availability = get_cached_availability(bundle_codes, warehouse)
+	missing = [code for code in bundle_codes if code not in availability]
+	if missing:
+		calculated = _calculate_bundle_availability_bulk(missing, warehouse)
+		fresh = {code: calculated.get(code) for code in missing}
+		store_availability(warehouse, fresh)
+		availability.update(fresh)
+
+	return {code: qty for code, qty in availability.items() if qty is not None}
+
+
 def _get_bundle_warehouse_availability_bulk(bundle_codes, warehouses):
 	"""
 	Calculate Product Bundle availability across multiple warehouses efficiently.
-	
+
+	Component definitions come from the cached bundle definitions and
+	component stock from the item x warehouse stock matrix, so no query runs
+	unless one of them has to be (re)loaded.
+
 	Args:
 		bundle_codes (list): List of bundle item codes
 		warehouses (list): List of warehouse dicts with 'name' key
-		
+
 	Returns:
 		dict: Nested mapping of bundle_code -> warehouse_name -> available_qty
 			  Example: {
@@ -908,118 +1067,67 @@ def _get_bundle_warehouse_availability_bulk(bundle_codes, warehouses):
 	"""
 	if not bundle_codes or not warehouses:
 		return {}
-	
+
 	warehouse_names = [w["name"] if isinstance(w, dict) else w for w in warehouses]
-	
-	# ===========================================================================
-	# Fetch Bundle Component Definitions (once for all bundles)
-	# ===========================================================================
-	pb = DocType("Product Bundle")
-	pbi = DocType("Product Bundle Item")
-	
-	bundle_components = (
-		frappe.qb.from_(pb)
-		.inner_join(pbi).on(pbi.parent == pb.name)
-		.select(
-			pb.new_item_code.as_("bundle_code"),
-			pbi.item_code.as_("component_code"),
-			pbi.qty.as_("required_qty")
-		)
-		.where(pb.new_item_code.isin(bundle_codes))
-		.run(as_dict=True)
-	)
-	
-	if not bundle_components:
+
+	bundles_map = get_bundle_definitions(bundle_codes)
+	if not bundles_map:
 		return {}
 
-	component_codes = list(set(c["component_code"] for c in bundle_components))
-	warehouse_resolution_map = {}
-	all_resolved_warehouses = set()
-	
-	for wh_name in warehouse_names:
-		resolved = [wh_name]
-		if frappe.db.get_value("Warehouse", wh_name, "is_group"):
-			children = frappe.db.get_descendants("Warehouse", wh_name)
-			if children:
-				resolved = children
-		warehouse_resolution_map[wh_name] = resolved
-		all_resolved_warehouses.update(resolved)
-	
-	# ===========================================================================
-	# Fetch Component Stock Across All Warehouses (single bulk query)
-	# ===========================================================================
-	bin = DocType("Bin")
-	
-	component_stock_data = (
-		frappe.qb.from_(bin)
-		.select(
-			bin.item_code,
-			bin.warehouse,
-			fn.Coalesce(fn.Sum(bin.actual_qty - bin.reserved_qty), 0).as_("available_qty")
-		)
-		.where(bin.item_code.isin(component_codes))
-		.where(bin.warehouse.isin(list(all_resolved_warehouses)))
-		.groupby(bin.item_code, bin.warehouse)
-		.run(as_dict=True)
-	)
-	
-	# Build lookup: (item_code, warehouse) -> available_qty
-	# For group warehouses, sum stock from all child warehouses
-	component_stock_map = defaultdict(lambda: defaultdict(float))
-	for row in component_stock_data:
-		component_stock_map[row["item_code"]][row["warehouse"]] = flt(row["available_qty"])
-	
-	# ===========================================================================
-	# Calculate Bundle Availability Per Warehouse
-	# ===========================================================================
-	# For each bundle and each warehouse, calculate availability
-	# Availability = min(floor(component_available / component_required)) across all components
+	component_codes = {component for components in bundles_map.values() for component, _qty in components}
+	matrix = get_stock_matrix(component_codes)
+
+	# Availability = min(floor(component_available / component_required)) across all components,
+	# with available = actual - reserved summed over the warehouse's leaves (group support)
 	result = defaultdict(dict)
-	
-	# Group components by bundle (build once, reuse for all warehouses)
-	bundles_map = defaultdict(list)
-	for comp in bundle_components:
-		bundles_map[comp["bundle_code"]].append(comp)
-	
-	# Calculate availability for each bundle in each warehouse
 	for wh_name in warehouse_names:
-		resolved_whs = warehouse_resolution_map[wh_name]
-		
+		resolved_whs = expand_group("Warehouse", wh_name) or [wh_name]
+
 		for bundle_code, components in bundles_map.items():
 			min_possible = None
-			
-			for comp in components:
-				component_code = comp["component_code"]
-				required_qty = flt(comp["required_qty"])
-				
+
+			for component_code, required_qty in components:
+				required_qty = flt(required_qty)
 				if required_qty <= 0:
 					continue
-				
-				# Sum stock across all resolved warehouses (for group warehouse support)
+
+				bins = matrix.get(component_code, {})
 				total_available = sum(
-					component_stock_map[component_code].get(wh, 0)
-					for wh in resolved_whs
+					flt(bins[wh][0]) - flt(bins[wh][1]) for wh in resolved_whs if wh in bins
 				)
-				
+
 				# Calculate how many bundles this component can supply
-				possible = int(total_available / required_qty) if required_qty > 0 else 0
-				
+				possible = int(total_available / required_qty)
+
 				# Track minimum (most constrained component)
-				if min_possible is None:
-					min_possible = possible
-				else:
-					min_possible = min(min_possible, possible)
-			
+				min_possible = possible if min_possible is None else min(min_possible, possible)
+
 			# Only include if bundle is available (min_possible > 0)
 			if min_possible is not None and min_possible > 0:
 				result[bundle_code][wh_name] = min_possible
-	
+
 	return dict(result)
 
 
 @frappe.whitelist()
-def get_items(pos_profile, search_term=None, item_group=None, start=0, limit=20, include_variants=0):
-	"""Get items for POS with stock, price, and tax details"""
+def get_items(
+	pos_profile,
+	search_term=None,
+	item_group=None,
+	start=0,
+	limit=20,
+	include_variants=0,
+	use_cursor=0,
+	cursor=None,
+):
+	"""
+	Get items for POS with stock, price, and tax details.
+
+	With use_cursor=1 the result is {"items": [...], "next_cursor": token | None}
+	and pages are fetched by passing the previous `next_cursor` back as `cursor`.
+	Keyset paging only applies to browsing; searches are relevance-ordered and
+	keep using `start`, returning next_cursor=None.
+	"""
 	try:
 		pos_profile_doc = frappe.get_cached_doc("POS Profile", pos_profile)
 
@@ -1070,6 +1178,14 @@ def get_items(pos_profile, search_term=None, item_group=None, start=0, limit=20,
 			params.extend([f"%{word}%" for word in search_words])
 			params.append(f"%{effective_search_term}%")  # For barcode matching
 
+			# Narrow to items whose code, name or barcode words start with the search words,
+			# so the LIKEs above only run on those rows. None means the index can't help
+			# (still building, or every word is one character) and the LIKEs scan as before.
+			index_condition = get_search_condition(effective_search_term, pos_profile_doc.company)
+			if index_condition:
+				conditions.append(index_condition[0])
+				params.extend(index_condition[1])
+
 			# Relevance scoring with case-insensitive comparison
 			# Exact barcode match gets highest priority, use MAX() for grouping
 			prefix_pattern = f"{effective_search_term}%"
@@ -1091,23 +1207,29 @@ def get_items(pos_profile, search_term=None, item_group=None, start=0, limit=20,
 			score_params = []
 			order_by = "i.item_name ASC"
 
-		where_clause = " AND ".join(conditions)
-
-		query = f"""
-			SELECT {item_columns},
-				GROUP_CONCAT(DISTINCT ib.barcode) as barcode,
-				GROUP_CONCAT(DISTINCT ib.uom) as barcode_uoms
-			FROM `tabItem` i
-			LEFT JOIN `tabItem Barcode` ib ON ib.parent = i.name
-			WHERE {where_clause}
-			GROUP BY {group_by_columns}
-			ORDER BY {order_by}
-			LIMIT %s OFFSET %s
-		"""
+		# Keyset paging needs a stable (item_name, name) order, so searches keep OFFSET
+		is_search = bool(effective_search_term and effective_search_term.strip())
+		keyset_mode = bool(int(use_cursor)) and not is_search
+		if keyset_mode:
+			items = _query_item_rows_keyset(conditions, params, _parse_page_cursor(cursor), limit)
+		else:
+			where_clause = " AND ".join(conditions)
+
+			query = f"""
+				SELECT {item_columns},
+					GROUP_CONCAT(DISTINCT ib.barcode) as barcode,
+					GROUP_CONCAT(DISTINCT ib.uom) as barcode_uoms
+				FROM `tabItem` i
+				LEFT JOIN `tabItem Barcode` ib ON ib.parent = i.name
+				WHERE {where_clause}
+				GROUP BY {group_by_columns}
+				ORDER BY {order_by}
+				LIMIT %s OFFSET %s
+			"""
 
-		params.extend(score_params)
-		params.extend([limit, start])
-		items = frappe.db.sql(query, tuple(params), as_dict=1)
+			params.extend(score_params)
+			params.extend([limit, start])
+			items = frappe.db.sql(query, tuple(params), as_dict=1)
 
 		# Prepare maps for enrichment
 		item_codes = [item["item_code"] for item in items]
@@ -1131,24 +1253,11 @@ def get_items(pos_profile, search_term=None, item_group=None, start=0, limit=20,
 				if row.uom:
 					conversion_map[row.parent][row.uom] = row.conversion_factor
 
-		# UOM-specific prices - batch query ALL prices for all items using Query Builder
+		# UOM-specific prices from the shared price matrix, in the profile currency
 		if item_codes:
-			ItemPrice = DocType("Item Price")
-			prices = (
-				frappe.qb.from_(ItemPrice)
-				.select(
-					ItemPrice.item_code,
-					ItemPrice.uom,
-					ItemPrice.price_list_rate
-				)
-				.where(ItemPrice.item_code.isin(item_codes))
-				.where(ItemPrice.price_list == pos_profile_doc.selling_price_list)
-				.orderby(ItemPrice.item_code)
-				.orderby(ItemPrice.uom)
-				.run(as_dict=True)
+			uom_prices_map = get_item_prices(
+				item_codes, pos_profile_doc.selling_price_list, pos_profile_doc.currency
 			)
-			for price in prices:
-				uom_prices_map.setdefault(price["item_code"], {})[price["uom"]] = price["price_list_rate"]
 
 		# Batch query stock for all items at once using Query Builder
 		stock_map = {}
@@ -1188,7 +1297,7 @@ def get_items(pos_profile, search_term=None, item_group=None, start=0, limit=20,
 		bundle_availability_map = {}
 		if item_codes and pos_profile_doc.warehouse:
 			# Bulk calculate availability for all items (bundles auto-detected)
-			bundle_availability_map = _calculate_bundle_availability_bulk(
+			bundle_availability_map = _get_bundle_availability(
 				item_codes,
 				pos_profile_doc.warehouse
 			)
@@ -1215,67 +1324,27 @@ def get_items(pos_profile, search_term=None, item_group=None, start=0, limit=20,
 				for attr in attributes:
 					attributes_map.setdefault(attr["parent"], {})[attr["attribute"]] = attr["attribute_value"]
 
+		# "From" prices for templates without their own price, one grouped query per page
+		unpriced_templates = [
+			item["item_code"] for item in items
+			if item.get("has_variants") and not uom_prices_map.get(item["item_code"])
+		]
+		min_variant_price_map = _get_min_variant_prices(
+			unpriced_templates, pos_profile_doc.selling_price_list, pos_profile_doc.currency
+		)
+
 		# Enrich items with price, stock, barcode, and UOM data
 		for item in items:
 			stock_uom = item.get("stock_uom")
 
-			# Use pre-loaded price map instead of per-item queries
-			price_row = None
-			item_prices = uom_prices_map.get(item["item_code"], {})
-
-			# 1) Try price explicitly for stock UOM (preferred)
-			if stock_uom and stock_uom in item_prices:
-				price_row = {"price_list_rate": item_prices[stock_uom], "uom": stock_uom}
-
-			# 2) If not found, try any price for the item (and capture its UOM)
-			elif item_prices:
-				# Get first available price
-				first_uom = next(iter(item_prices.keys()))
-				price_row = {"price_list_rate": item_prices[first_uom], "uom": first_uom}
-
-			# 3) If still not found and it's a template, derive min variant price
-			derived_price = None
-			if not price_row and item.get("has_variants"):
-				ItemPrice = DocType("Item Price")
-				Item = DocType("Item")
-				variant_prices = (
-					frappe.qb.from_(ItemPrice)
-					.inner_join(Item).on(Item.name == ItemPrice.item_code)
-					.select(fn.Min(ItemPrice.price_list_rate).as_("min_price"))
-					.where(Item.variant_of == item["item_code"])
-					.where(ItemPrice.price_list == pos_profile_doc.selling_price_list)
-					.where(Item.disabled == 0)
-					.run(as_dict=True)
-				)
-				derived_price = (
-					variant_prices[0]["min_price"]
-					if variant_prices and variant_prices[0].get("min_price")
-					else None
-				)
+			# 1) Stock UOM price, else the first priced UOM converted to stock UOM
+			display_rate, display_uom = get_display_price(
+				uom_prices_map.get(item["item_code"], {}), stock_uom, conversion_map[item["item_code"]]
+			)
 
-			# Finalize display price & display UOM
-			display_rate = 0.0
-			display_uom = stock_uom
-
-			if price_row:
-				raw_rate = flt(price_row.get("price_list_rate") or 0)
-				price_uom = price_row.get("uom") or stock_uom
-				if price_uom and stock_uom and price_uom != stock_uom:
-					# convert to per-stock-UOM if possible
-					cf = flt(conversion_map[item["item_code"]].get(price_uom) or 0)
-					if cf:
-						display_rate = raw_rate / cf
-						display_uom = stock_uom
-					else:
-						# no conversion available: show as is (price UOM)
-						display_rate = raw_rate
-						display_uom = price_uom
-				else:
-					display_rate = raw_rate
-					display_uom = stock_uom
-			elif derived_price is not None:
-				display_rate = flt(derived_price)
-				display_uom = stock_uom
+			# 2) If not found and it's a template, use the min variant price
+			if display_rate is None:
+				display_rate = flt(min_variant_price_map.get(item["item_code"])) if item.get("has_variants") else 0.0
 
 			item["rate"] = display_rate
 			item["price_list_rate"] = display_rate
@@ -1342,6 +1411,9 @@ def get_items(pos_profile, search_term=None, item_group=None, start=0, limit=20,
 			if item.get("variant_of") and item["item_code"] in attributes_map:
 				item["attributes"] = attributes_map[item["item_code"]]
 
+		# Grid-sized thumbnails alongside the original image
+		attach_thumbnails(items)
+
 		# Apply resolved barcode data (weighted/priced) to the first matching item
 		if resolved_barcode_data and items:
 			from pos_next.services.barcode import compute_resolved_item_data
@@ -1352,14 +1424,294 @@ def get_items(pos_profile, search_term=None, item_group=None, start=0, limit=20,
 			if resolved_item_data:
 				items[0].update(resolved_item_data)
 
+		if int(use_cursor):
+			return {"items": items, "next_cursor": _next_page_cursor(items, limit) if keyset_mode else None}
+
 		return items
 	except Exception as e:
 		frappe.log_error(frappe.get_traceback(), "Get Items Error")
 		frappe.throw(_("Error fetching items: {0}").format(str(e)))
 
 
+def _apply_item_groups_filter(conditions, params, item_groups):
+	"""Restrict conditions to the given item groups, expanded to their descendants."""
+	if not item_groups:
+		return
+
+	all_groups = set()
+	for group in item_groups:
+		all_groups.update(_get_item_group_with_descendants(group))
+
+	placeholders = ", ".join(["%s"] * len(all_groups))
+	conditions.append(f"i.item_group IN ({placeholders})")
+	params.extend(all_groups)
+
+
+def _query_item_rows(conditions, params, start=0, limit=None):
+	"""Run the catalog item query (with aggregated barcodes) for the given conditions."""
+	item_columns = ",\n\t".join([f"i.{col}" for col in ITEM_RESULT_FIELDS])
+	group_by_columns = ", ".join([f"i.{col.split(' as ')[0]}" for col in ITEM_RESULT_FIELDS])
+
+	params = list(params)
+	limit_clause = ""
+	if limit is not None:
+		limit_clause = "LIMIT %s OFFSET %s"
+		params.extend([int(limit), int(start)])
+
+	where_clause = " AND ".join(conditions)
+	query = f"""
+		SELECT {item_columns},
+			GROUP_CONCAT(DISTINCT ib.barcode) as barcode,
+			GROUP_CONCAT(DISTINCT ib.uom) as barcode_uoms
+		FROM `tabItem` i
+		LEFT JOIN `tabItem Barcode` ib ON ib.parent = i.name
+		WHERE {where_clause}
+		GROUP BY {group_by_columns}
+		ORDER BY i.item_name ASC
+		{limit_clause}
+	"""
+	return frappe.db.sql(query, tuple(params), as_dict=1)
+
+
+def _query_item_rows_keyset(conditions, params, after=None, limit=2000):
+	"""
+	Keyset-paginated catalog query ordered by (item_name, name).
+
+	Unlike _query_item_rows() there is no OFFSET and no GROUP BY join: each page
+	is a bounded range scan on the (item_name, name) index starting right after
+	the previous page's last row. Barcodes are attached per page afterwards.
+	"""
+	item_columns = ",\n\t".join([f"i.{col}" for col in ITEM_RESULT_FIELDS])
+	conditions = list(conditions)
+	params = list(params)
+
+	if after:
+		conditions.append("(i.item_name > %s OR (i.item_name = %s AND i.name > %s))")
+		params.extend([after[0], after[0], after[1]])
+
+	params.append(int(limit))
+	where_clause = " AND ".join(conditions)
+	items = frappe.db.sql(
+		f"""
+		SELECT {item_columns}
+		FROM `tabItem` i
+		WHERE {where_clause}
+		ORDER BY i.item_name ASC, i.name ASC
+		LIMIT %s
+		""",
+		tuple(params),
+		as_dict=1,
+	)
+
+	_attach_barcodes(items)
+	return items
+
+
+def _attach_barcodes(items):
+	"""Set `barcode` / `barcode_uoms` the same way the GROUP_CONCAT join does."""
+	if not items:
+		return
+
+	barcodes = frappe.get_all(
+		"Item Barcode",
+		filters={"parent": ["in", [item["item_code"] for item in items]], "parenttype": "Item"},
+		fields=["parent", "barcode", "uom"],
+		order_by="idx asc",
+	)
+	barcode_map = {}
+	for row in barcodes:
+		entry = barcode_map.setdefault(row.parent, {"barcodes": [], "uoms": []})
+		if row.barcode and row.barcode not in entry["barcodes"]:
+			entry["barcodes"].append(row.barcode)
+		if row.uom and row.uom not in entry["uoms"]:
+			entry["uoms"].append(row.uom)
+
+	for item in items:
+		entry = barcode_map.get(item["item_code"], {})
+		item["barcode"] = ",".join(entry.get("barcodes", [])) or None
+		item["barcode_uoms"] = ",".join(entry.get("uoms", [])) or None
+
+
+def _next_page_cursor(items, limit):
+	"""Continuation token for keyset mode, or None when this was the last page."""
+	if not items or len(items) < int(limit):
+		return None
+	last = items[-1]
+	return _encode_cursor([last["item_name"], last["item_code"]])
+
+
+def _parse_page_cursor(cursor):
+	"""Decode a keyset continuation token into its (item_name, name) pair."""
+	if not cursor:
+		return None
+	after = _decode_cursor(cursor)
+	if not isinstance(after, list) or len(after) != 2:
+		frappe.throw(_("Invalid cursor: {0}").format(cursor))
+	return after
+
+
+def _to_columnar(items):
+	"""
+	Encode catalog rows as column arrays with dictionary-encoded repeats.
+
+	Shape:
+		{
+			"format": "columnar",
+			"length": row count,
+			"columns": {column: [value per row]},
+			"dictionaries": {name: [distinct values]},
+		}
+
+	Columns listed in COLUMNAR_DICTIONARY_COLUMNS hold an index into
+	dictionaries[name] (None stays None). item_uoms becomes
+	[[uom_index, conversion_factor], ...] and uom_prices
+	[[uom_index, rate], ...], both indexing dictionaries["uom"]. A column a
+	row doesn't have (e.g. attributes on non-variants) is None for that row.
+	"""
+	dictionaries = {name: [] for name in set(COLUMNAR_DICTIONARY_COLUMNS.values())}
+	positions = {name: {} for name in dictionaries}
+
+	def encode(name, value):
+		if value is None:
+			return None
+		index = positions[name].get(value)
+		if index is None:
+			index = positions[name][value] = len(dictionaries[name])
+			dictionaries[name].append(value)
+		return index
+
+	column_names = list(dict.fromkeys(key for item in items for key in item))
+	columns = {name: [] for name in column_names}
+
+	for item in items:
+		for name in column_names:
+			value = item.get(name)
+			if name in COLUMNAR_DICTIONARY_COLUMNS:
+				value = encode(COLUMNAR_DICTIONARY_COLUMNS[name], value)
+			elif name == "item_uoms" and value is not None:
+				value = [[encode("uom", u.get("uom")), u.get("conversion_factor")] for u in value]
+			elif name == "uom_prices" and value is not None:
+				value = [[encode("uom", uom), rate] for uom, rate in value.items()]
+			columns[name].append(value)
+
+	return {
+		"format": "columnar",
+		"length": len(items),
+		"columns": columns,
+		"dictionaries": dictionaries,
+	}
+
+
+def _enrich_items_bulk(items, pos_profile_doc, exclude_variants=True):
+	"""
+	Attach prices, stock, UOMs and variant attributes to catalog rows in bulk.
+
+	Shared by every bulk catalog endpoint so full loads and delta syncs
+	always produce identically shaped items.
+	"""
+	if not items:
+		return items
+
+	item_codes = [item["item_code"] for item in items]
+	uom_map = {}
+	conversion_map = defaultdict(dict)
+
+	# UOM conversions
+	conversions = frappe.get_all(
+		"UOM Conversion Detail",
+		filters={"parent": ["in", item_codes]},
+		fields=["parent", "uom", "conversion_factor"],
+	)
+	for row in conversions:
+		uom_map.setdefault(row.parent, []).append(
+			{"uom": row.uom, "conversion_factor": row.conversion_factor}
+		)
+		if row.uom:
+			conversion_map[row.parent][row.uom] = row.conversion_factor
+
+	# Prices from the shared price matrix, in the profile currency
+	uom_prices_map = get_item_prices(
+		item_codes, pos_profile_doc.selling_price_list, pos_profile_doc.currency
+	)
+
+	# Stock
+	warehouse = pos_profile_doc.warehouse
+	stock_map = {}
+	if warehouse:
+		warehouses = expand_group("Warehouse", warehouse)
+
+		Bin = DocType("Bin")
+		stock_data = (
+			frappe.qb.from_(Bin)
+			.select(Bin.item_code, fn.Sum(Bin.actual_qty).as_("qty"))
+			.where(Bin.item_code.isin(item_codes))
+			.where(Bin.warehouse.isin(warehouses))
+			.groupby(Bin.item_code)
+			.run(as_dict=True)
+		)
+		stock_map = {s.item_code: flt(s.qty) for s in stock_data}
+
+	# Variant attributes (only when variants are included)
+	attributes_map = {}
+	if not exclude_variants:
+		variant_codes = [item["item_code"] for item in items if item.get("variant_of")]
+		if variant_codes:
+			attributes = frappe.get_all(
+				"Item Variant Attribute",
+				filters={"parent": ["in", variant_codes]},
+				fields=["parent", "attribute", "attribute_value"],
+			)
+			for attr in attributes:
+				attributes_map.setdefault(attr["parent"], {})[attr["attribute"]] = attr["attribute_value"]
+
+	# Enrich items
+	for item in items:
+		item_code = item["item_code"]
+		stock_uom = item.get("stock_uom")
+
+		# Price
+		prices = uom_prices_map.get(item_code, {})
+		rate, display_uom = get_display_price(prices, stock_uom, conversion_map[item_code])
+		item["rate"] = rate or 0
+		item["price_list_rate"] = item["rate"]
+		item["uom"] = display_uom
+		item["price_uom"] = display_uom
+		item["conversion_factor"] = 1
+		item["price_list_rate_price_uom"] = item["rate"]
+
+		# Stock
+		item["actual_qty"] = stock_map.get(item_code, 0)
+		item["warehouse"] = warehouse
+
+		# UOMs
+		all_uoms = uom_map.get(item_code, []) or []
+		item["item_uoms"] = [u for u in all_uoms if u.get("uom") != stock_uom]
+		item["uom_prices"] = prices
+
+		# Variant attributes
+		if item.get("variant_of") and item_code in attributes_map:
+			item["attributes"] = attributes_map[item_code]
+
+	# Grid-sized thumbnails alongside the original image
+	attach_thumbnails(items)
+
+	return items
+
+
 @frappe.whitelist()
-def get_items_bulk(pos_profile, item_groups=None, start=0, limit=2000, include_variants=0):
+@single_flight()
+def get_items_bulk(
+	pos_profile,
+	item_groups=None,
+	start=0,
+	limit=2000,
+	include_variants=0,
+	use_cursor=0,
+	cursor=None,
+	response_format=None,
+	since_version=None,
+	**kwargs,
+):
 	"""
 	Fetch items from multiple item groups in a SINGLE query.
 	Eliminates N+1 problem where frontend was making one API call per group.
@@ -1367,150 +1719,350 @@ def get_items_bulk(pos_profile, item_groups=None, start=0, limit=2000, include_v
 	Args:
 		pos_profile: POS Profile name
 		item_groups: JSON array of item group names (optional - if empty, fetch all)
-		start: Offset for pagination (default 0)
+		start: Offset for pagination (default 0, ignored in cursor mode)
 		limit: Max items to return (default 2000)
 		include_variants: If 1, include variant items (for offline caching)
+		use_cursor: If 1, page by continuation token instead of offset and
+			return {"items": [...], "next_cursor": token | None}
+		cursor: `next_cursor` from the previous page (cursor mode only)
+		response_format: "columnar" to return the items as _to_columnar()
+			output instead of a list of dicts (in cursor mode, as the "items"
+			value); the older ``format`` argument is still accepted
+		since_version: Catalog version from a previous reply; when passed the
+			result is wrapped by versioned_response() and comes back as
+			not_modified if the catalog hasn't changed for the same arguments
+			(prices have validity dates, so the version also changes at
+			midnight). Stock is not part of the catalog version: the
+			actual_qty embedded in the items is as of the last full reply, and
+			after not_modified the client keeps its stock current through the
+			stock endpoints and realtime updates.
 	"""
+	response_format = response_format or kwargs.get("format")
+	if since_version is not None:
+		return versioned_response(
+			"catalog",
+			pos_profile,
+			since_version,
+			lambda: get_items_bulk(
+				pos_profile,
+				item_groups,
+				start,
+				limit,
+				include_variants,
+				use_cursor,
+				cursor,
+				response_format=response_format,
+			),
+			nowdate(),
+			item_groups,
+			start,
+			limit,
+			include_variants,
+			use_cursor,
+			cursor,
+			response_format,
+		)
+
 	try:
 		if isinstance(item_groups, str):
 			item_groups = json.loads(item_groups) if item_groups else []
 
+		columnar = response_format == "columnar"
+
 		pos_profile_doc = frappe.get_cached_doc("POS Profile", pos_profile)
 
 		# Build base conditions using shared helper
 		exclude_variants = not int(include_variants)
 		conditions, params = _build_item_base_conditions(pos_profile_doc, exclude_variants=exclude_variants)
+		_apply_item_groups_filter(conditions, params, item_groups)
 
-		if item_groups:
-			# Expand all groups to include their descendants
-			all_groups = set()
-			for group in item_groups:
-				all_groups.update(_get_item_group_with_descendants(group))
+		if int(use_cursor):
+			items = _query_item_rows_keyset(conditions, params, _parse_page_cursor(cursor), limit)
+			_enrich_items_bulk(items, pos_profile_doc, exclude_variants=exclude_variants)
+			next_cursor = _next_page_cursor(items, limit)
+			return {"items": _to_columnar(items) if columnar else items, "next_cursor": next_cursor}
 
-			placeholders = ", ".join(["%s"] * len(all_groups))
-			conditions.append(f"i.item_group IN ({placeholders})")
-			params.extend(all_groups)
+		items = _query_item_rows(conditions, params, start=start, limit=limit)
 
-		item_columns = ",\n\t".join([f"i.{col}" for col in ITEM_RESULT_FIELDS])
-		group_by_columns = ", ".join([f"i.{col.split(' as ')[0]}" for col in ITEM_RESULT_FIELDS])
-
-		where_clause = " AND ".join(conditions)
-		query = f"""
-			SELECT {item_columns},
-				GROUP_CONCAT(DISTINCT ib.barcode) as barcode,
-				GROUP_CONCAT(DISTINCT ib.uom) as barcode_uoms
-			FROM `tabItem` i
-			LEFT JOIN `tabItem Barcode` ib ON ib.parent = i.name
-			WHERE {where_clause}
-			GROUP BY {group_by_columns}
-			ORDER BY i.item_name ASC
-			LIMIT %s OFFSET %s
-		"""
-		params.append(int(limit))
-		params.append(int(start))
-		items = frappe.db.sql(query, tuple(params), as_dict=1)
+		# Bulk enrichment (same as get_items)
+		items = _enrich_items_bulk(items, pos_profile_doc, exclude_variants=exclude_variants)
+		return _to_columnar(items) if columnar else items
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Get Items Bulk Error")
+		frappe.throw(_("Error fetching items: {0}").format(str(e)))
 
-		if not items:
-			return []
 
-		# Bulk enrichment (same as get_items)
-		item_codes = [item["item_code"] for item in items]
-		conversion_map = defaultdict(dict)
-		uom_map = {}
-		uom_prices_map = {}
+def _get_changed_item_codes(since, price_list):
+	"""
+	Collect item codes touched since the watermark.
 
-		# UOM conversions
-		if item_codes:
-			conversions = frappe.get_all(
-				"UOM Conversion Detail",
-				filters={"parent": ["in", item_codes]},
-				fields=["parent", "uom", "conversion_factor"],
-			)
-			for row in conversions:
-				uom_map.setdefault(row.parent, []).append(
-					{"uom": row.uom, "conversion_factor": row.conversion_factor}
-				)
-				if row.uom:
-					conversion_map[row.parent][row.uom] = row.conversion_factor
+	An item counts as changed when its own row or any of the rows the catalog
+	payload is built from (barcodes, UOM conversions, variant attributes and
+	prices in the profile's price list) were modified after `since`.
 
-		# Prices
-		price_list = pos_profile_doc.selling_price_list
-		if price_list and item_codes:
-			ItemPrice = DocType("Item Price")
-			prices = (
-				frappe.qb.from_(ItemPrice)
-				.select(ItemPrice.item_code, ItemPrice.uom, ItemPrice.price_list_rate)
-				.where(ItemPrice.price_list == price_list)
-				.where(ItemPrice.item_code.isin(item_codes))
-				.where(ItemPrice.selling == 1)
-				.run(as_dict=True)
-			)
-			for p in prices:
-				uom_prices_map.setdefault(p.item_code, {})[p.uom] = flt(p.price_list_rate)
+	Returns:
+		tuple: (changed_codes, deleted_codes) as sets
+	"""
+	changed = set(
+		frappe.db.sql_list(
+			"""
+			SELECT name FROM `tabItem` WHERE modified > %(since)s
+			UNION
+			SELECT parent FROM `tabItem Barcode`
+			WHERE modified > %(since)s AND parenttype = 'Item'
+			UNION
+			SELECT parent FROM `tabUOM Conversion Detail`
+			WHERE modified > %(since)s AND parenttype = 'Item'
+			UNION
+			SELECT parent FROM `tabItem Variant Attribute`
+			WHERE modified > %(since)s AND parenttype = 'Item'
+			UNION
+			SELECT item_code FROM `tabItem Price`
+			WHERE modified > %(since)s AND price_list = %(price_list)s
+			""",
+			{"since": since, "price_list": price_list or ""},
+		)
+	)
 
-		# Stock
-		warehouse = pos_profile_doc.warehouse
-		stock_map = {}
-		if warehouse and item_codes:
-			warehouses = [warehouse]
-			if frappe.db.get_value("Warehouse", warehouse, "is_group"):
-				warehouses = frappe.db.get_descendants("Warehouse", warehouse) or []
+	# Hard deletes leave no row behind - recover them from Deleted Document
+	deleted = set()
+	deleted_docs = frappe.get_all(
+		"Deleted Document",
+		filters={"deleted_doctype": ["in", ["Item", "Item Price"]], "creation": [">", since]},
+		fields=["deleted_doctype", "deleted_name", "data"],
+	)
+	for row in deleted_docs:
+		if row.deleted_doctype == "Item":
+			deleted.add(row.deleted_name)
+			continue
 
-			Bin = DocType("Bin")
-			stock_data = (
-				frappe.qb.from_(Bin)
-				.select(Bin.item_code, fn.Sum(Bin.actual_qty).as_("qty"))
-				.where(Bin.item_code.isin(item_codes))
-				.where(Bin.warehouse.isin(warehouses))
-				.groupby(Bin.item_code)
-				.run(as_dict=True)
-			)
-			stock_map = {s.item_code: flt(s.qty) for s in stock_data}
+		# A deleted price changes the item's uom_prices - resend the item
+		try:
+			data = json.loads(row.data or "{}")
+		except ValueError:
+			continue
+		if data.get("item_code") and data.get("price_list") == price_list:
+			changed.add(data["item_code"])
 
-		# Variant attributes (only when variants are included)
-		attributes_map = {}
-		if not exclude_variants:
-			variant_codes = [item["item_code"] for item in items if item.get("variant_of")]
-			if variant_codes:
-				attributes = frappe.get_all(
-					"Item Variant Attribute",
-					filters={"parent": ["in", variant_codes]},
-					fields=["parent", "attribute", "attribute_value"],
-				)
-				for attr in attributes:
-					attributes_map.setdefault(attr["parent"], {})[attr["attribute"]] = attr["attribute_value"]
+	return changed - deleted, deleted
 
-		# Enrich items
-		for item in items:
-			item_code = item["item_code"]
-			stock_uom = item.get("stock_uom")
 
-			# Price
-			prices = uom_prices_map.get(item_code, {})
-			item["rate"] = prices.get(stock_uom, 0)
-			item["price_list_rate"] = item["rate"]
-			item["uom"] = stock_uom
-			item["price_uom"] = stock_uom
-			item["conversion_factor"] = 1
-			item["price_list_rate_price_uom"] = item["rate"]
+def _catalog_scope_changed(pos_profile_doc, since):
+	"""True if the profile or the item group tree changed after ``since``."""
+	return get_datetime(pos_profile_doc.modified) > since or bool(
+		frappe.db.exists("Item Group", {"modified": [">", since]})
+	)
 
-			# Stock
-			item["actual_qty"] = stock_map.get(item_code, 0)
-			item["warehouse"] = warehouse
 
-			# UOMs
-			all_uoms = uom_map.get(item_code, []) or []
-			item["item_uoms"] = [u for u in all_uoms if u.get("uom") != stock_uom]
-			item["uom_prices"] = prices
+def _get_out_of_scope_item_codes(conditions, params, exclude_variants):
+	"""
+	Codes of enabled sales items outside the catalog ``conditions``, or None if there are too many.
 
-			# Variant attributes
-			if item.get("variant_of") and item_code in attributes_map:
-				item["attributes"] = attributes_map[item_code]
+	These are the items a client may hold from before a scope change; items
+	disabled or made non-sales since the last sync are caught as changed.
+	"""
+	variant_condition = "AND IFNULL(i.variant_of, '') = ''" if exclude_variants else ""
+	codes = frappe.db.sql_list(
+		f"""
+		SELECT i.name
+		FROM `tabItem` i
+		WHERE i.disabled = 0
+			AND i.is_sales_item = 1
+			{variant_condition}
+			AND NOT COALESCE(({" AND ".join(conditions)}), FALSE)
+		LIMIT %s
+		""",
+		(*params, DELTA_SYNC_MAX_ITEMS + 1),
+	)
+	if len(codes) > DELTA_SYNC_MAX_ITEMS:
+		return None
+	return set(codes)
 
-		return items
+
+@frappe.whitelist()
+def get_items_delta(pos_profile, since=None, item_groups=None, include_variants=0):
+	"""
+	Return only the catalog items that changed since a previous sync.
+
+	Terminals keep the `cursor` from each response and pass it back as `since`
+	on the next refresh. The item set is filtered with exactly the same
+	conditions as get_items_bulk(), so applying the delta to a cache built
+	from a full load yields the same result as a fresh full load.
+
+	Args:
+		pos_profile: POS Profile name
+		since: Cursor returned by a previous call (omit for the first sync)
+		item_groups: JSON array of item group names (same as get_items_bulk)
+		include_variants: If 1, include variant items (same as get_items_bulk)
+
+	Returns:
+		dict: {
+			"items": list of upserted items (get_items_bulk shape),
+			"removed": item codes to drop (deleted, disabled or out of scope,
+				including items left out by a POS Profile or item group
+				change; codes the client doesn't hold can be ignored),
+			"thumbnails": {item_code: thumbnail URL or None} for items not in "items"
+				whose thumbnail was written since the cursor (as far back
+				as the thumbnail log reaches),
+			"cursor": token to pass as `since` next time,
+			"full_resync": True when the client must reload via get_items_bulk
+		}
+	"""
+	try:
+		if isinstance(item_groups, str):
+			item_groups = json.loads(item_groups) if item_groups else []
+
+		pos_profile_doc = frappe.get_cached_doc("POS Profile", pos_profile)
+
+		# Take the new watermark before reading so nothing committed meanwhile is skipped
+		watermark = add_to_date(now_datetime(), seconds=-DELTA_SYNC_OVERLAP_SECONDS)
+		cursor = _encode_cursor({"since": watermark})
+		response = {"items": [], "removed": [], "thumbnails": {}, "cursor": cursor, "full_resync": False}
+
+		if not since:
+			response["full_resync"] = True
+			return response
+
+		since_ts = get_datetime(_decode_cursor(since).get("since"))
+		changed, deleted = _get_changed_item_codes(since_ts, pos_profile_doc.selling_price_list)
+		if len(changed) > DELTA_SYNC_MAX_ITEMS:
+			response["full_resync"] = True
+			return response
+
+		exclude_variants = not int(include_variants)
+		conditions, params = _build_item_base_conditions(pos_profile_doc, exclude_variants=exclude_variants)
+		_apply_item_groups_filter(conditions, params, item_groups)
+
+		# A profile or item group change can drop unchanged items out of scope
+		if _catalog_scope_changed(pos_profile_doc, since_ts):
+			out_of_scope = _get_out_of_scope_item_codes(conditions, params, exclude_variants)
+			if out_of_scope is None:
+				response["full_resync"] = True
+				return response
+			deleted |= out_of_scope
+			changed -= out_of_scope
+
+		response["removed"] = sorted(deleted)
+
+		# Thumbnails written since then don't touch the Item; send just their URLs so a
+		# burst of new thumbnails never pushes clients into a full resync
+		thumbnail_codes = get_items_with_new_thumbnails(since_ts) - changed - deleted
+		response["thumbnails"] = get_thumbnail_urls(thumbnail_codes)
+
+		if not changed:
+			return response
+
+		conditions.append(f"i.name IN ({', '.join(['%s'] * len(changed))})")
+		params.extend(changed)
+
+		items = _query_item_rows(conditions, params)
+		_enrich_items_bulk(items, pos_profile_doc, exclude_variants=exclude_variants)
+
+		# Changed items that no longer pass the filters are tombstones
+		in_scope = {item["item_code"] for item in items}
+		response["items"] = items
+		response["removed"] = sorted(deleted | (changed - in_scope))
+		return response
 	except Exception as e:
-		frappe.log_error(frappe.get_traceback(), "Get Items Bulk Error")
-		frappe.throw(_("Error fetching items: {0}").format(str(e)))
+		frappe.log_error(frappe.get_traceback(), "Get Items Delta Error")
+		frappe.throw(_("Error fetching item changes: {0}").format(str(e)))
+
+
+def _ndjson_line(payload):
+	return frappe.as_json(payload, indent=None, separators=(",", ":")) + "\n"
+
+
+def _stream_catalog(site, user, pos_profile, item_groups, exclude_variants, columnar, cursor):
+	"""
+	Generator behind export_items_ndjson.
+
+	Werkzeug iterates the body after the request handler has returned and
+	Frappe has torn down its request context, so the generator opens its own
+	site connection as the requesting user.
+	"""
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		frappe.set_user(user)
+		pos_profile_doc = frappe.get_cached_doc("POS Profile", pos_profile)
+		conditions, params = _build_item_base_conditions(pos_profile_doc, exclude_variants=exclude_variants)
+		_apply_item_groups_filter(conditions, params, item_groups)
+
+		yield _ndjson_line({"type": "start", "cursor": cursor})
+
+		count = 0
+		after = None
+		while True:
+			items = _query_item_rows_keyset(conditions, params, after, EXPORT_CHUNK_SIZE)
+			if not items:
+				break
+
+			_enrich_items_bulk(items, pos_profile_doc, exclude_variants=exclude_variants)
+			count += len(items)
+			yield _ndjson_line({"type": "items", "items": _to_columnar(items) if columnar else items})
+
+			if len(items) < EXPORT_CHUNK_SIZE:
+				break
+			after = [items[-1]["item_name"], items[-1]["item_code"]]
+
+		yield _ndjson_line({"type": "end", "count": count})
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Export Items NDJSON Error")
+		yield _ndjson_line({"type": "error", "message": _("Catalog export failed")})
+	finally:
+		frappe.destroy()
+
+
+@frappe.whitelist()
+def export_items_ndjson(pos_profile, item_groups=None, include_variants=0, response_format=None, **kwargs):
+	"""
+	Stream the whole POS-Profile-scoped catalog as newline-delimited JSON.
+
+	Meant for provisioning a new terminal in one request instead of
+	get_items_count + paging get_items_bulk. Each line is one JSON object:
+
+		{"type": "start", "cursor": ...}  # pass to get_items_delta as `since` afterwards
+		{"type": "items", "items": [...]}  # EXPORT_CHUNK_SIZE items, get_items_bulk shape
+		{"type": "end", "count": N}
+		{"type": "error", "message": ...}  # instead of "end" if the export failed
+
+	Items are read in keyset chunks on (item_name, name) and enriched per
+	chunk, so server memory stays flat and the client can store each line as
+	it arrives.
+
+	Args:
+		pos_profile: POS Profile name
+		item_groups: JSON array of item group names (same as get_items_bulk)
+		include_variants: If 1, include variant items (same as get_items_bulk)
+		response_format: "columnar" to send each chunk's items as
+			_to_columnar() output; the older ``format`` argument is still accepted
+	"""
+	from werkzeug.wrappers import Response
+
+	if isinstance(item_groups, str):
+		item_groups = json.loads(item_groups) if item_groups else []
+
+	# Fail fast in the request context so a bad profile is a normal error response
+	frappe.get_cached_doc("POS Profile", pos_profile)
+
+	# Same watermark rule as get_items_delta, taken before the first read
+	watermark = add_to_date(now_datetime(), seconds=-DELTA_SYNC_OVERLAP_SECONDS)
+
+	body = _stream_catalog(
+		frappe.local.site,
+		frappe.session.user,
+		pos_profile,
+		item_groups,
+		not int(include_variants),
+		(response_format or kwargs.get("format")) == "columnar",
+		_encode_cursor({"since": watermark}),
+	)
+	return Response(
+		body,
+		mimetype="application/x-ndjson",
+		direct_passthrough=True,
+		headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+	)
 
 
 @frappe.whitelist()
@@ -1518,8 +2070,9 @@ def get_items_count(pos_profile, item_group=None, include_variants=0):
 	"""
 	Get total count of POS-eligible items for progress tracking and smart pagination.
 
-	Uses the same filtering logic as get_items (via _build_item_base_conditions)
-	to ensure consistent results. Lightweight — no enrichment, just COUNT.
+	Served from the cached facet counts (see get_item_facets), which use the
+	same filtering logic as get_items (via _build_item_base_conditions), so
+	switching group tabs doesn't hit the database.
 
 	Args:
 		pos_profile: POS Profile name
@@ -1531,22 +2084,101 @@ def get_items_count(pos_profile, item_group=None, include_variants=0):
 	"""
 	try:
 		pos_profile_doc = frappe.get_cached_doc("POS Profile", pos_profile)
-		exclude_variants = not int(include_variants)
-		conditions, params = _build_item_base_conditions(pos_profile_doc, item_group, exclude_variants=exclude_variants)
-
-		where_clause = " AND ".join(conditions)
-		query = f"""
-			SELECT COUNT(DISTINCT i.name) as total
-			FROM `tabItem` i
-			WHERE {where_clause}
-		"""
-		result = frappe.db.sql(query, tuple(params), as_dict=1)
-		return result[0].total if result else 0
+		facets = _get_item_facets(pos_profile_doc, cint(include_variants))
+		if item_group:
+			return facets["item_groups"].get(item_group, 0)
+		return facets["total"]
 	except Exception as e:
 		frappe.log_error(frappe.get_traceback(), "Get Items Count Error")
 		frappe.throw(_("Error fetching items count: {0}").format(str(e)))
 
 
+@frappe.whitelist()
+def get_item_facets(pos_profile, include_variants=0):
+	"""
+	Get item counts of a POS Profile's catalog, overall and per facet, in one call.
+
+	Args:
+		pos_profile: POS Profile name
+		include_variants: If 1, count variant items too
+
+	Returns:
+		dict: {
+			"total": int,
+			"item_groups": {item_group: count including descendant groups},
+			"brands": {brand: count} (items without a brand are left out),
+			"variants": {"templates": int, "variants": int, "standalone": int},
+		}
+	"""
+	try:
+		pos_profile_doc = frappe.get_cached_doc("POS Profile", pos_profile)
+		return _get_item_facets(pos_profile_doc, cint(include_variants))
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Get Item Facets Error")
+		frappe.throw(_("Error fetching item facets: {0}").format(str(e)))
+
+
+def _get_item_facets(pos_profile_doc, include_variants):
+	"""
+	Facet counts cached under the catalog version, so Item and profile changes invalidate them.
+
+	Only changes that run doc events bump that version; see content_version for direct writes.
+	"""
+	version = get_version("catalog", pos_profile_doc.name)
+	key = ITEM_FACETS_KEY.format(pos_profile_doc.name, include_variants, version)
+
+	facets = frappe.cache().get_value(key)
+	if facets is None:
+		facets = _compute_item_facets(pos_profile_doc, include_variants)
+		frappe.cache().set_value(key, facets, expires_in_sec=ITEM_FACETS_TTL)
+	return facets
+
+
+def _compute_item_facets(pos_profile_doc, include_variants):
+	conditions, params = _build_item_base_conditions(pos_profile_doc, exclude_variants=not include_variants)
+	where_clause = " AND ".join(conditions)
+	rows = frappe.db.sql(
+		f"""
+		SELECT i.item_group, i.brand, i.has_variants,
+			IF(IFNULL(i.variant_of, '') = '', 0, 1) AS is_variant,
+			COUNT(*) AS count
+		FROM `tabItem` i
+		WHERE {where_clause}
+		GROUP BY i.item_group, i.brand, i.has_variants, is_variant
+		""",
+		tuple(params),
+		as_dict=True,
+	)
+
+	facets = {
+		"total": 0,
+		"item_groups": defaultdict(int),
+		"brands": defaultdict(int),
+		"variants": {"templates": 0, "variants": 0, "standalone": 0},
+	}
+	for row in rows:
+		facets["total"] += row.count
+
+		# A group tab lists its descendants' items too, so roll counts up the tree
+		if row.item_group:
+			for group in [row.item_group, *get_ancestors("Item Group", row.item_group)]:
+				facets["item_groups"][group] += row.count
+
+		if row.brand:
+			facets["brands"][row.brand] += row.count
+
+		if row.has_variants:
+			facets["variants"]["templates"] += row.count
+		elif row.is_variant:
+			facets["variants"]["variants"] += row.count
+		else:
+			facets["variants"]["standalone"] += row.count
+
+	facets["item_groups"] = dict(facets["item_groups"])
+	facets["brands"] = dict(facets["brands"])
+	return facets
+
+
 @frappe.whitelist()
 def get_item_details(item_code, pos_profile, customer=None, qty=1, uom=None):  # noqa: ARG001 - customer reserved for future use
 	"""Get detailed item info including price, tax, stock"""
@@ -1598,8 +2230,94 @@ def get_item_details(item_code, pos_profile, customer=None, qty=1, uom=None):  #
 
 
 @frappe.whitelist()
-def get_item_groups(pos_profile):
-	"""Get item groups configured in POS Profile with hierarchy info for filtering."""
+def get_item_details_bulk(pos_profile, items):
+	"""
+	Get detailed item info for a whole cart in one call.
+
+	Args:
+		pos_profile: POS Profile name
+		items: JSON list of {"item_code", "qty", "uom"} (qty and uom optional)
+
+	Returns:
+		list: get_item_details results in input order
+	"""
+	try:
+		if isinstance(pos_profile, str):
+			try:
+				pos_profile = json.loads(pos_profile)
+			except (json.JSONDecodeError, ValueError):
+				pass  # It's already a plain string
+
+		if isinstance(pos_profile, dict):
+			pos_profile = pos_profile.get("name") or pos_profile.get("pos_profile")
+
+		if not pos_profile:
+			frappe.throw(_("POS Profile is required"))
+
+		if isinstance(items, str):
+			items = json.loads(items)
+		if not items:
+			return []
+
+		pos_profile_doc = frappe.get_cached_doc("POS Profile", pos_profile)
+
+		item_codes = list({row.get("item_code") for row in items})
+		flags = {
+			row.name: row
+			for row in frappe.get_all(
+				"Item",
+				filters={"name": ["in", item_codes]},
+				fields=["name", "is_sales_item", "has_batch_no", "has_serial_no", "is_stock_item"],
+			)
+		}
+
+		detail_items = []
+		for row in items:
+			item_code = row.get("item_code")
+			item_flags = flags.get(item_code)
+			if not item_flags:
+				frappe.throw(_("Item {0} not found").format(item_code))
+
+			# Check if item is allowed for sales
+			if not item_flags.is_sales_item:
+				frappe.throw(_("Item {0} is not allowed for sales").format(item_code))
+
+			item = {
+				"item_code": item_code,
+				"has_batch_no": item_flags.has_batch_no,
+				"has_serial_no": item_flags.has_serial_no,
+				"is_stock_item": item_flags.is_stock_item,
+				"pos_profile": pos_profile,
+				"qty": row.get("qty") or 1,
+			}
+			if row.get("uom"):
+				item["uom"] = row["uom"]
+			detail_items.append(item)
+
+		return get_item_detail_bulk(
+			detail_items,
+			warehouse=pos_profile_doc.warehouse,
+			price_list=pos_profile_doc.selling_price_list,
+			company=pos_profile_doc.company,
+		)
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Get Item Details Bulk Error")
+		frappe.throw(_("Error fetching item details: {0}").format(str(e)))
+
+
+@frappe.whitelist()
+@single_flight()
+def get_item_groups(pos_profile, since_version=None):
+	"""
+	Get item groups configured in POS Profile with hierarchy info for filtering.
+
+	Pass `since_version` to get a versioned_response() wrapper instead.
+	"""
+	if since_version is not None:
+		return versioned_response(
+			"item_groups", pos_profile, since_version, lambda: get_item_groups(pos_profile)
+		)
+
 	cache_key = f"pos_item_groups:{pos_profile}"
 	cached = frappe.cache().get_value(cache_key)
 	if cached:
@@ -1658,7 +2376,9 @@ def get_stock_quantities(item_codes, warehouse):
 		warehouse: Warehouse name
 
 	Returns:
-		List of dicts with item_code, warehouse, and actual_qty
+		List of dicts with item_code, warehouse, actual_qty, reserved_qty,
+		cart_reserved_qty (held by carts being rung up) and available_qty
+		(net of both reservations)
 	"""
 	try:
 		# Parse item_codes if it's a JSON string
@@ -1688,11 +2408,8 @@ def get_stock_quantities(item_codes, warehouse):
 			return []
 
 		# Support group warehouses by expanding to leaf warehouses
-		warehouses = [warehouse]
-		if frappe.db.get_value("Warehouse", warehouse, "is_group"):
-			child_warehouses = frappe.db.get_descendants("Warehouse", warehouse) or []
-			# Fallback to original warehouse if no children are returned
-			warehouses = child_warehouses or [warehouse]
+		# Fallback to original warehouse if no children are returned
+		warehouses = expand_group("Warehouse", warehouse) or [warehouse]
 
 		if not warehouses:
 			return []
@@ -1716,7 +2433,10 @@ def get_stock_quantities(item_codes, warehouse):
 		item_stock_map = {row["item_code"]: row for row in stock_rows}
 
 		# Get bundle availability for non-stock items (bulk optimized)
-		bundle_availability_map = _calculate_bundle_availability_bulk(normalized_codes, warehouse)
+		bundle_availability_map = _get_bundle_availability(normalized_codes, warehouse)
+
+		# Stock held by carts being rung up on other terminals
+		cart_reservations = get_cart_reservations(normalized_codes, warehouse)
 
 		# Return stock for all requested items
 		result = []
@@ -1733,14 +2453,16 @@ def get_stock_quantities(item_codes, warehouse):
 				reserved_qty = flt(row["reserved_qty"]) if row else 0.0
 
 			result.append(
-				{
-					"item_code": item_code,
-					"warehouse": warehouse,
-					"actual_qty": actual_qty,
-					"stock_qty": actual_qty,  # Alias for frontend convenience
-					"reserved_qty": reserved_qty,
-					"available_qty": actual_qty - reserved_qty,
-				}
+				apply_cart_reservations(
+					{
+						"item_code": item_code,
+						"warehouse": warehouse,
+						"actual_qty": actual_qty,
+						"stock_qty": actual_qty,  # Alias for frontend convenience
+						"reserved_qty": reserved_qty,
+					},
+					cart_reservations.get(item_code),
+				)
 			)
 
 		return result
@@ -1750,6 +2472,38 @@ def get_stock_quantities(item_codes, warehouse):
 		frappe.throw(_("Error fetching stock quantities: {0}").format(str(e)))
 
 
+@frappe.whitelist()
+def get_stock_changes_since(warehouse, seq=None, epoch=None):
+	"""
+	Replay the realtime stock updates of a warehouse missed by a terminal.
+
+	Every ``pos_stock_update`` event carries the ``epoch`` and ``seq`` of the
+	warehouse's stock feed. A terminal that notices a gap in ``seq`` or
+	reconnects its socket passes back the last ones it applied and gets the
+	latest update of every item changed since.
+
+	Args:
+		warehouse: Warehouse whose room the terminal follows
+		seq: Last sequence number applied; omit to only learn the current one
+		epoch: Epoch of that sequence number
+
+	Returns:
+		dict: {"warehouse", "epoch", "seq", "full_sync", "stock_updates"} -
+			when ``full_sync`` is set the missed changes are past retention and
+			stock must be reloaded with get_stock_quantities
+	"""
+	try:
+		if not warehouse:
+			frappe.throw(_("Warehouse is required"))
+
+		frappe.has_permission("Warehouse", doc=warehouse, throw=True)
+		return get_stock_feed_changes(warehouse, seq, epoch)
+
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Get Stock Changes Error")
+		frappe.throw(_("Error fetching stock changes: {0}").format(str(e)))
+
+
 # =============================================================================
 # WAREHOUSE AVAILABILITY HELPERS
 # =============================================================================
@@ -1761,17 +2515,17 @@ def _get_warehouse_display_name(warehouse_id, warehouse_map, fallback_company=No
 	Fallback order:
 	1. warehouse_name from cached map
 	2. warehouse.name (ID) from cached map
-	3. Fetch from DB if not in map (handles disabled/group warehouses)
+	3. Cached warehouse directory if not in map (handles disabled/group warehouses)
 	4. Use warehouse_id as last resort
 	"""
 	warehouse = warehouse_map.get(warehouse_id)
 	if warehouse:
 		return warehouse.warehouse_name or warehouse.name, warehouse.company
 
-	# Fallback: fetch from DB if not in active warehouse map
-	wh_details = frappe.db.get_value("Warehouse", warehouse_id, ["warehouse_name", "company"], as_dict=True)
+	# Fallback: cached directory of all warehouses (handles disabled/group warehouses)
+	wh_details = get_warehouse_directory().get(warehouse_id)
 	if wh_details:
-		return wh_details.warehouse_name or warehouse_id, wh_details.company
+		return wh_details["warehouse_name"] or warehouse_id, wh_details["company"]
 	return warehouse_id, fallback_company or ""
 
 
@@ -1884,43 +2638,40 @@ def get_item_warehouse_availability(item_code=None, item_codes=None, company=Non
 		# ---------------------------------------------------------------------
 		# STEP 3: Separate Product Bundles from regular stock items
 		# ---------------------------------------------------------------------
-		bundle_set = set(frappe.get_all(
-			"Product Bundle",
-			filters={"new_item_code": ["in", items_to_check]},
-			pluck="new_item_code"
-		) or [])
+		bundle_set = set(get_bundle_codes(items_to_check))
 		regular_items = [i for i in items_to_check if i not in bundle_set]
 
 		result = []
 
 		# ---------------------------------------------------------------------
-		# STEP 4: Query stock for regular items from Bin table
+		# STEP 4: Read stock for regular items from the stock matrix
 		# ---------------------------------------------------------------------
 		if regular_items:
-			bin_tbl = DocType("Bin")
-			query = (
-				frappe.qb.from_(bin_tbl)
-				.select(
-					bin_tbl.warehouse,
-					fn.Sum(bin_tbl.actual_qty).as_("actual_qty"),
-					fn.Sum(bin_tbl.reserved_qty).as_("reserved_qty")
-				)
-				.where(bin_tbl.item_code.isin(regular_items))
-				.where(bin_tbl.warehouse.isin(warehouse_names))
-				.having(fn.Sum(bin_tbl.actual_qty) > 0)
-			)
+			matrix = get_stock_matrix(regular_items)
 
-			# Group by item_code too when multiple items requested
 			if include_item_code:
-				query = query.select(bin_tbl.item_code).groupby(bin_tbl.item_code, bin_tbl.warehouse)
+				# One entry per item and warehouse
+				for code in regular_items:
+					bins = matrix.get(code, {})
+					for wh_name in warehouse_names:
+						actual_qty, reserved_qty = bins.get(wh_name, (0, 0))
+						if actual_qty > 0:
+							result.append(_build_stock_entry(
+								wh_name, actual_qty, reserved_qty, warehouse_map, code, company
+							))
 			else:
-				query = query.groupby(bin_tbl.warehouse)
-
-			for stock in query.run(as_dict=True):
-				result.append(_build_stock_entry(
-					stock.warehouse, stock.actual_qty, stock.reserved_qty,
-					warehouse_map, stock.get("item_code") if include_item_code else None, company
-				))
+				# Template + variants: combined per warehouse
+				for wh_name in warehouse_names:
+					actual_qty = reserved_qty = 0
+					for code in regular_items:
+						qtys = matrix.get(code, {}).get(wh_name)
+						if qtys:
+							actual_qty += qtys[0]
+							reserved_qty += qtys[1]
+					if actual_qty > 0:
+						result.append(_build_stock_entry(
+							wh_name, actual_qty, reserved_qty, warehouse_map, None, company
+						))
 
 		# ---------------------------------------------------------------------
 		# STEP 5: Calculate availability for Product Bundles
@@ -1989,9 +2740,7 @@ def get_product_bundle_availability(item_code, warehouse):
 			return {"available_qty": 0, "components": []}
 
 		# Get warehouses (support group warehouses)
-		warehouses = [warehouse]
-		if frappe.db.get_value("Warehouse", warehouse, "is_group"):
-			warehouses = frappe.db.get_descendants("Warehouse", warehouse) or [warehouse]
+		warehouses = expand_group("Warehouse", warehouse) or [warehouse]
 
 		# Get component stock (use available = actual - reserved)
 		component_codes = [c["item_code"] for c in components]
@@ -2053,7 +2802,8 @@ def get_batch_serial_data_for_items(item_codes, warehouse):
 			{
 				"ITEM-001": {
 					"batch_no_data": [...],
-					"serial_no_data": [...]
+					"serial_no_data": [...],  # first page, see get_serial_numbers
+					"serial_no_count": 120
 				},
 				...
 			}
@@ -2065,7 +2815,6 @@ def get_batch_serial_data_for_items(item_codes, warehouse):
 		if not item_codes or not warehouse:
 			return {}
 
-		today = nowdate()
 		result = {}
 
 		# Get item details to check which items have batch/serial tracking
@@ -2092,48 +2841,27 @@ def get_batch_serial_data_for_items(item_codes, warehouse):
 			result[item_code] = {
 				"batch_no_data": [],
 				"serial_no_data": [],
+				"serial_no_count": 0,
 			}
 
-		# Fetch batch data for batch-tracked items
+		# Fetch batch data for batch-tracked items in one FEFO-ordered query
 		if batch_items:
-			for item_code in batch_items:
-				batch_list = get_batch_qty(warehouse=warehouse, item_code=item_code)
-				if batch_list:
-					for batch in batch_list:
-						if batch.qty > 0 and batch.batch_no:
-							batch_doc = frappe.get_cached_doc("Batch", batch.batch_no)
-							is_not_expired = (
-								str(batch_doc.expiry_date) > str(today)
-								or batch_doc.expiry_date in ["", None]
-							)
-							is_enabled = batch_doc.disabled == 0
-
-							if is_not_expired and is_enabled:
-								result[item_code]["batch_no_data"].append({
-									"batch_no": batch.batch_no,
-									"batch_qty": batch.qty,
-									"expiry_date": str(batch_doc.expiry_date) if batch_doc.expiry_date else None,
-									"manufacturing_date": str(batch_doc.manufacturing_date) if batch_doc.manufacturing_date else None,
-								})
-
-		# Fetch serial data for serial-tracked items in bulk
+			for item_code, batches in get_available_batches(batch_items, warehouse).items():
+				result[item_code]["batch_no_data"] = [
+					{
+						"batch_no": batch["batch_no"],
+						"batch_qty": batch["batch_qty"],
+						"expiry_date": str(batch["expiry_date"]) if batch["expiry_date"] else None,
+						"manufacturing_date": str(batch["manufacturing_date"]) if batch["manufacturing_date"] else None,
+					}
+					for batch in batches
+				]
+
+		# Fetch serial counts and first pages for serial-tracked items in bulk
 		if serial_items:
-			serials = frappe.get_all(
-				"Serial No",
-				filters={
-					"item_code": ["in", serial_items],
-					"status": "Active",
-					"warehouse": warehouse,
-				},
-				fields=["name as serial_no", "item_code", "warehouse"],
-			)
-
-			# Group by item_code
-			for serial in serials:
-				result[serial["item_code"]]["serial_no_data"].append({
-					"serial_no": serial["serial_no"],
-					"warehouse": serial["warehouse"],
-				})
+			for item_code, preview in get_serial_previews(serial_items, warehouse).items():
+				result[item_code]["serial_no_data"] = preview["serials"]
+				result[item_code]["serial_no_count"] = preview["count"]
 
 		return result
 
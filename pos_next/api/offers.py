@@ -15,6 +15,9 @@ import frappe
 from frappe import _
 from frappe.utils import flt, getdate, nowdate
 
+from pos_next.services.content_version import versioned_response
+from pos_next.services.single_flight import single_flight
+
 
 # ============================================================================
 # Constants
@@ -393,16 +396,25 @@ class OfferBuilder:
 # ============================================================================
 
 @frappe.whitelist()
-def get_offers(pos_profile: str) -> List[Dict]:
+@single_flight()
+def get_offers(pos_profile: str, since_version: Optional[str] = None) -> List[Dict]:
 	"""
 	Fetch all auto-applicable offers for the POS profile
 
 	Args:
 		pos_profile: POS Profile name
+		since_version: Offers version from a previous reply; when passed the
+			result is wrapped by versioned_response() (offer validity is
+			date-based, so the version also changes at midnight)
 
 	Returns:
 		List of offer dictionaries
 	"""
+	if since_version is not None:
+		return versioned_response(
+			"offers", pos_profile, since_version, lambda: get_offers(pos_profile), nowdate()
+		)
+
 	try:
 		profile = frappe.get_doc("POS Profile", pos_profile)
 		date = nowdate()
@@ -7,6 +7,7 @@ import frappe
 from frappe import _
 from pos_next.api.utilities import check_user_company
 from pos_next.api.utilities import _parse_list_parameter
+from pos_next.services.content_version import versioned_response
 
 
 @frappe.whitelist()
@@ -29,8 +30,12 @@ def get_pos_profiles():
 
 
 @frappe.whitelist()
-def get_pos_profile_data(pos_profile):
-	"""Get detailed POS Profile data with hierarchical item groups for instant UI rendering."""
+def get_pos_profile_data(pos_profile, since_version=None):
+	"""
+	Get detailed POS Profile data with hierarchical item groups for instant UI rendering.
+
+	Pass `since_version` to get a versioned_response() wrapper instead.
+	"""
 	if not pos_profile:
 		frappe.throw(_("POS Profile is required"))
 
@@ -43,6 +48,11 @@ def get_pos_profile_data(pos_profile):
 	if not has_access:
 		frappe.throw(_("You don't have access to this POS Profile"))
 
+	if since_version is not None:
+		return versioned_response(
+			"settings", pos_profile, since_version, lambda: get_pos_profile_data(pos_profile)
+		)
+
 	profile_doc = frappe.get_doc("POS Profile", pos_profile)
 	company_doc = frappe.get_doc("Company", profile_doc.company)
 
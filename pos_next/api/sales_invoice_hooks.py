@@ -10,6 +10,8 @@ import frappe
 from frappe import _
 from frappe.utils import cint
 
+from pos_next.services.submit_context import get_submit_context
+
 
 def validate(doc, method=None):
 	"""
@@ -39,14 +41,8 @@ def apply_tax_inclusive(doc):
 		return
 
 	try:
-		# Get POS Settings for this profile
-		pos_settings = frappe.db.get_value(
-			"POS Settings",
-			{"pos_profile": doc.pos_profile},
-			["tax_inclusive"],
-			as_dict=True
-		)
-		tax_inclusive = pos_settings.get("tax_inclusive", 0) if pos_settings else 0
+		# POS Settings of this profile, from its cached submit context
+		tax_inclusive = get_submit_context(doc.pos_profile).tax_inclusive
 	except Exception:
 		tax_inclusive = 0
 
@@ -90,21 +86,13 @@ def auto_assign_loyalty_program_on_invoice(doc):
 	if customer_loyalty:
 		return
 
-	# Get POS Settings
-	pos_settings = frappe.db.get_value(
-		"POS Settings",
-		{"pos_profile": doc.pos_profile},
-		["enable_loyalty_program", "default_loyalty_program"],
-		as_dict=True
-	)
-
-	if not pos_settings:
-		return
+	# POS Settings of this profile, from its cached submit context
+	pos_settings = get_submit_context(doc.pos_profile)
 
-	if not cint(pos_settings.get("enable_loyalty_program")):
+	if not cint(pos_settings.enable_loyalty_program):
 		return
 
-	loyalty_program = pos_settings.get("default_loyalty_program")
+	loyalty_program = pos_settings.default_loyalty_program
 	if not loyalty_program:
 		return
 
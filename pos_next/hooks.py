@@ -198,8 +198,36 @@ override_doctype_class = {
 # Hook on document methods and events
 
 doc_events = {
+	"*": {
+		"on_update": "pos_next.services.content_version.on_doc_change",
+		"on_trash": "pos_next.services.content_version.on_doc_change",
+		"after_rename": "pos_next.services.content_version.on_doc_change"
+	},
 	"Item": {
-		"validate": "pos_next.validations.validate_item"
+		"validate": "pos_next.validations.validate_item",
+		"on_update": [
+			"pos_next.services.item_search.on_item_update",
+			"pos_next.services.barcode_map.on_item_update",
+			"pos_next.services.thumbnails.on_item_update"
+		],
+		"on_trash": [
+			"pos_next.services.item_search.on_item_trash",
+			"pos_next.services.barcode_map.on_item_trash"
+		],
+		"after_rename": [
+			"pos_next.services.item_search.on_item_rename",
+			"pos_next.services.barcode_map.on_item_rename"
+		]
+	},
+	"Item Price": {
+		"on_update": [
+			"pos_next.services.barcode_map.on_item_price_change",
+			"pos_next.services.price_matrix.on_item_price_change"
+		],
+		"on_trash": [
+			"pos_next.services.barcode_map.on_item_price_change",
+			"pos_next.services.price_matrix.on_item_price_change"
+		]
 	},
 	"Customer": {
 		"after_insert": "pos_next.api.customers.auto_assign_loyalty_program"
@@ -216,7 +244,73 @@ doc_events = {
 		"after_insert": "pos_next.realtime_events.emit_invoice_created_event"
 	},
 	"POS Profile": {
-		"on_update": "pos_next.realtime_events.emit_pos_profile_updated_event"
+		"on_update": [
+			"pos_next.realtime_events.emit_pos_profile_updated_event",
+			"pos_next.services.submit_context.on_pos_profile_change"
+		],
+		"on_trash": "pos_next.services.submit_context.on_pos_profile_change",
+		"after_rename": "pos_next.services.submit_context.on_pos_profile_change"
+	},
+	"POS Settings": {
+		"on_update": "pos_next.services.submit_context.on_settings_change",
+		"on_trash": "pos_next.services.submit_context.on_settings_change"
+	},
+	"DocType": {
+		"on_update": "pos_next.services.submit_context.on_settings_change"
+	},
+	"Custom Field": {
+		"on_update": "pos_next.services.submit_context.on_settings_change",
+		"on_trash": "pos_next.services.submit_context.on_settings_change"
+	},
+	"Property Setter": {
+		"on_update": "pos_next.services.submit_context.on_settings_change",
+		"on_trash": "pos_next.services.submit_context.on_settings_change"
+	},
+	"Warehouse": {
+		"on_update": [
+			"pos_next.services.tree_cache.on_tree_change",
+			"pos_next.services.stock_matrix.on_warehouse_change"
+		],
+		"on_trash": [
+			"pos_next.services.tree_cache.on_tree_change",
+			"pos_next.services.stock_matrix.on_warehouse_change"
+		],
+		"after_rename": [
+			"pos_next.services.tree_cache.on_tree_change",
+			"pos_next.services.stock_matrix.on_warehouse_change"
+		]
+	},
+	"Item Group": {
+		"on_update": "pos_next.services.tree_cache.on_tree_change",
+		"on_trash": "pos_next.services.tree_cache.on_tree_change",
+		"after_rename": "pos_next.services.tree_cache.on_tree_change"
+	},
+	"Product Bundle": {
+		"on_update": "pos_next.services.bundle_availability.on_product_bundle_change",
+		"on_trash": "pos_next.services.bundle_availability.on_product_bundle_change",
+		"after_rename": "pos_next.services.bundle_availability.on_product_bundle_change"
+	},
+	"Stock Ledger Entry": {
+		"on_submit": [
+			"pos_next.services.bundle_availability.on_stock_ledger_entry",
+			"pos_next.services.stock_matrix.on_stock_ledger_entry"
+		],
+		"on_cancel": [
+			"pos_next.services.bundle_availability.on_stock_ledger_entry",
+			"pos_next.services.stock_matrix.on_stock_ledger_entry"
+		]
+	},
+	"Currency Exchange": {
+		"on_update": "pos_next.services.currency_cache.on_currency_change",
+		"on_trash": "pos_next.services.currency_cache.on_currency_change"
+	},
+	"Company": {
+		"on_update": "pos_next.services.currency_cache.on_currency_change",
+		"on_trash": "pos_next.services.currency_cache.on_currency_change"
+	},
+	"Price List": {
+		"on_update": "pos_next.services.currency_cache.on_currency_change",
+		"on_trash": "pos_next.services.currency_cache.on_currency_change"
 	}
 }
 
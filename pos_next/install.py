@@ -25,6 +25,9 @@ def after_install():
 		# Setup default print format for POS Profiles
 		setup_default_print_format()
 
+		# Fresh installs mark every patch as run, so set up what they add here
+		setup_item_indexes()
+
 		# Clear cache to ensure changes take effect
 		frappe.clear_cache()
 		frappe.db.commit()
@@ -50,6 +53,16 @@ def after_migrate():
 		frappe.clear_cache()
 		frappe.db.commit()
 
+		# Migrations can add or drop the columns submit contexts were compiled against
+		from pos_next.services.submit_context import invalidate as invalidate_submit_contexts
+
+		invalidate_submit_contexts()
+
+		# Rebuild the barcode map in case its key normalization changed
+		from pos_next.services.barcode_map import invalidate as invalidate_barcode_map
+
+		invalidate_barcode_map()
+
 		log_message("POS Next: Migration completed successfully", level="success")
 	except Exception as e:
 		frappe.db.rollback()
@@ -61,6 +74,15 @@ def after_migrate():
 		raise
 
 
+def setup_item_indexes():
+	"""Add the Item indexes the catalog endpoints rely on (also added by patches on existing sites)"""
+	from pos_next.patches.v1_17_0 import add_item_keyset_index, build_item_search_index
+
+	add_item_keyset_index.execute()
+	# Until the first build marks the index ready, item search scans Item
+	build_item_search_index.execute()
+
+
 def setup_default_print_format(quiet=False):
 	"""
 	Set POS Next Receipt as default print format for POS Profiles if not already set.
@@ -11,6 +11,8 @@ from frappe.utils import cint, flt
 from erpnext.accounts.doctype.sales_invoice.sales_invoice import SalesInvoice
 from erpnext.accounts.utils import get_account_currency
 
+from pos_next.services.submit_context import get_submit_context
+
 def _get_post_change_gl_entries_setting():
 	"""
 	Get post_change_gl_entries setting compatible with ERPNext v15 and v16.
@@ -208,16 +210,7 @@ class CustomSalesInvoice(SalesInvoice):
 		"""Resolve discount account from POS Profile."""
 		if not self.pos_profile:
 			return None
-		for fieldname in ("custom_diskon_akun", "diskon_akun", "discount_account"):
-			if not frappe.db.has_column("POS Profile", fieldname):
-				continue
-			try:
-				val = frappe.db.get_value("POS Profile", self.pos_profile, fieldname)
-				if val:
-					return val
-			except Exception:
-				pass
-		return None
+		return get_submit_context(self.pos_profile).discount_account
 
 	def _adjust_promo_transaction_discount_gl(self, gl_entries):
 		"""
@@ -288,7 +281,12 @@ class CustomSalesInvoice(SalesInvoice):
 		This routes the pricing rule discount to the configured promo account
 		instead of silently reducing revenue.
 		"""
-		if not frappe.db.has_column("Pricing Rule", "custom_discount_account"):
+		has_discount_account = (
+			get_submit_context(self.pos_profile).has_pricing_rule_discount_account
+			if self.pos_profile
+			else frappe.db.has_column("Pricing Rule", "custom_discount_account")
+		)
+		if not has_discount_account:
 			return
 
 		for item in self.get("items", []):
@@ -0,0 +1,6 @@
+import frappe
+
+
+def execute():
+	"""Add the (item_name, name) index used by keyset pagination of the POS catalog."""
+	frappe.db.add_index("Item", ["item_name", "name"], index_name="pos_item_name_keyset_index")
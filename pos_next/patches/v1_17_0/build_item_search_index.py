@@ -0,0 +1,13 @@
+import frappe
+
+
+def execute():
+	"""Queue the initial build of the POS item search index; searches scan until it finishes."""
+	frappe.enqueue(
+		"pos_next.services.item_search.rebuild_index",
+		queue="long",
+		timeout=3600,
+		job_id="pos_item_search_rebuild",
+		deduplicate=True,
+		enqueue_after_commit=True,
+	)
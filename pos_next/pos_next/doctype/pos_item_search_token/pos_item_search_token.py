@@ -0,0 +1,15 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+from frappe.model.document import Document
+
+
+class POSItemSearchToken(Document):
+	"""
+	One row of the POS item search index.
+
+	Rows are written in bulk by pos_next.services.item_search and never edited
+	through the form; see that module for the tokenization rules.
+	"""
+
+	pass
@@ -10,15 +10,17 @@ Emits Socket.IO events when stock-affecting transactions occur.
 import frappe
 from frappe import _
 
-from pos_next.api.items import get_stock_quantities
+from pos_next.services.stock_broadcaster import queue_stock_changes
 
 
 def emit_stock_update_event(doc, method=None):
 	"""
-	Emit real-time stock update event when Sales Invoice is submitted.
+	Queue a real-time stock update when a POS Sales Invoice is submitted or cancelled.
 
-	This event notifies all connected POS terminals about stock changes,
-	allowing them to update their cached item quantities in real-time.
+	The changed (warehouse, item) pairs are handed to the stock broadcaster
+	after commit, which coalesces them across invoices and publishes
+	``pos_stock_update`` to the room of each affected warehouse, so only the
+	terminals selling from that warehouse receive it.
 
 	Args:
 		doc: Sales Invoice document
@@ -32,8 +34,7 @@ def emit_stock_update_event(doc, method=None):
 		return
 
 	try:
-		# Collect unique item codes per warehouse to avoid redundant queries
-		item_codes_by_warehouse = {}
+		pairs = set()
 		for item in doc.items:
 			item_code = getattr(item, "item_code", None)
 			warehouse = getattr(item, "warehouse", None)
@@ -48,49 +49,13 @@ def emit_stock_update_event(doc, method=None):
 			elif hasattr(item, "stock_qty") and not frappe.utils.flt(item.stock_qty):
 				continue
 
-			item_codes_by_warehouse.setdefault(warehouse, set()).add(item_code)
+			pairs.add((warehouse, item_code))
 
-		if not item_codes_by_warehouse:
+		if not pairs:
 			return
 
-		# Build stock updates with current quantities
-		stock_updates = []
-		warehouses = set()
-		for warehouse, codes in item_codes_by_warehouse.items():
-			warehouses.add(warehouse)
-			# Use shared stock utility to keep logic consistent with API responses
-			warehouse_updates = get_stock_quantities(list(codes), warehouse)
-
-			# Ensure events always have numeric qty fields, even if API returns None
-			for update in warehouse_updates:
-				actual_qty = frappe.utils.flt(update.get("actual_qty"))
-				update["actual_qty"] = actual_qty
-				update["stock_qty"] = actual_qty if update.get("stock_qty") is None else update["stock_qty"]
-				update["warehouse"] = update.get("warehouse") or warehouse
-
-			stock_updates.extend(warehouse_updates)
-
-		if not stock_updates:
-			return
-
-		# Prepare event data
-		event_data = {
-			"invoice_name": doc.name,
-			"warehouses": list(warehouses),
-			"stock_updates": stock_updates,
-			"timestamp": frappe.utils.now(),
-			"event_type": "cancel" if method == "on_cancel" else "submit"
-		}
-
-		# Emit event to all connected clients
-		# Event name: pos_stock_update
-		# Clients can subscribe to this event and filter by warehouse
-		frappe.publish_realtime(
-			event="pos_stock_update",
-			message=event_data,
-			user=None,  # Broadcast to all users
-			after_commit=True  # Only emit after successful DB commit
-		)
+		# Only broadcast stock that was actually committed
+		frappe.db.after_commit.add(lambda: queue_stock_changes(pairs))
 
 	except Exception as e:
 		# Log error but don't fail the transaction
@@ -1,8 +1,10 @@
 """
-Services module for external app integrations.
+Services module for external app integrations and shared POS caches.
 
 This module provides clean interfaces to optional external apps,
-with graceful fallbacks when they're not installed.
+with graceful fallbacks when they're not installed. Submodules such as
+item_search and barcode_map hold the server-side indexes and Redis caches
+used by the POS API.
 """
 
 from pos_next.services.barcode import (
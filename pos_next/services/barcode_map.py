@@ -0,0 +1,192 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Redis barcode map for scan-to-cart.
+
+A scan used to cost an Item Barcode lookup, an Item fallback lookup, a
+get_cached_doc("Item") and the whole get_item_detail chain. This module keeps:
+
+- BARCODE_MAP: barcode -> {item_code, uom, has_batch_no, has_serial_no,
+  is_stock_item, is_sales_item}, built in bulk and patched per item from the
+  Item doc_events (Item Barcode rows are saved through their parent Item).
+  Barcodes are stored and looked up through normalize_barcode (trimmed and
+  casefolded), so scanner padding and letter case match as they do in SQL.
+- ITEM_BARCODES: item_code -> [barcodes], the reverse map used to drop stale
+  barcodes when an item's barcode table changes.
+- Per-item scan snapshots: the get_item_detail result for a
+  (POS Profile, UOM) pair, kept for SNAPSHOT_TTL seconds and dropped as soon
+  as the item or one of its prices changes.
+
+While the map is missing (first use, Redis flush) lookups return None and the
+caller falls back to SQL; the rebuild is queued in the background.
+"""
+
+import time
+
+import frappe
+
+from pos_next.services.cache import hdel_many, hset_many
+
+BARCODE_MAP = "pos_next:barcode_map"
+ITEM_BARCODES = "pos_next:barcode_map:item_barcodes"
+READY_KEY = "pos_next:barcode_map:ready"
+
+SNAPSHOT_KEY = "pos_next:scan_snapshot:{0}"
+
+# Stock in a snapshot can lag sales on other terminals by this much; submit
+# re-validates stock, so a short window only affects the displayed quantity.
+SNAPSHOT_TTL = 30
+
+ITEM_FLAGS = ["has_batch_no", "has_serial_no", "is_stock_item", "is_sales_item"]
+
+
+def normalize_barcode(barcode):
+	"""Map key of ``barcode``: trimmed and casefolded, like the case-insensitive SQL lookup."""
+	return str(barcode or "").strip().casefold()
+
+
+def _entry(row):
+	entry = {"item_code": row.item_code, "uom": row.uom or None}
+	for flag in ITEM_FLAGS:
+		entry[flag] = row.get(flag) or 0
+	return entry
+
+
+def _query_barcodes(item_codes=None):
+	condition = ""
+	params = ()
+	if item_codes:
+		condition = f"AND i.name IN ({', '.join(['%s'] * len(item_codes))})"
+		params = tuple(item_codes)
+
+	return frappe.db.sql(
+		f"""
+		SELECT ib.barcode, ib.uom, i.name AS item_code,
+			i.has_batch_no, i.has_serial_no, i.is_stock_item, i.is_sales_item
+		FROM `tabItem Barcode` ib
+		INNER JOIN `tabItem` i ON i.name = ib.parent
+		WHERE ib.parenttype = 'Item'
+			AND IFNULL(ib.barcode, '') != ''
+			{condition}
+		""",
+		params,
+		as_dict=True,
+	)
+
+
+def rebuild_barcode_map():
+	"""Rebuild the whole map in bulk. Lookups use SQL until it finishes."""
+	cache = frappe.cache()
+	cache.delete_value(READY_KEY)
+	cache.delete_value([BARCODE_MAP, ITEM_BARCODES])
+
+	barcode_map = {}
+	item_barcodes = {}
+	for row in _query_barcodes():
+		barcode_map[normalize_barcode(row.barcode)] = _entry(row)
+		item_barcodes.setdefault(row.item_code, []).append(normalize_barcode(row.barcode))
+
+	hset_many(BARCODE_MAP, barcode_map)
+	hset_many(ITEM_BARCODES, item_barcodes)
+	cache.set_value(READY_KEY, 1)
+
+
+def invalidate():
+	"""Mark the map as missing; the next lookup queues a rebuild."""
+	frappe.cache().delete_value(READY_KEY)
+
+
+def _enqueue_rebuild():
+	frappe.enqueue(
+		"pos_next.services.barcode_map.rebuild_barcode_map",
+		queue="short",
+		job_id="pos_barcode_map_rebuild",
+		deduplicate=True,
+	)
+
+
+def lookup_barcode(barcode):
+	"""
+	Return the map entry for ``barcode``.
+
+	Returns None when the map isn't built yet (the caller should query SQL)
+	and {} when the map is built and the barcode is unknown.
+	"""
+	cache = frappe.cache()
+	if not cache.get_value(READY_KEY):
+		_enqueue_rebuild()
+		return None
+	return cache.hget(BARCODE_MAP, normalize_barcode(barcode)) or {}
+
+
+def remove_items(item_codes):
+	"""Drop the given items' barcodes from the map and their scan snapshots."""
+	cache = frappe.cache()
+	invalidate_snapshots(item_codes)
+	if not cache.get_value(READY_KEY):
+		return
+
+	stale = []
+	for item_code in item_codes:
+		stale.extend(cache.hget(ITEM_BARCODES, item_code) or [])
+	hdel_many(BARCODE_MAP, stale)
+	hdel_many(ITEM_BARCODES, item_codes)
+
+
+def refresh_items(item_codes):
+	"""Re-read the given items' barcodes into the map."""
+	remove_items(item_codes)
+	if not frappe.cache().get_value(READY_KEY):
+		return
+
+	barcode_map = {}
+	item_barcodes = {}
+	for row in _query_barcodes(item_codes):
+		barcode_map[normalize_barcode(row.barcode)] = _entry(row)
+		item_barcodes.setdefault(row.item_code, []).append(normalize_barcode(row.barcode))
+
+	hset_many(BARCODE_MAP, barcode_map)
+	hset_many(ITEM_BARCODES, item_barcodes)
+
+
+# Scan snapshots
+
+
+def get_snapshot(item_code, pos_profile, uom=None):
+	entry = frappe.cache().hget(SNAPSHOT_KEY.format(item_code), f"{pos_profile}:{uom or ''}")
+	if entry and entry["expires_at"] > time.time():
+		return entry["data"]
+	return None
+
+
+def set_snapshot(item_code, pos_profile, uom, data):
+	hset_many(
+		SNAPSHOT_KEY.format(item_code),
+		{f"{pos_profile}:{uom or ''}": {"expires_at": time.time() + SNAPSHOT_TTL, "data": data}},
+		expires_in_sec=SNAPSHOT_TTL,
+	)
+
+
+def invalidate_snapshots(item_codes):
+	frappe.cache().delete_value([SNAPSHOT_KEY.format(item_code) for item_code in item_codes])
+
+
+# doc_events - applied after commit so a rolled back save can't leave the map ahead of the DB
+
+
+def on_item_update(doc, method=None):
+	frappe.db.after_commit.add(lambda: refresh_items([doc.name]))
+
+
+def on_item_trash(doc, method=None):
+	frappe.db.after_commit.add(lambda: remove_items([doc.name]))
+
+
+def on_item_rename(doc, method=None, old=None, new=None, merge=False):
+	frappe.db.after_commit.add(lambda: remove_items([old]))
+	frappe.db.after_commit.add(lambda: refresh_items([new]))
+
+
+def on_item_price_change(doc, method=None):
+	frappe.db.after_commit.add(lambda: invalidate_snapshots([doc.item_code]))
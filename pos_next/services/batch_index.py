@@ -0,0 +1,139 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Set-based batch availability in FEFO order.
+
+Batch pickers used to call ERPNext's get_batch_qty once per item and then
+get_cached_doc("Batch") once per batch just to read its dates and disabled
+flag. get_available_batches answers the same question for many items in one
+query: ledger quantities per batch (Serial and Batch Bundle entries plus
+legacy Stock Ledger Entry batch_no rows, as get_batch_qty adds them up)
+joined to Batch metadata, filtered to sellable batches and sorted First
+Expired, First Out.
+"""
+
+from collections import defaultdict
+
+import frappe
+from frappe.utils import flt, nowdate
+
+from pos_next.services.tree_cache import expand_group
+
+
+def get_available_batches(item_codes, warehouse, sellable_only=True):
+	"""
+	Return sellable batches of ``item_codes`` at ``warehouse`` (leaf or group).
+
+	A batch is sellable when it is enabled, has a positive quantity and has no
+	expiry date or one after today. With ``sellable_only`` off, disabled and
+	expired batches with a positive quantity are returned too (returns can
+	bring those back). Quantities of a batch held in several child warehouses
+	of a group are summed.
+
+	Returns:
+		dict: {item_code: [{"batch_no", "batch_qty", "expiry_date",
+			"manufacturing_date"}, ...]}, each list ordered by expiry date
+			(batches without one last), then manufacturing date, then creation.
+			Items without sellable batches are absent.
+	"""
+	item_codes = list(dict.fromkeys(code for code in item_codes if code))
+	warehouses = expand_group("Warehouse", warehouse) if warehouse else []
+	if not item_codes or not warehouses:
+		return {}
+
+	item_placeholders = ", ".join(["%s"] * len(item_codes))
+	warehouse_placeholders = ", ".join(["%s"] * len(warehouses))
+	scope = (*item_codes, *warehouses)
+	sellable_condition = (
+		"WHERE b.disabled = 0 AND (b.expiry_date IS NULL OR b.expiry_date > %s)" if sellable_only else ""
+	)
+
+	rows = frappe.db.sql(
+		f"""
+		SELECT ledger.item_code, ledger.batch_no, SUM(ledger.qty) AS batch_qty,
+			b.expiry_date, b.manufacturing_date
+		FROM (
+			SELECT sle.item_code, sbe.batch_no, sbe.qty
+			FROM `tabStock Ledger Entry` sle
+			INNER JOIN `tabSerial and Batch Entry` sbe ON sbe.parent = sle.serial_and_batch_bundle
+			WHERE sle.item_code IN ({item_placeholders})
+				AND sle.warehouse IN ({warehouse_placeholders})
+				AND sle.is_cancelled = 0
+				AND IFNULL(sbe.batch_no, '') != ''
+			UNION ALL
+			SELECT sle.item_code, sle.batch_no, sle.actual_qty AS qty
+			FROM `tabStock Ledger Entry` sle
+			WHERE sle.item_code IN ({item_placeholders})
+				AND sle.warehouse IN ({warehouse_placeholders})
+				AND sle.is_cancelled = 0
+				AND IFNULL(sle.batch_no, '') != ''
+		) ledger
+		INNER JOIN `tabBatch` b ON b.name = ledger.batch_no
+		{sellable_condition}
+		GROUP BY ledger.item_code, ledger.batch_no, b.expiry_date, b.manufacturing_date, b.creation
+		HAVING SUM(ledger.qty) > 0
+		ORDER BY b.expiry_date IS NULL, b.expiry_date, b.manufacturing_date, b.creation
+		""",
+		(*scope, *scope, *([nowdate()] if sellable_only else [])),
+		as_dict=True,
+	)
+
+	batches = defaultdict(list)
+	for row in rows:
+		batches[row.item_code].append({
+			"batch_no": row.batch_no,
+			"batch_qty": flt(row.batch_qty),
+			"expiry_date": row.expiry_date,
+			"manufacturing_date": row.manufacturing_date,
+		})
+
+	return dict(batches)
+
+
+def get_batch_quantities(pairs):
+	"""
+	Return {(batch_no, warehouse): qty} for (batch_no, warehouse) pairs.
+
+	Same ledger sum as ERPNext's get_batch_qty(batch_no, warehouse) - without
+	the sellability filters of get_available_batches - for many batches in one
+	query. Pairs without ledger entries map to 0.
+	"""
+	pairs = list(dict.fromkeys((batch_no, warehouse) for batch_no, warehouse in pairs if batch_no and warehouse))
+	if not pairs:
+		return {}
+
+	batch_nos = sorted({batch_no for batch_no, _warehouse in pairs})
+	warehouses = sorted({warehouse for _batch_no, warehouse in pairs})
+	batch_placeholders = ", ".join(["%s"] * len(batch_nos))
+	warehouse_placeholders = ", ".join(["%s"] * len(warehouses))
+	scope = (*batch_nos, *warehouses)
+
+	rows = frappe.db.sql(
+		f"""
+		SELECT ledger.batch_no, ledger.warehouse, SUM(ledger.qty) AS batch_qty
+		FROM (
+			SELECT sbe.batch_no, sle.warehouse, sbe.qty
+			FROM `tabStock Ledger Entry` sle
+			INNER JOIN `tabSerial and Batch Entry` sbe ON sbe.parent = sle.serial_and_batch_bundle
+			WHERE sbe.batch_no IN ({batch_placeholders})
+				AND sle.warehouse IN ({warehouse_placeholders})
+				AND sle.is_cancelled = 0
+			UNION ALL
+			SELECT sle.batch_no, sle.warehouse, sle.actual_qty AS qty
+			FROM `tabStock Ledger Entry` sle
+			WHERE sle.batch_no IN ({batch_placeholders})
+				AND sle.warehouse IN ({warehouse_placeholders})
+				AND sle.is_cancelled = 0
+		) ledger
+		GROUP BY ledger.batch_no, ledger.warehouse
+		""",
+		(*scope, *scope),
+		as_dict=True,
+	)
+
+	quantities = dict.fromkeys(pairs, 0.0)
+	for row in rows:
+		if (row.batch_no, row.warehouse) in quantities:
+			quantities[(row.batch_no, row.warehouse)] = flt(row.batch_qty)
+	return quantities
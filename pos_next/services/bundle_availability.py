@@ -0,0 +1,154 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Materialized Product Bundle availability.
+
+Bundle availability (min over components of available / required) used to be
+recomputed from Product Bundle Item and Bin on every catalog page, stock
+quantity request and realtime stock push. It is now kept per (warehouse,
+bundle) in a Redis hash and computed only on a miss:
+
+- DEFINITIONS: bundle -> [[component, required_qty], ...], plus the reverse
+  COMPONENTS map component -> [bundles]. Built in one query, dropped when a
+  Product Bundle changes.
+- AVAILABILITY: one hash per requested warehouse (leaf or group), bundle ->
+  {"at": timestamp, "qty": qty}. When a Stock Ledger Entry is posted for a
+  component, the affected bundles are dropped from the hash of that
+  warehouse and of every group above it, so the next read recomputes just
+  those bundles.
+
+Reserved quantity moves (Sales Orders) update Bin without a ledger entry, so
+fields older than AVAILABILITY_TTL are recomputed as a safety net. The hash
+itself only expires after AVAILABILITY_HASH_TTL without writes, which clears
+out hashes of old definition versions.
+"""
+
+import time
+
+import frappe
+
+from pos_next.services.cache import hdel_many, hget_many, hset_many
+from pos_next.services.tree_cache import get_ancestors
+
+DEFINITIONS = "pos_next:bundle_definitions"
+COMPONENTS = "pos_next:bundle_components"
+AVAILABILITY = "pos_next:bundle_availability:{0}:{1}"
+
+# Fields of DEFINITIONS that aren't bundles
+BUILT_FIELD = "__built__"
+VERSION_FIELD = "__version__"
+
+AVAILABILITY_TTL = 300
+AVAILABILITY_HASH_TTL = 24 * 60 * 60
+
+
+def _load_definitions():
+	"""Return the definitions version, building the maps if they are missing."""
+	cache = frappe.cache()
+	version = cache.hget(DEFINITIONS, VERSION_FIELD)
+	if version and cache.hget(DEFINITIONS, BUILT_FIELD):
+		return version
+
+	rows = frappe.db.sql(
+		"""
+		SELECT pb.new_item_code AS bundle_code, pbi.item_code AS component_code, pbi.qty AS required_qty
+		FROM `tabProduct Bundle` pb
+		INNER JOIN `tabProduct Bundle Item` pbi ON pbi.parent = pb.name
+		""",
+		as_dict=True,
+	)
+
+	definitions = {}
+	components = {}
+	for row in rows:
+		definitions.setdefault(row.bundle_code, []).append([row.component_code, row.required_qty])
+		bundles = components.setdefault(row.component_code, [])
+		if row.bundle_code not in bundles:
+			bundles.append(row.bundle_code)
+
+	# A new version orphans availability computed from the old definitions
+	version = frappe.generate_hash(length=8)
+	definitions[VERSION_FIELD] = version
+	definitions[BUILT_FIELD] = 1
+	hset_many(DEFINITIONS, definitions)
+	hset_many(COMPONENTS, components)
+	return version
+
+
+def get_bundle_codes(item_codes):
+	"""Return the subset of ``item_codes`` that are Product Bundles."""
+	if not item_codes:
+		return []
+	_load_definitions()
+	found = hget_many(DEFINITIONS, list(item_codes))
+	return [code for code in item_codes if code in found]
+
+
+def get_bundle_definitions(bundle_codes):
+	"""Return {bundle: [[component, required_qty], ...]} for the given bundles."""
+	if not bundle_codes:
+		return {}
+	_load_definitions()
+	return hget_many(DEFINITIONS, list(bundle_codes))
+
+
+def get_cached_availability(bundle_codes, warehouse):
+	"""
+	Return {bundle: qty or None} for the bundles cached for ``warehouse``.
+
+	None records a bundle with no usable components, which the calculation
+	leaves out of its result. Bundles not in the returned dict need computing.
+	"""
+	version = _load_definitions()
+	now = time.time()
+	cached = hget_many(AVAILABILITY.format(version, warehouse), list(bundle_codes))
+	return {
+		bundle: row["qty"]
+		for bundle, row in cached.items()
+		if isinstance(row, dict) and now - row["at"] < AVAILABILITY_TTL
+	}
+
+
+def store_availability(warehouse, availability):
+	version = _load_definitions()
+	now = time.time()
+	hset_many(
+		AVAILABILITY.format(version, warehouse),
+		{bundle: {"at": now, "qty": qty} for bundle, qty in availability.items()},
+		expires_in_sec=AVAILABILITY_HASH_TTL,
+	)
+
+
+def invalidate_components(item_codes, warehouse):
+	"""Drop cached availability of bundles using ``item_codes`` at ``warehouse`` and its groups."""
+	cache = frappe.cache()
+	if not cache.hget(DEFINITIONS, BUILT_FIELD):
+		return
+
+	bundles = set()
+	for bundles_of_item in hget_many(COMPONENTS, list(item_codes)).values():
+		bundles.update(bundles_of_item)
+	if not bundles:
+		return
+
+	version = cache.hget(DEFINITIONS, VERSION_FIELD)
+	for scope in [warehouse, *get_ancestors("Warehouse", warehouse)]:
+		hdel_many(AVAILABILITY.format(version, scope), list(bundles))
+
+
+def invalidate_definitions():
+	frappe.cache().delete_value([DEFINITIONS, COMPONENTS])
+
+
+# doc_events
+
+
+def on_stock_ledger_entry(doc, method=None):
+	"""Stock Ledger Entry on_submit/on_cancel: drop bundles built from this item."""
+	item_code, warehouse = doc.item_code, doc.warehouse
+	frappe.db.after_commit.add(lambda: invalidate_components([item_code], warehouse))
+
+
+def on_product_bundle_change(doc, method=None, *args, **kwargs):
+	frappe.db.after_commit.add(invalidate_definitions)
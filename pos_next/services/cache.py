@@ -0,0 +1,74 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Bulk Redis hash helpers.
+
+frappe.cache() only exposes single-field hget/hset, which costs one round
+trip per field. The POS catalog caches (barcode map, stock and price
+snapshots) are filled and read many fields at a time, so these helpers talk
+to the same hashes through one pipelined command. Values are pickled exactly
+like RedisWrapper.hset does, so the single-field wrapper calls and these
+helpers can be mixed freely on the same hash.
+"""
+
+import pickle
+
+import frappe
+
+CHUNK_SIZE = 1000
+
+
+def hset_many(name, mapping, expires_in_sec=None):
+	"""Write several hash fields at once, optionally (re)setting the key's TTL."""
+	if not mapping:
+		return
+
+	cache = frappe.cache()
+	key = cache.make_key(name)
+	items = list(mapping.items())
+
+	pipe = cache.pipeline()
+	for i in range(0, len(items), CHUNK_SIZE):
+		chunk = items[i : i + CHUNK_SIZE]
+		pipe.hset(key, mapping={field: pickle.dumps(value) for field, value in chunk})
+	if expires_in_sec:
+		pipe.expire(key, expires_in_sec)
+	pipe.execute()
+	_forget_local(key)
+
+
+def hget_many(name, fields):
+	"""Return {field: value} for the fields present in the hash."""
+	if not fields:
+		return {}
+
+	fields = list(fields)
+	cache = frappe.cache()
+	values = cache.hmget(cache.make_key(name), fields)
+
+	result = {}
+	for field, value in zip(fields, values, strict=True):
+		if value is not None:
+			result[field] = pickle.loads(value)
+	return result
+
+
+def hdel_many(name, fields):
+	"""Remove several hash fields at once."""
+	if not fields:
+		return
+
+	cache = frappe.cache()
+	key = cache.make_key(name)
+	pipe = cache.pipeline()
+	pipe.hdel(key, *fields)
+	pipe.execute()
+	_forget_local(key)
+
+
+def _forget_local(key):
+	# RedisWrapper keeps a per-request copy of hashes it has read
+	local_cache = getattr(frappe.local, "cache", None)
+	if local_cache is not None:
+		local_cache.pop(key, None)
@@ -0,0 +1,156 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Soft stock reservations for carts being rung up.
+
+Stock was only checked against Bin.actual_qty, so two terminals selling the
+last units of an item both passed the cart checks and one of them failed at
+submit. Terminals now report their cart to this Redis ledger, and the stock
+shown by validate_cart_items, get_stock_quantities and the realtime feed
+deducts what other carts hold:
+
+- HOLDS_KEY: a hash per warehouse, "<item_code>\\n<holder>" ->
+  {"qty", "expires_at"}. Only carts being rung up have fields, so reading
+  all holds of a warehouse is one small HGETALL however large the catalog.
+- CART_KEY: the (warehouse, item) pairs a holder holds, so reporting a cart
+  again replaces its previous holds.
+
+A holder is a hash of the session user and the client's cart id, so a cart
+id sent by another user never touches someone else's holds. Holder ids stay
+on the server: stock rows only carry the quantity held in total.
+
+Holds are soft: nothing is locked in the database and submit still
+validates against Bin. Every report renews the cart's holds for CART_TTL,
+after which a cart that went quiet (closed tab, lost terminal) stops
+counting; submitting an invoice releases its cart right away.
+"""
+
+import hashlib
+import pickle
+import time
+
+import frappe
+from frappe.utils import flt
+
+from pos_next.services.tree_cache import expand_group
+
+HOLDS_KEY = "pos_next:cart_reservations:{0}"
+CART_KEY = "pos_next:cart_reservations:cart:{0}"
+
+CART_TTL = 15 * 60
+
+
+def get_holder(cart_id, user=None):
+	"""Return the holder id of ``cart_id`` opened by ``user`` (the session user by default)."""
+	return hashlib.sha256(f"{user or frappe.session.user}\n{cart_id}".encode()).hexdigest()[:20]
+
+
+def hold_cart(cart_id, holds, ttl=CART_TTL, user=None):
+	"""
+	Replace the holds of ``user``'s ``cart_id`` with ``holds`` ({(warehouse, item_code): stock qty}).
+
+	An empty ``holds`` releases the cart. Returns the (warehouse, item_code)
+	pairs whose held quantity changed.
+	"""
+	if not cart_id:
+		return set()
+
+	holder = get_holder(cart_id, user)
+	cache = frappe.cache()
+	holds = {pair: flt(qty) for pair, qty in holds.items() if all(pair) and flt(qty) > 0}
+	previous = cache.get_value(CART_KEY.format(holder), expires=True) or {}
+
+	expires_at = time.time() + ttl
+	pipe = cache.pipeline()
+	for warehouse, item_code in set(previous) - set(holds):
+		pipe.hdel(cache.make_key(HOLDS_KEY.format(warehouse)), f"{item_code}\n{holder}")
+	for (warehouse, item_code), qty in holds.items():
+		key = cache.make_key(HOLDS_KEY.format(warehouse))
+		pipe.hset(key, f"{item_code}\n{holder}", pickle.dumps({"qty": qty, "expires_at": expires_at}))
+		pipe.expire(key, ttl)
+	pipe.execute()
+
+	if holds:
+		cache.set_value(CART_KEY.format(holder), holds, expires_in_sec=ttl)
+	else:
+		cache.delete_value(CART_KEY.format(holder))
+
+	return {pair for pair in set(previous) | set(holds) if previous.get(pair) != holds.get(pair)}
+
+
+def release_cart(cart_id, user=None):
+	return hold_cart(cart_id, {}, user=user)
+
+
+def get_holds(warehouses):
+	"""Return {(warehouse, item_code): {holder: qty}} of the live holds at ``warehouses``."""
+	warehouses = list(dict.fromkeys(wh for wh in warehouses if wh))
+	if not warehouses:
+		return {}
+
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	for warehouse in warehouses:
+		pipe.hgetall(cache.make_key(HOLDS_KEY.format(warehouse)))
+
+	now = time.time()
+	holds = {}
+	expired = []
+	for warehouse, entries in zip(warehouses, pipe.execute(), strict=True):
+		for field, value in entries.items():
+			field = frappe.safe_decode(field)
+			item_code, holder = field.split("\n", 1)
+			hold = pickle.loads(value)
+			if hold["expires_at"] <= now:
+				expired.append((warehouse, field))
+			else:
+				holds.setdefault((warehouse, item_code), {})[holder] = hold["qty"]
+
+	# Drop holds of carts that went quiet
+	if expired:
+		pipe = cache.pipeline()
+		for warehouse, field in expired:
+			pipe.hdel(cache.make_key(HOLDS_KEY.format(warehouse)), field)
+		pipe.execute()
+
+	return holds
+
+
+def get_cart_reservations(item_codes, warehouse):
+	"""
+	Return {item_code: {holder: qty}} held at ``warehouse`` for ``item_codes``.
+
+	For a group warehouse, holds at the group itself and at every warehouse
+	below it count.
+	"""
+	item_codes = set(item_codes)
+	reservations = {}
+	for (_warehouse, item_code), carts in get_holds(
+		[warehouse, *(expand_group("Warehouse", warehouse) or [])]
+	).items():
+		if item_code not in item_codes:
+			continue
+		item_carts = reservations.setdefault(item_code, {})
+		for holder, qty in carts.items():
+			item_carts[holder] = item_carts.get(holder, 0) + qty
+	return reservations
+
+
+def get_held_qty(item_codes, warehouse, exclude_cart=None):
+	"""Return {item_code: qty held at ``warehouse`` by carts other than the session user's ``exclude_cart``}."""
+	excluded = get_holder(exclude_cart) if exclude_cart else None
+	return {
+		item_code: sum(qty for holder, qty in carts.items() if holder != excluded)
+		for item_code, carts in get_cart_reservations(item_codes, warehouse).items()
+	}
+
+
+def apply_cart_reservations(stock_row, carts):
+	"""Add the cart hold totals to a stock row shaped like get_stock_quantities' rows."""
+	cart_reserved_qty = sum((carts or {}).values())
+	stock_row["cart_reserved_qty"] = cart_reserved_qty
+	stock_row["available_qty"] = (
+		flt(stock_row.get("actual_qty")) - flt(stock_row.get("reserved_qty")) - cart_reserved_qty
+	)
+	return stock_row
@@ -0,0 +1,124 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Content versions for conditional POS responses.
+
+Terminals poll the catalog, offers, item groups and settings endpoints and
+used to get the full body back even when nothing had changed. Each dataset
+now has a version counter in Redis, bumped (after commit) by doc events on
+the doctypes it is built from, plus a per-POS-Profile counter bumped when the
+profile itself changes. A client that passes back the version from its last
+reply as ``since_version`` gets ``{"not_modified": True}`` without the
+endpoint being queried or serialized again.
+
+An epoch token is part of every version so a Redis flush, which resets the
+counters, can never make an old version look current. Anything else the
+payload depends on (the date, the request's own arguments) is passed as
+``extra`` and folded into the version as a short digest, so a reply for one
+page or filter can never be taken for another.
+
+Only doc events bump the counters: writes that bypass them (frappe.db.set_value,
+db_set, raw SQL, bulk imports with events off) must call bump() themselves
+after commit, as the expired-promotions task does, or clients keep getting
+not_modified (and cached facet counts) until something else bumps the dataset.
+
+Stock levels are deliberately not part of the catalog version - they move
+with every sale and reach terminals through the stock endpoints and
+realtime events instead.
+"""
+
+import hashlib
+
+import frappe
+
+COUNTER_KEY = "pos_next:content_version:{0}"
+PROFILE_COUNTER_KEY = "pos_next:content_version:profile:{0}"
+EPOCH_KEY = "pos_next:content_version:epoch"
+
+# dataset -> doctypes whose changes alter it (POS Profile changes bump the profile counter)
+DATASET_DOCTYPES = {
+	"catalog": {"Item", "Item Price", "Item Group", "Price List", "Currency Exchange"},
+	"item_groups": {"Item Group"},
+	"offers": {"Pricing Rule", "Promotional Scheme", "POS Offer", "POS Coupon"},
+	"settings": {
+		"POS Settings",
+		"Company",
+		"System Settings",
+		"Mode of Payment",
+		"Loyalty Program",
+		"Item Group",
+	},
+}
+
+TRACKED_DOCTYPES = set().union(*DATASET_DOCTYPES.values()) | {"POS Profile"}
+
+
+def _decode(value):
+	return value.decode() if isinstance(value, bytes) else value
+
+
+def get_version(dataset, pos_profile=None, *extra):
+	"""Return the current version token of ``dataset`` as seen by ``pos_profile``."""
+	cache = frappe.cache()
+	keys = [
+		cache.make_key(EPOCH_KEY),
+		cache.make_key(COUNTER_KEY.format(dataset)),
+		cache.make_key(PROFILE_COUNTER_KEY.format(pos_profile or "")),
+	]
+	epoch, counter, profile_counter = (_decode(value) for value in cache.mget(keys))
+
+	if not epoch:
+		cache.set(keys[0], frappe.generate_hash(length=8), nx=True)
+		epoch = _decode(cache.get(keys[0]))
+
+	parts = [epoch, counter or "0", profile_counter or "0"]
+	if extra:
+		parts.append(hashlib.sha1("\n".join(str(value) for value in extra).encode()).hexdigest()[:12])
+	return ".".join(parts)
+
+
+def versioned_response(dataset, pos_profile, since_version, build, *extra):
+	"""
+	Wrap an endpoint result for clients that opted in with ``since_version``.
+
+	The version is read before ``build`` runs, so a change that lands while
+	the payload is being built leaves the client one version behind and it
+	simply refetches next time.
+
+	Returns:
+		dict: {"version": str, "not_modified": bool, "data": payload or None}
+	"""
+	version = get_version(dataset, pos_profile, *extra)
+	if since_version == version:
+		return {"version": version, "not_modified": True, "data": None}
+	return {"version": version, "not_modified": False, "data": build()}
+
+
+def bump(dataset):
+	cache = frappe.cache()
+	cache.incr(cache.make_key(COUNTER_KEY.format(dataset)))
+
+
+def bump_profile(pos_profile):
+	cache = frappe.cache()
+	cache.incr(cache.make_key(PROFILE_COUNTER_KEY.format(pos_profile)))
+
+
+def _bump_for(doctype, name):
+	if doctype == "POS Profile":
+		bump_profile(name)
+		return
+	for dataset, doctypes in DATASET_DOCTYPES.items():
+		if doctype in doctypes:
+			bump(dataset)
+
+
+def on_doc_change(doc, method=None, *args, **kwargs):
+	"""doc_events "*" hook: bump the versions of the datasets built from this doctype."""
+	if doc.doctype not in TRACKED_DOCTYPES:
+		return
+
+	# After commit, so a client can't cache pre-commit data under the new version
+	doctype, name = doc.doctype, doc.name
+	frappe.db.after_commit.add(lambda: _bump_for(doctype, name))
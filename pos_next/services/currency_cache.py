@@ -0,0 +1,90 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Per-day cache of currency metadata and exchange rates.
+
+Adding an item to a cart read Company.default_currency and Price List.currency
+and, for a foreign price list, ran ERPNext's get_exchange_rate, every time.
+Offer evaluation and invoice saves repeated the same lookups. They now share
+one Redis hash per day holding:
+
+- "company:<name>" -> default currency
+- "price_list:<name>" -> price list currency
+- "rate:<from>:<to>" -> exchange rate for that day
+
+Each day's hash expires after CACHE_TTL. Saving or deleting a Currency
+Exchange, Company or Price List drops every day's hash after commit, since an
+exchange rate applies from its date onwards.
+"""
+
+import frappe
+from frappe.utils import flt, getdate, nowdate
+
+from pos_next.services.cache import hset_many
+
+CACHE_KEY = "pos_next:currency:{0}"
+
+CACHE_TTL = 24 * 60 * 60
+
+
+def _get(date, field, compute):
+	key = CACHE_KEY.format(date or nowdate())
+	value = frappe.cache().hget(key, field)
+	if value is None:
+		value = compute()
+		# Failed lookups aren't cached, so they are retried on the next call
+		if value:
+			hset_many(key, {field: value}, expires_in_sec=CACHE_TTL)
+	return value
+
+
+def get_company_currency(company):
+	if not company:
+		return None
+	return _get(None, f"company:{company}", lambda: frappe.db.get_value("Company", company, "default_currency"))
+
+
+def get_price_list_currency(price_list):
+	if not price_list:
+		return None
+	return _get(None, f"price_list:{price_list}", lambda: frappe.db.get_value("Price List", price_list, "currency"))
+
+
+def get_exchange_rate(from_currency, to_currency, date=None):
+	"""
+	Return the exchange rate from ``from_currency`` to ``to_currency`` on ``date``.
+
+	Returns 1 for the same currency and 0 when ERPNext has no rate (the miss is
+	logged and not cached).
+	"""
+	if not from_currency or not to_currency or from_currency == to_currency:
+		return 1
+
+	date = str(getdate(date or nowdate()))
+
+	def compute():
+		from erpnext.setup.utils import get_exchange_rate as erpnext_get_exchange_rate
+
+		try:
+			rate = flt(erpnext_get_exchange_rate(from_currency, to_currency, date))
+		except Exception:
+			rate = 0
+
+		if not rate:
+			frappe.log_error(f"Missing exchange rate from {from_currency} to {to_currency}", "POS Next")
+		return rate
+
+	return _get(date, f"rate:{from_currency}:{to_currency}", compute)
+
+
+def invalidate():
+	frappe.cache().delete_keys(CACHE_KEY.format(""))
+
+
+# doc_events
+
+
+def on_currency_change(doc, method=None, *args, **kwargs):
+	"""Currency Exchange, Company and Price List changes: drop every cached day after commit."""
+	frappe.db.after_commit.add(invalidate)
@@ -0,0 +1,228 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Inverted index for POS item search.
+
+get_items used to answer every keystroke with
+``CONCAT(name, item_name, description) LIKE '%word%'`` across the whole Item
+table, which can never use an index. This module keeps a token table
+(POS Item Search Token) in step with Item so searches become equality
+lookups on an indexed column.
+
+Item code and item name are split on whitespace (and each word again on
+punctuation, so "ITEM-001" is found by "item", "001" and "item-001"),
+lowercased, and every prefix of every word from MIN_TOKEN_LENGTH up to
+MAX_TOKEN_LENGTH characters is stored. Barcodes are stored the same way as a
+whole, with is_barcode=1. Descriptions are not indexed: they are long and
+often HTML, and would dwarf the rest of the index.
+
+A search therefore matches items where every word starts a word of the code
+or name, or the whole term starts a barcode. get_items still applies its
+original LIKE filters and relevance ordering on top, so ranking is unchanged;
+matches found only in the description or in the middle of a word are what
+the index gives up. The full LIKE scan is used while the index is being built
+or when every word is shorter than MIN_TOKEN_LENGTH.
+
+Item saves and renames queue the reindex after commit, so the save
+transaction never waits on it.
+"""
+
+import hashlib
+import re
+
+import frappe
+from frappe.utils import cint
+
+INDEX_DOCTYPE = "POS Item Search Token"
+
+# Persisted in tabDefaultValue so it survives a Redis flush
+INDEX_READY_KEY = "pos_item_search_index_ready"
+
+# Shorter search words are not looked up; a search of only such words scans as before
+MIN_TOKEN_LENGTH = 2
+
+# Longer words are indexed, and looked up, by their first MAX_TOKEN_LENGTH characters
+MAX_TOKEN_LENGTH = 40
+
+REBUILD_BATCH_SIZE = 500
+
+INDEX_FIELDS = ["token", "item_code", "company", "is_barcode"]
+
+_PUNCTUATION = re.compile(r"[\W_]+")
+
+
+def _prefixes(word):
+	return {word[:n] for n in range(MIN_TOKEN_LENGTH, min(len(word), MAX_TOKEN_LENGTH) + 1)}
+
+
+def tokenize(text):
+	"""Return the set of indexable word prefixes for ``text``."""
+	if not text:
+		return set()
+
+	tokens = set()
+	for word in str(text).lower().split():
+		tokens |= _prefixes(word)
+		for part in _PUNCTUATION.split(word):
+			tokens |= _prefixes(part)
+	return tokens
+
+
+def tokenize_barcode(barcode):
+	"""Return the set of indexable prefixes for a whole barcode."""
+	return _prefixes(str(barcode or "").strip().lower())
+
+
+def is_index_ready():
+	return cint(frappe.db.get_default(INDEX_READY_KEY))
+
+
+def _build_rows(items, barcodes_by_item):
+	"""Build bulk-insert value tuples for a list of Item rows."""
+	rows = []
+	for item in items:
+		company = item.get("custom_company") or ""
+
+		text_tokens = tokenize(item.get("name")) | tokenize(item.get("item_name"))
+		rows.extend((token, item["name"], company, 0) for token in text_tokens)
+
+		barcode_tokens = set()
+		for barcode in barcodes_by_item.get(item["name"], []):
+			barcode_tokens |= tokenize_barcode(barcode)
+		rows.extend((token, item["name"], company, 1) for token in barcode_tokens)
+
+	return rows
+
+
+def _fetch_items(item_codes):
+	items = frappe.get_all(
+		"Item",
+		filters={"name": ["in", item_codes]},
+		fields=["name", "item_name", "custom_company"],
+	)
+
+	barcodes_by_item = {}
+	for row in frappe.get_all(
+		"Item Barcode",
+		filters={"parent": ["in", item_codes], "parenttype": "Item"},
+		fields=["parent", "barcode"],
+	):
+		if row.barcode:
+			barcodes_by_item.setdefault(row.parent, []).append(row.barcode)
+
+	return items, barcodes_by_item
+
+
+def index_items(item_codes):
+	"""Replace the index rows for the given items."""
+	if not item_codes:
+		return
+
+	frappe.db.delete(INDEX_DOCTYPE, {"item_code": ["in", item_codes]})
+
+	items, barcodes_by_item = _fetch_items(item_codes)
+	rows = _build_rows(items, barcodes_by_item)
+	if rows:
+		frappe.db.bulk_insert(INDEX_DOCTYPE, INDEX_FIELDS, rows)
+
+
+def rebuild_index():
+	"""
+	Rebuild the whole index. Searches fall back to the LIKE scan until it finishes.
+
+	Run from the background queue; see enqueue_rebuild.
+	"""
+	frappe.db.set_default(INDEX_READY_KEY, 0)
+	frappe.db.commit()
+
+	frappe.db.truncate(INDEX_DOCTYPE)
+
+	item_codes = frappe.get_all("Item", pluck="name", order_by="name")
+	for i in range(0, len(item_codes), REBUILD_BATCH_SIZE):
+		items, barcodes_by_item = _fetch_items(item_codes[i : i + REBUILD_BATCH_SIZE])
+		rows = _build_rows(items, barcodes_by_item)
+		if rows:
+			frappe.db.bulk_insert(INDEX_DOCTYPE, INDEX_FIELDS, rows)
+		frappe.db.commit()
+
+	frappe.db.set_default(INDEX_READY_KEY, 1)
+	frappe.db.commit()
+
+
+@frappe.whitelist()
+def enqueue_rebuild():
+	"""Queue a full index rebuild (System Manager only)."""
+	frappe.only_for("System Manager")
+	frappe.enqueue(
+		"pos_next.services.item_search.rebuild_index",
+		queue="long",
+		timeout=3600,
+		job_id="pos_item_search_rebuild",
+		deduplicate=True,
+	)
+
+
+def enqueue_index(item_codes):
+	"""Queue a reindex of the given items."""
+	item_codes = sorted(set(item_codes))
+	if not item_codes:
+		return
+	frappe.enqueue(
+		"pos_next.services.item_search.index_items",
+		queue="short",
+		item_codes=item_codes,
+		job_id=f"pos_item_search_index:{hashlib.sha1(':'.join(item_codes).encode()).hexdigest()[:16]}",
+		deduplicate=True,
+	)
+
+
+def _token_condition(name_column, token, company, is_barcode):
+	condition = f"""{name_column} IN (
+		SELECT item_code FROM `tab{INDEX_DOCTYPE}`
+		WHERE token = %s AND is_barcode = %s AND IFNULL(company, '') IN (%s, '')
+	)"""
+	return condition, [token[:MAX_TOKEN_LENGTH], is_barcode, company or ""]
+
+
+def get_search_condition(search_term, company=None, name_column="i.name"):
+	"""
+	Return ``(condition, params)`` restricting ``name_column`` to items matching ``search_term``, or None.
+
+	Every word of at least MIN_TOKEN_LENGTH characters must start a word of the
+	item code or name, or the whole term must start a barcode. None means the
+	index can't be used and the caller should scan as before.
+	"""
+	if not search_term or not is_index_ready():
+		return None
+
+	term = search_term.strip().lower()
+	words = [word for word in term.split() if len(word) >= MIN_TOKEN_LENGTH]
+	if not words:
+		return None
+
+	conditions, params = [], []
+	for word in words:
+		condition, condition_params = _token_condition(name_column, word, company, 0)
+		conditions.append(condition)
+		params.extend(condition_params)
+
+	barcode_condition, barcode_params = _token_condition(name_column, term, company, 1)
+	return f"(({' AND '.join(conditions)}) OR {barcode_condition})", params + barcode_params
+
+
+# Item doc_events
+
+
+def on_item_update(doc, method=None):
+	# Barcodes are a child table and are saved with the Item, so this covers them too
+	frappe.db.after_commit.add(lambda: enqueue_index([doc.name]))
+
+
+def on_item_trash(doc, method=None):
+	frappe.db.delete(INDEX_DOCTYPE, {"item_code": doc.name})
+
+
+def on_item_rename(doc, method=None, old=None, new=None, merge=False):
+	# The rename already moved the rows to the new code; only the code's own tokens changed
+	frappe.db.after_commit.add(lambda: enqueue_index([new]))
@@ -0,0 +1,143 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Cached (item, price list, UOM) -> rate matrix shared by the catalog endpoints.
+
+get_items, the bulk catalog enrichment and get_item_variants each queried
+Item Price for their page and resolved the displayed rate their own way. They
+now all read the same matrix:
+
+- MATRIX: one hash per (price list, day), item_code -> {uom: price_list_rate},
+  loaded for missing items in one query and kept for MATRIX_TTL. Only prices
+  that apply to a walk-in sale on that day count: selling rows without a
+  customer or batch, inside their valid_from / valid_upto window (the latest
+  valid_from wins). A price without a UOM is the item's stock UOM price,
+  as in ERPNext. Items without a price are cached as {} so they don't hit
+  the database again. An Item Price change drops its item after commit.
+- Rates are stored in the price list currency and converted to the requested
+  currency on read with one exchange rate per call, so Currency Exchange
+  changes never leave converted rates behind in the cache. Without an
+  exchange rate (ERPNext has none for the date) items come back unpriced
+  rather than priced 1:1.
+"""
+
+import frappe
+from frappe.utils import flt, nowdate
+
+from pos_next.services.cache import hdel_many, hget_many, hset_many
+from pos_next.services.currency_cache import get_exchange_rate, get_price_list_currency
+
+MATRIX = "pos_next:price_matrix:{0}:{1}"
+
+MATRIX_TTL = 2 * 24 * 60 * 60
+
+
+def _load_prices(price_list, item_codes, date):
+	prices = {code: {} for code in item_codes}
+	for row in frappe.db.sql(
+		f"""
+		SELECT ip.item_code, IFNULL(NULLIF(ip.uom, ''), item.stock_uom) AS uom, ip.price_list_rate
+		FROM `tabItem Price` ip
+		INNER JOIN `tabItem` item ON item.name = ip.item_code
+		WHERE ip.price_list = %s
+			AND ip.item_code IN ({", ".join(["%s"] * len(item_codes))})
+			AND ip.selling = 1
+			AND IFNULL(ip.customer, '') = ''
+			AND IFNULL(ip.batch_no, '') = ''
+			AND (ip.valid_from IS NULL OR ip.valid_from <= %s)
+			AND (ip.valid_upto IS NULL OR ip.valid_upto >= %s)
+		ORDER BY ip.valid_from, ip.creation
+		""",
+		(price_list, *item_codes, date, date),
+		as_dict=True,
+	):
+		if row.uom:
+			prices[row.item_code][row.uom] = flt(row.price_list_rate)
+
+	# UOM order decides the fallback price in get_display_price, so keep it stable
+	return {code: dict(sorted(uom_prices.items())) for code, uom_prices in prices.items()}
+
+
+def get_item_prices(item_codes, price_list, currency=None):
+	"""
+	Return {item_code: {uom: rate}} for ``item_codes`` in ``price_list``.
+
+	Rates are in the price list currency, or converted to ``currency`` when
+	given. Items without a price, and every item when there is no exchange
+	rate to ``currency``, map to {}.
+	"""
+	item_codes = list(dict.fromkeys(code for code in item_codes if code))
+	if not item_codes or not price_list:
+		return {code: {} for code in item_codes}
+
+	date = nowdate()
+	key = MATRIX.format(price_list, date)
+	prices = hget_many(key, item_codes)
+
+	missing = [code for code in item_codes if code not in prices]
+	if missing:
+		loaded = _load_prices(price_list, missing, date)
+		hset_many(key, loaded, expires_in_sec=MATRIX_TTL)
+		prices.update(loaded)
+
+	price_list_currency = get_price_list_currency(price_list)
+	if currency and price_list_currency and currency != price_list_currency:
+		rate = get_exchange_rate(price_list_currency, currency, date)
+		if not rate:
+			return {code: {} for code in prices}
+		prices = {
+			code: {uom: flt(value * rate) for uom, value in uom_prices.items()}
+			for code, uom_prices in prices.items()
+		}
+
+	return prices
+
+
+def get_display_price(uom_prices, stock_uom, conversion_factors=None):
+	"""
+	Pick the rate and UOM an item is shown at in the catalog.
+
+	The stock UOM price wins; otherwise the first priced UOM is converted to a
+	per-stock-UOM rate when its conversion factor is known, or shown as is in
+	its own UOM.
+
+	Args:
+		uom_prices (dict): {uom: rate} from get_item_prices
+		stock_uom (str): The item's stock UOM
+		conversion_factors (dict, optional): {uom: conversion_factor}
+
+	Returns:
+		tuple: (rate, uom), or (None, stock_uom) when the item has no price
+	"""
+	if stock_uom and stock_uom in uom_prices:
+		return uom_prices[stock_uom], stock_uom
+	if not uom_prices:
+		return None, stock_uom
+
+	price_uom, rate = next(iter(uom_prices.items()))
+	factor = flt((conversion_factors or {}).get(price_uom))
+	if factor:
+		return rate / factor, stock_uom
+	return rate, price_uom
+
+
+def invalidate_items(price_list, item_codes):
+	hdel_many(MATRIX.format(price_list, nowdate()), list(item_codes))
+
+
+# doc_events
+
+
+def on_item_price_change(doc, method=None):
+	"""Item Price on_update/on_trash: drop the item (and its previous price list/item) after commit."""
+	affected = {(doc.price_list, doc.item_code)}
+	before = doc.get_doc_before_save() if method == "on_update" else None
+	if before:
+		affected.add((before.price_list, before.item_code))
+
+	def invalidate():
+		for price_list, item_code in affected:
+			invalidate_items(price_list, [item_code])
+
+	frappe.db.after_commit.add(invalidate)
@@ -0,0 +1,135 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Paged access to Active serial numbers.
+
+Item lookups used to return every Active serial of an item in the warehouse,
+which for stores holding thousands of serials per SKU bloated each lookup and
+the offline cache. Serials are now read in pages ordered by name:
+
+- get_serial_previews: count plus the first ``limit`` serials for many items
+  in two queries, used by the item lookups.
+- get_serial_page: one keyset page for one item, continuing after a cursor
+  (the last serial_no of the previous page) and optionally narrowed to a
+  prefix of the serial number.
+- count_serials: counts only.
+"""
+
+import frappe
+from frappe.utils import cint
+
+from pos_next.services.tree_cache import expand_group
+
+PREVIEW_SIZE = 50
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def _escape_like(value):
+	return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _scope(item_codes, warehouse, prefix=None):
+	"""Build the WHERE clause shared by every serial query."""
+	warehouses = expand_group("Warehouse", warehouse) or [warehouse]
+	conditions = [
+		f"item_code IN ({', '.join(['%s'] * len(item_codes))})",
+		f"warehouse IN ({', '.join(['%s'] * len(warehouses))})",
+		"status = 'Active'",
+	]
+	params = [*item_codes, *warehouses]
+	if prefix:
+		conditions.append("name LIKE %s")
+		params.append(_escape_like(prefix) + "%")
+	return " AND ".join(conditions), params
+
+
+def count_serials(item_codes, warehouse, prefix=None):
+	"""Return {item_code: count of Active serials at ``warehouse``}."""
+	item_codes = list(dict.fromkeys(code for code in item_codes if code))
+	if not item_codes or not warehouse:
+		return {}
+
+	where, params = _scope(item_codes, warehouse, prefix)
+	rows = frappe.db.sql(
+		f"SELECT item_code, COUNT(*) AS count FROM `tabSerial No` WHERE {where} GROUP BY item_code",
+		params,
+		as_dict=True,
+	)
+	counts = dict.fromkeys(item_codes, 0)
+	counts.update({row.item_code: row.count for row in rows})
+	return counts
+
+
+def get_serial_previews(item_codes, warehouse, limit=PREVIEW_SIZE):
+	"""
+	Return {item_code: {"count": int, "serials": [...]}} for ``item_codes``.
+
+	``serials`` holds the first ``limit`` serials by name as
+	{"serial_no", "warehouse"}; the rest are read with get_serial_page using
+	the last one as cursor.
+	"""
+	counts = count_serials(item_codes, warehouse)
+	previews = {code: {"count": count, "serials": []} for code, count in counts.items()}
+	with_serials = [code for code, count in counts.items() if count]
+	if not with_serials:
+		return previews
+
+	where, params = _scope(with_serials, warehouse)
+	rows = frappe.db.sql(
+		f"""
+		SELECT item_code, serial_no, warehouse
+		FROM (
+			SELECT item_code, name AS serial_no, warehouse,
+				ROW_NUMBER() OVER (PARTITION BY item_code ORDER BY name) AS position
+			FROM `tabSerial No`
+			WHERE {where}
+		) ranked
+		WHERE position <= %s
+		ORDER BY item_code, serial_no
+		""",
+		(*params, cint(limit)),
+		as_dict=True,
+	)
+	for row in rows:
+		previews[row.item_code]["serials"].append({"serial_no": row.serial_no, "warehouse": row.warehouse})
+	return previews
+
+
+def get_serial_page(item_code, warehouse, cursor=None, prefix=None, page_size=PAGE_SIZE):
+	"""
+	Return one page of Active serials of ``item_code`` ordered by name.
+
+	Returns:
+		dict: {"serials": [{"serial_no", "warehouse"}, ...],
+			"next_cursor": serial_no to pass as ``cursor`` for the next page,
+			or None on the last page}
+	"""
+	if not item_code or not warehouse:
+		return {"serials": [], "next_cursor": None}
+
+	page_size = min(max(cint(page_size) or PAGE_SIZE, 1), MAX_PAGE_SIZE)
+	where, params = _scope([item_code], warehouse, prefix)
+	if cursor:
+		where += " AND name > %s"
+		params.append(cursor)
+
+	# One extra row tells whether another page follows
+	rows = frappe.db.sql(
+		f"""
+		SELECT name AS serial_no, warehouse
+		FROM `tabSerial No`
+		WHERE {where}
+		ORDER BY name
+		LIMIT %s
+		""",
+		(*params, page_size + 1),
+		as_dict=True,
+	)
+	has_more = len(rows) > page_size
+	serials = [{"serial_no": row.serial_no, "warehouse": row.warehouse} for row in rows[:page_size]]
+	return {
+		"serials": serials,
+		"next_cursor": serials[-1]["serial_no"] if has_more else None,
+	}
@@ -0,0 +1,94 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Single-flight coalescing for heavy read endpoints.
+
+When a store opens, many terminals call the same catalog endpoints with the
+same arguments within seconds, and every worker used to run the same heavy
+queries in parallel. ``@single_flight()`` lets only one worker compute a
+given call at a time:
+
+- The first caller takes a Redis lock (SET NX with LOCK_TIMEOUT) for the
+  call's key - the function path plus its bound arguments - computes the
+  result and publishes it under a result key for ``result_ttl`` seconds.
+- Concurrent callers with the same key poll for that result instead of
+  computing it, and callers within ``result_ttl`` reuse it directly.
+- If the leader fails (exception, worker killed) the lock is released or
+  expires and waiters compute the result themselves, so a failure is never
+  shared.
+
+Results must be picklable return values; only decorate endpoints whose
+result depends on nothing but their arguments (not on the session user), and
+not lookups a terminal makes right after its own writes (customer search
+after creating a customer), which would be served the result from before the
+write. Place it below ``@frappe.whitelist()``.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import time
+
+import frappe
+
+LOCK_KEY = "pos_next:single_flight:lock:{0}"
+RESULT_KEY = "pos_next:single_flight:result:{0}"
+
+RESULT_TTL = 5
+LOCK_TIMEOUT = 60
+POLL_INTERVAL = 0.05
+
+
+def _call_key(fn, signature, args, kwargs):
+	bound = signature.bind(*args, **kwargs)
+	bound.apply_defaults()
+	payload = json.dumps(bound.arguments, sort_keys=True, default=str)
+	return hashlib.sha1(f"{fn.__module__}.{fn.__qualname__}:{payload}".encode()).hexdigest()
+
+
+def single_flight(result_ttl=RESULT_TTL, lock_timeout=LOCK_TIMEOUT):
+	def decorator(fn):
+		signature = inspect.signature(fn)
+
+		@functools.wraps(fn)
+		def wrapper(*args, **kwargs):
+			cache = frappe.cache()
+			key = _call_key(fn, signature, args, kwargs)
+			result_key = RESULT_KEY.format(key)
+			lock_key = cache.make_key(LOCK_KEY.format(key))
+			token = frappe.generate_hash(length=12)
+
+			deadline = time.monotonic() + lock_timeout
+			while True:
+				# expires=True skips the per-request memo, which would pin the first miss
+				shared = cache.get_value(result_key, expires=True)
+				if shared is not None:
+					return shared["result"]
+
+				if cache.set(lock_key, token, nx=True, ex=lock_timeout):
+					break
+
+				# The leader is still computing; give up on it at its lock timeout
+				if time.monotonic() > deadline:
+					return fn(*args, **kwargs)
+				time.sleep(POLL_INTERVAL)
+
+			try:
+				result = fn(*args, **kwargs)
+				# Wrapped so a None result is still shared
+				cache.set_value(result_key, {"result": result}, expires_in_sec=result_ttl)
+				return result
+			finally:
+				if cache.get(lock_key) == token.encode():
+					cache.delete(lock_key)
+
+		# frappe.get_newargs reads fnargs to map request arguments onto the wrapped signature.
+		# It skips its **kwargs detection when fnargs is set, so functions taking **kwargs
+		# are left to that detection and receive every request argument.
+		if not any(param.kind == inspect.Parameter.VAR_KEYWORD for param in signature.parameters.values()):
+			wrapper.fnargs = list(signature.parameters)
+		return wrapper
+
+	return decorator
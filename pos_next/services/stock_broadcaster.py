@@ -0,0 +1,189 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Coalesced, warehouse-scoped realtime stock updates.
+
+Every POS invoice submit and cancel used to query stock for its rows, one
+query per warehouse, and publish ``pos_stock_update`` to every connected
+user, so each terminal received (and filtered out) the sales of every other
+store. Stock changes are now broadcast in batches:
+
+- After commit, an invoice adds its (warehouse, item) pairs to the PENDING
+  Redis set. The first change of a window also sets the SCHEDULED flag and
+  enqueues one flush job.
+- The flush job waits for the rest of FLUSH_INTERVAL, takes the whole set,
+  reads the stock of every pair in one Bin query and publishes one
+  ``pos_stock_update`` per warehouse to that warehouse's document room.
+  Group warehouses above a changed warehouse get their own aggregated update,
+  so terminals whose profile points at a group keep working. Updates include
+  the soft holds of carts being rung up (see cart_reservations), and a cart
+  changing its holds is queued like a sale.
+- Terminals join the room of their profile warehouse
+  (``doc_subscribe("Warehouse", name)``) and only receive its updates.
+- Each event is logged in the warehouse's stock feed first and carries its
+  ``epoch`` and ``seq`` (see stock_feed), so a terminal that missed events
+  can replay them.
+
+Each window's flush job has its own job id (from the flag's timestamp), so
+changes recorded while a flush runs set a new flag and enqueue the next flush
+instead of being dropped as a duplicate of the running one. A flush that
+finds pairs left behind when it is done schedules another one. If a flush job
+is lost, its flag expires after SCHEDULE_TIMEOUT and the next change
+schedules another one.
+"""
+
+import time
+
+import frappe
+from frappe.utils import flt, now
+
+from pos_next.services.cart_reservations import apply_cart_reservations, get_holds
+from pos_next.services.stock_feed import append
+from pos_next.services.tree_cache import expand_group, get_ancestors
+
+EVENT = "pos_stock_update"
+
+PENDING_KEY = "pos_next:stock_broadcast:pending"
+SCHEDULED_KEY = "pos_next:stock_broadcast:scheduled"
+
+FLUSH_INTERVAL = 1.0
+SCHEDULE_TIMEOUT = 30
+
+
+def queue_stock_changes(pairs):
+	"""Record changed (warehouse, item_code) pairs and make sure a flush is scheduled."""
+	members = {f"{warehouse}\n{item_code}" for warehouse, item_code in pairs if warehouse and item_code}
+	if not members:
+		return
+
+	frappe.cache().sadd(PENDING_KEY, *members)
+	_schedule_flush()
+
+
+def _schedule_flush():
+	"""Enqueue a flush unless one is already scheduled for the current window."""
+	cache = frappe.cache()
+	scheduled_at = repr(time.time())
+	if cache.set(cache.make_key(SCHEDULED_KEY), scheduled_at, nx=True, ex=SCHEDULE_TIMEOUT):
+		frappe.enqueue(
+			"pos_next.services.stock_broadcaster.flush",
+			queue="short",
+			job_id=f"pos_stock_broadcast_flush:{scheduled_at}",
+			scheduled_at=scheduled_at,
+		)
+
+
+def _take_pending():
+	cache = frappe.cache()
+	key = cache.make_key(PENDING_KEY)
+	pipe = cache.pipeline()
+	pipe.smembers(key)
+	pipe.delete(key)
+	members, _ = pipe.execute()
+
+	pairs = set()
+	for member in members:
+		warehouse, item_code = frappe.safe_decode(member).split("\n", 1)
+		pairs.add((warehouse, item_code))
+	return pairs
+
+
+def get_stock_updates(pairs):
+	"""
+	Return {warehouse: [stock update, ...]} for changed (warehouse, item_code) pairs.
+
+	Each changed warehouse and every group warehouse above it gets an update
+	per changed item, in the shape get_stock_quantities returns.
+	"""
+	items_by_target = {}
+	for warehouse, item_code in pairs:
+		for target in [warehouse, *get_ancestors("Warehouse", warehouse)]:
+			items_by_target.setdefault(target, set()).add(item_code)
+	if not items_by_target:
+		return {}
+
+	leaves_by_target = {target: expand_group("Warehouse", target) or [target] for target in items_by_target}
+	item_codes = sorted({code for codes in items_by_target.values() for code in codes})
+	warehouses = sorted({leaf for leaves in leaves_by_target.values() for leaf in leaves})
+
+	bins = {}
+	for row in frappe.db.sql(
+		f"""
+		SELECT item_code, warehouse, actual_qty, reserved_qty
+		FROM `tabBin`
+		WHERE item_code IN ({", ".join(["%s"] * len(item_codes))})
+			AND warehouse IN ({", ".join(["%s"] * len(warehouses))})
+		""",
+		(*item_codes, *warehouses),
+		as_dict=True,
+	):
+		bins[(row.warehouse, row.item_code)] = (flt(row.actual_qty), flt(row.reserved_qty))
+
+	holds = get_holds([*warehouses, *items_by_target])
+
+	updates = {}
+	for target, codes in items_by_target.items():
+		scope = {target, *leaves_by_target[target]}
+		for item_code in sorted(codes):
+			actual_qty = sum(bins.get((wh, item_code), (0, 0))[0] for wh in scope)
+			reserved_qty = sum(bins.get((wh, item_code), (0, 0))[1] for wh in scope)
+			carts = {}
+			for wh in scope:
+				for holder, qty in holds.get((wh, item_code), {}).items():
+					carts[holder] = carts.get(holder, 0) + qty
+			updates.setdefault(target, []).append(
+				apply_cart_reservations(
+					{
+						"item_code": item_code,
+						"warehouse": target,
+						"actual_qty": actual_qty,
+						"stock_qty": actual_qty,
+						"reserved_qty": reserved_qty,
+					},
+					carts,
+				)
+			)
+	return updates
+
+
+def flush(scheduled_at=None):
+	"""Background job: publish the pending stock changes, one event per warehouse room."""
+	cache = frappe.cache()
+	flag_key = cache.make_key(SCHEDULED_KEY)
+	delay = flt(scheduled_at) + FLUSH_INTERVAL - time.time()
+	if delay > 0:
+		time.sleep(min(delay, FLUSH_INTERVAL))
+
+	# Clear our own flag before taking the set: later changes schedule the next flush
+	if scheduled_at and frappe.safe_decode(cache.get(flag_key)) == scheduled_at:
+		cache.delete(flag_key)
+	pairs = _take_pending()
+	if pairs:
+		_publish(pairs)
+
+	# Safety net: pairs left behind (e.g. our flag had expired) get a flush of their own
+	pipe = cache.pipeline()
+	pipe.scard(cache.make_key(PENDING_KEY))
+	if pipe.execute()[0]:
+		_schedule_flush()
+
+
+def _publish(pairs):
+	timestamp = now()
+	for warehouse, stock_updates in get_stock_updates(pairs).items():
+		# Logged first, so a client replaying from this seq can never miss the event
+		position = append(warehouse, stock_updates, timestamp)
+		frappe.publish_realtime(
+			event=EVENT,
+			message={
+				"warehouses": [warehouse],
+				"stock_updates": stock_updates,
+				"timestamp": timestamp,
+				"event_type": "batch",
+				"epoch": position["epoch"],
+				"seq": position["seq"],
+			},
+			doctype="Warehouse",
+			docname=warehouse,
+		)
@@ -0,0 +1,141 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Sequenced per-warehouse log of broadcast stock changes.
+
+A terminal whose socket dropped for a moment used to miss the
+``pos_stock_update`` events of that window and kept selling against stale
+quantities until a full reload. Every broadcast now goes through this feed:
+
+- SEQ_KEY: a counter per warehouse, incremented for each event, so events
+  carry a strictly increasing ``seq`` and a client notices a gap.
+- LOG_KEY: a sorted set per warehouse holding the last RETENTION events
+  ("<seq>\\n<pickled event>", scored by ``seq``, expiring after LOG_TTL
+  without new events), from which get_changes_since replays what a client
+  missed. APPEND_SCRIPT takes the next seq and logs the event in one atomic
+  step, so a seq is never published without its log entry.
+- EPOCH_KEY: a random token shared by all warehouses. A Redis flush resets
+  the counters, and the new epoch tells clients their ``seq`` means nothing
+  any more.
+
+When a client is further behind than the log reaches, or on another epoch,
+it is told to reload its stock with get_stock_quantities instead.
+"""
+
+import pickle
+
+import frappe
+from frappe.utils import cint
+
+SEQ_KEY = "pos_next:stock_feed:seq:{0}"
+LOG_KEY = "pos_next:stock_feed:events:{0}"
+EPOCH_KEY = "pos_next:stock_feed:epoch"
+
+RETENTION = 500
+LOG_TTL = 24 * 60 * 60
+
+# KEYS: seq counter, log; ARGV: pickled event, retention, ttl. Returns the event's seq.
+APPEND_SCRIPT = """
+local seq = redis.call("INCR", KEYS[1])
+redis.call("ZADD", KEYS[2], seq, seq .. "\\n" .. ARGV[1])
+redis.call("ZREMRANGEBYRANK", KEYS[2], 0, -(tonumber(ARGV[2]) + 1))
+redis.call("EXPIRE", KEYS[2], ARGV[3])
+return seq
+"""
+
+
+def _decode(value):
+	return value.decode() if isinstance(value, bytes) else value
+
+
+def get_epoch():
+	cache = frappe.cache()
+	key = cache.make_key(EPOCH_KEY)
+	epoch = cache.get(key)
+	if not epoch:
+		cache.set(key, frappe.generate_hash(length=8), nx=True)
+		epoch = cache.get(key)
+	return _decode(epoch)
+
+
+def get_seq(warehouse):
+	cache = frappe.cache()
+	return cint(_decode(cache.get(cache.make_key(SEQ_KEY.format(warehouse)))))
+
+
+def append(warehouse, stock_updates, timestamp):
+	"""Log one event for ``warehouse``. Returns {"epoch", "seq"} to publish with it."""
+	cache = frappe.cache()
+	epoch = get_epoch()
+	seq = cache.eval(
+		APPEND_SCRIPT,
+		2,
+		cache.make_key(SEQ_KEY.format(warehouse)),
+		cache.make_key(LOG_KEY.format(warehouse)),
+		pickle.dumps({"stock_updates": stock_updates, "timestamp": timestamp}),
+		RETENTION,
+		LOG_TTL,
+	)
+
+	return {"epoch": epoch, "seq": cint(seq)}
+
+
+def _load_entry(value):
+	seq, payload = value.split(b"\n", 1)
+	entry = pickle.loads(payload)
+	entry["seq"] = cint(seq)
+	return entry
+
+
+def get_changes_since(warehouse, seq=None, epoch=None):
+	"""
+	Return the stock changes of ``warehouse`` after ``seq``.
+
+	Without ``seq`` only the current position is returned, which is where a
+	client that has just loaded its stock starts following the feed.
+
+	Returns:
+		dict: {"warehouse", "epoch", "seq": latest seq,
+			"full_sync": True when the changes since ``seq`` are no longer
+			(or were never) in the log and stock must be reloaded,
+			"stock_updates": latest update per item since ``seq``}
+	"""
+	current_epoch = get_epoch()
+	current_seq = get_seq(warehouse)
+	response = {
+		"warehouse": warehouse,
+		"epoch": current_epoch,
+		"seq": current_seq,
+		"full_sync": False,
+		"stock_updates": [],
+	}
+
+	if seq in (None, ""):
+		return response
+
+	seq = cint(seq)
+	if (epoch and epoch != current_epoch) or seq > current_seq:
+		response["full_sync"] = True
+		return response
+	if seq == current_seq:
+		return response
+
+	cache = frappe.cache()
+	entries = [
+		_load_entry(value)
+		for value in cache.zrangebyscore(cache.make_key(LOG_KEY.format(warehouse)), f"({seq}", "+inf")
+	]
+
+	# The log must still hold the event right after the client's position
+	if not entries or entries[0]["seq"] != seq + 1:
+		response["full_sync"] = True
+		return response
+
+	latest = {}
+	for entry in entries:
+		for update in entry["stock_updates"]:
+			latest[update["item_code"]] = update
+	response["seq"] = entries[-1]["seq"]
+	response["stock_updates"] = list(latest.values())
+	return response
@@ -0,0 +1,89 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Item x warehouse stock matrix for "where else is it in stock?" lookups.
+
+get_item_warehouse_availability used to aggregate Bin across every warehouse
+on each lookup and then look up warehouse names row by row. This module keeps:
+
+- MATRIX: item_code -> {"at": timestamp, "bins": {warehouse: [actual_qty, reserved_qty]}},
+  loaded from Bin for missing items in one query and dropped for an item as
+  soon as a Stock Ledger Entry is posted for it. Rows older than MATRIX_TTL
+  are reloaded, which covers reserved-quantity changes (Sales Orders update
+  Bin without a ledger entry).
+- WAREHOUSES: warehouse -> {"warehouse_name", "company"} for every warehouse,
+  dropped on any Warehouse change, so display names are joined from memory.
+"""
+
+import time
+
+import frappe
+from frappe.utils import flt
+
+from pos_next.services.cache import hdel_many, hget_many, hset_many
+
+MATRIX = "pos_next:stock_matrix"
+WAREHOUSES = "pos_next:warehouse_directory"
+
+MATRIX_TTL = 300
+
+
+def get_stock_matrix(item_codes):
+	"""Return {item_code: {warehouse: [actual_qty, reserved_qty]}} for ``item_codes``."""
+	item_codes = list(dict.fromkeys(item_codes))
+	if not item_codes:
+		return {}
+
+	now = time.time()
+	cached = hget_many(MATRIX, item_codes)
+	matrix = {code: row["bins"] for code, row in cached.items() if now - row["at"] < MATRIX_TTL}
+
+	missing = [code for code in item_codes if code not in matrix]
+	if missing:
+		loaded = {code: {} for code in missing}
+		for row in frappe.db.sql(
+			f"""
+			SELECT item_code, warehouse, actual_qty, reserved_qty
+			FROM `tabBin`
+			WHERE item_code IN ({", ".join(["%s"] * len(missing))})
+				AND (actual_qty != 0 OR reserved_qty != 0)
+			""",
+			tuple(missing),
+			as_dict=True,
+		):
+			loaded[row.item_code][row.warehouse] = [flt(row.actual_qty), flt(row.reserved_qty)]
+
+		hset_many(MATRIX, {code: {"at": now, "bins": bins} for code, bins in loaded.items()})
+		matrix.update(loaded)
+
+	return matrix
+
+
+def get_warehouse_directory():
+	"""Return {warehouse: {"warehouse_name", "company"}} for all warehouses."""
+	directory = frappe.cache().get_value(WAREHOUSES)
+	if directory is None:
+		directory = {
+			row.name: {"warehouse_name": row.warehouse_name, "company": row.company}
+			for row in frappe.get_all("Warehouse", fields=["name", "warehouse_name", "company"])
+		}
+		frappe.cache().set_value(WAREHOUSES, directory)
+	return directory
+
+
+def invalidate_items(item_codes):
+	hdel_many(MATRIX, list(item_codes))
+
+
+# doc_events
+
+
+def on_stock_ledger_entry(doc, method=None):
+	"""Stock Ledger Entry on_submit/on_cancel: drop the item's row after commit."""
+	item_code = doc.item_code
+	frappe.db.after_commit.add(lambda: invalidate_items([item_code]))
+
+
+def on_warehouse_change(doc, method=None, *args, **kwargs):
+	frappe.db.after_commit.add(lambda: frappe.cache().delete_value(WAREHOUSES))
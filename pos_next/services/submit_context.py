@@ -0,0 +1,171 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Per-POS-Profile settings and schema facts used while saving and submitting invoices.
+
+One submit_invoice call read POS Settings one field per query
+(allow_negative_stock twice, allow_zero_valuation, disable_rounded_total,
+return_validity_days), the Sales Invoice validate hook read tax_inclusive and
+the loyalty settings again, and every call probed has_column for optional
+custom fields and scanned the Sales Invoice meta. All of it only changes when
+a POS Profile, its POS Settings or the schema changes, so it is compiled once
+per profile into a context held in the CONTEXT_KEY hash:
+
+- POS Settings: allow_negative_stock, allow_zero_valuation,
+  disable_rounded_total (None when unset or the column doesn't exist),
+  return_validity_days, tax_inclusive, enable_loyalty_program,
+  default_loyalty_program
+- POS Profile: block_sale (posa_block_sale_beyond_available_qty),
+  discount_account (the first set of custom_diskon_akun / diskon_akun /
+  discount_account), retur_account (custom_retur)
+- Schema: has_promo_discount_amount, has_additional_discount_account,
+  pricing_rule_detail_field, has_pricing_rule_discount_account
+
+Saving or deleting a POS Profile drops its context and POS Settings changes
+drop all of them, after commit. Schema changes (DocType, Custom Field,
+Property Setter) and migrations drop all of them too.
+
+Each entry is stored as {"at", "generation", "context"}. Invalidating bumps
+the GENERATION_KEY counter (the profile's, or the global one), and an entry
+built under an older generation is ignored, so a request that read the old
+settings and writes its context after the invalidation can't bring them
+back. Entries older than CONTEXT_TTL are rebuilt as well.
+"""
+
+import time
+
+import frappe
+from frappe.utils import cint
+
+from pos_next.services.cache import hset_many
+
+CONTEXT_KEY = "pos_next:submit_context"
+GENERATION_KEY = "pos_next:submit_context:generation:{0}"
+
+CONTEXT_TTL = 6 * 60 * 60
+
+DISCOUNT_ACCOUNT_FIELDS = ("custom_diskon_akun", "diskon_akun", "discount_account")
+
+
+def _existing_columns(doctype, fieldnames):
+	return [fieldname for fieldname in fieldnames if frappe.db.has_column(doctype, fieldname)]
+
+
+def _build_context(pos_profile):
+	settings_fields = [
+		"allow_negative_stock",
+		"allow_zero_valuation",
+		"return_validity_days",
+		"tax_inclusive",
+		"enable_loyalty_program",
+		"default_loyalty_program",
+		*_existing_columns("POS Settings", ["disable_rounded_total"]),
+	]
+	settings = frappe.db.get_value(
+		"POS Settings", {"pos_profile": pos_profile}, settings_fields, as_dict=True
+	) or frappe._dict()
+
+	profile_fields = _existing_columns(
+		"POS Profile",
+		["posa_block_sale_beyond_available_qty", "custom_retur", *DISCOUNT_ACCOUNT_FIELDS],
+	)
+	profile = (
+		frappe.db.get_value("POS Profile", pos_profile, profile_fields, as_dict=True)
+		if profile_fields
+		else None
+	) or frappe._dict()
+
+	sales_invoice_meta = frappe.get_meta("Sales Invoice")
+	pricing_rule_detail_field = next(
+		(
+			df.fieldname
+			for df in sales_invoice_meta.fields
+			if df.fieldtype == "Table" and df.options == "Pricing Rule Detail"
+		),
+		None,
+	)
+
+	return {
+		"pos_profile": pos_profile,
+		"allow_negative_stock": cint(settings.get("allow_negative_stock")),
+		"allow_zero_valuation": cint(settings.get("allow_zero_valuation")),
+		"disable_rounded_total": settings.get("disable_rounded_total"),
+		"return_validity_days": cint(settings.get("return_validity_days")),
+		"tax_inclusive": cint(settings.get("tax_inclusive")),
+		"enable_loyalty_program": cint(settings.get("enable_loyalty_program")),
+		"default_loyalty_program": settings.get("default_loyalty_program"),
+		"block_sale": profile.get("posa_block_sale_beyond_available_qty"),
+		"discount_account": next(
+			(profile.get(fieldname) for fieldname in DISCOUNT_ACCOUNT_FIELDS if profile.get(fieldname)),
+			None,
+		),
+		"retur_account": profile.get("custom_retur"),
+		"has_promo_discount_amount": frappe.db.has_column("Sales Invoice", "custom_promo_discount_amount"),
+		"has_additional_discount_account": sales_invoice_meta.has_field("additional_discount_account"),
+		"pricing_rule_detail_field": pricing_rule_detail_field,
+		"has_pricing_rule_discount_account": frappe.db.has_column("Pricing Rule", "custom_discount_account"),
+	}
+
+
+def get_submit_context(pos_profile):
+	"""Return the compiled submit context of ``pos_profile`` as a frappe._dict, or None without a profile."""
+	if not pos_profile:
+		return None
+
+	generation = _get_generation(pos_profile)
+	entry = frappe.cache().hget(CONTEXT_KEY, pos_profile)
+	if (
+		isinstance(entry, dict)
+		and entry.get("generation") == generation
+		and time.time() - entry["at"] < CONTEXT_TTL
+	):
+		return frappe._dict(entry["context"])
+
+	context = _build_context(pos_profile)
+	hset_many(
+		CONTEXT_KEY,
+		{pos_profile: {"at": time.time(), "generation": generation, "context": context}},
+		expires_in_sec=CONTEXT_TTL,
+	)
+	return frappe._dict(context)
+
+
+def _get_generation(pos_profile):
+	"""Return the global and profile invalidation counters, read before a context is built."""
+	cache = frappe.cache()
+	values = cache.mget(
+		[cache.make_key(GENERATION_KEY.format("")), cache.make_key(GENERATION_KEY.format(pos_profile))]
+	)
+	return ".".join(frappe.safe_decode(value) if value else "0" for value in values)
+
+
+def invalidate(pos_profile=None):
+	"""Drop the context of ``pos_profile``, or of every profile."""
+	cache = frappe.cache()
+	cache.incr(cache.make_key(GENERATION_KEY.format(pos_profile or "")))
+	if pos_profile:
+		cache.hdel(CONTEXT_KEY, pos_profile)
+	else:
+		cache.delete_value(CONTEXT_KEY)
+
+
+# doc_events
+
+
+def on_pos_profile_change(doc, method=None, *args, **kwargs):
+	"""POS Profile on_update/on_trash/after_rename: drop its context after commit."""
+	names = {doc.name}
+	if method == "after_rename" and args:
+		names.add(args[0])
+
+	def drop():
+		for name in names:
+			invalidate(name)
+
+	frappe.db.after_commit.add(drop)
+
+
+def on_settings_change(doc, method=None, *args, **kwargs):
+	"""POS Settings changes (which may move between profiles) and schema changes: drop every context after commit."""
+	frappe.db.after_commit.add(invalidate)
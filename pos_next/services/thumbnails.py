@@ -0,0 +1,231 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Fixed-size thumbnails of Item images for the POS grid.
+
+The catalog endpoints used to hand out only the raw ``image`` path, so the
+grid downloaded full-resolution uploads for every tile. Thumbnails are now
+written next to the site's public files as
+
+	/files/pos_thumbnails/<key>.webp   (JPEG where Pillow lacks WebP)
+
+where ``key`` hashes the source path and its modification time: the URL of a
+thumbnail never changes while its source doesn't, so browsers and the offline
+cache can keep it indefinitely, and a replaced image gets a new URL.
+
+Thumbnails are generated in the background when an Item's image changes, or
+for images met by a catalog request before one exists; until then the
+catalog reports ``thumbnail`` as None and clients keep using ``image``.
+Only public ``/files/`` images get thumbnails, so private files stay private.
+
+A job that wrote thumbnails bumps the catalog version once, and logs the
+items using those images in WRITTEN_LOG (scored by time, kept for
+WRITTEN_LOG_RETENTION) so delta syncs can send their new URL even though the
+Item itself didn't change. A client that misses an entry keeps using
+``image`` for that item.
+
+Which thumbnail an image has is cached per NAMES_TTL window, so catalog
+requests (get_items runs on every search keystroke) don't stat the same
+files again.
+"""
+
+import hashlib
+import os
+from urllib.parse import unquote
+
+import frappe
+from frappe.utils import get_datetime, now_datetime
+from PIL import Image, ImageOps, features
+
+from pos_next.services.cache import hget_many, hset_many
+from pos_next.services.content_version import bump
+
+THUMBNAIL_DIR = "pos_thumbnails"
+THUMBNAIL_SIZE = 300
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_FORMAT = "webp" if features.check("webp") else "jpeg"
+THUMBNAIL_EXTENSION = "webp" if THUMBNAIL_FORMAT == "webp" else "jpg"
+
+WRITTEN_LOG = "pos_next:thumbnails:written"
+WRITTEN_LOG_RETENTION = 7 * 24 * 60 * 60
+
+# image -> thumbnail name ("" when the image can't have one), one hash per window
+NAMES_KEY = "pos_next:thumbnails:names:{0}"
+NAMES_TTL = 10 * 60
+
+URL_BATCH_SIZE = 1000
+
+
+def _source_path(image):
+	"""Absolute path of a public site file URL, or None for anything else."""
+	if not image or not image.startswith("/files/"):
+		return None
+	path = os.path.realpath(frappe.get_site_path("public", unquote(image.split("?")[0]).lstrip("/")))
+	files_dir = os.path.realpath(frappe.get_site_path("public", "files"))
+	if not path.startswith(files_dir + os.sep) or not os.path.isfile(path):
+		return None
+	return path
+
+
+def _thumbnail_name(image, source_path):
+	signature = f"{image}:{os.stat(source_path).st_mtime_ns}:{THUMBNAIL_SIZE}"
+	key = hashlib.sha1(signature.encode()).hexdigest()[:20]
+	return f"{key}.{THUMBNAIL_EXTENSION}"
+
+
+def _thumbnail_path(name):
+	return frappe.get_site_path("public", "files", THUMBNAIL_DIR, name)
+
+
+def generate_thumbnail(image):
+	"""Write the thumbnail of ``image`` if it is missing. Returns True if one was written."""
+	source_path = _source_path(image)
+	if not source_path:
+		return False
+
+	path = _thumbnail_path(_thumbnail_name(image, source_path))
+	if os.path.exists(path):
+		return False
+
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	with Image.open(source_path) as source:
+		thumbnail = ImageOps.exif_transpose(source)
+		thumbnail.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+		if THUMBNAIL_FORMAT == "jpeg" and thumbnail.mode not in ("RGB", "L"):
+			thumbnail = thumbnail.convert("RGB")
+		elif THUMBNAIL_FORMAT == "webp" and thumbnail.mode not in ("RGB", "RGBA"):
+			thumbnail = thumbnail.convert("RGBA")
+
+		# Write under a temporary name so a reader never sees a partial file
+		tmp_path = f"{path}.{frappe.generate_hash(length=8)}.tmp"
+		thumbnail.save(tmp_path, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY)
+		os.replace(tmp_path, path)
+
+	return True
+
+
+def generate_thumbnails(images):
+	"""Background job: generate thumbnails for ``images``, skipping unreadable files."""
+	written = []
+	for image in images:
+		try:
+			if generate_thumbnail(image):
+				written.append(image)
+		except Exception:
+			frappe.log_error(frappe.get_traceback(), f"POS Thumbnail Error: {image}")
+
+	if not written:
+		return
+
+	# Catalog replies now carry new thumbnail URLs; let versioned and delta clients refetch
+	_log_written(frappe.get_all("Item", filters={"image": ["in", written]}, pluck="name"))
+	bump("catalog")
+
+
+def _log_written(item_codes):
+	cache = frappe.cache()
+	key = cache.make_key(WRITTEN_LOG)
+	now = get_datetime(now_datetime()).timestamp()
+	pipe = cache.pipeline()
+	if item_codes:
+		pipe.zadd(key, dict.fromkeys(item_codes, now))
+	pipe.zremrangebyscore(key, "-inf", now - WRITTEN_LOG_RETENTION)
+	pipe.expire(key, WRITTEN_LOG_RETENTION)
+	pipe.execute()
+
+
+def get_items_with_new_thumbnails(since):
+	"""
+	Return the codes of items whose thumbnail was written after ``since`` (a datetime).
+
+	Only the last WRITTEN_LOG_RETENTION is known, so an older ``since`` gets
+	what the log still holds.
+	"""
+	since = get_datetime(since).timestamp()
+	cache = frappe.cache()
+	return {
+		frappe.safe_decode(code)
+		for code in cache.zrangebyscore(cache.make_key(WRITTEN_LOG), f"({since}", "+inf")
+	}
+
+
+def enqueue_thumbnails(images):
+	images = sorted(set(images))
+	if not images:
+		return
+	frappe.enqueue(
+		"pos_next.services.thumbnails.generate_thumbnails",
+		queue="short",
+		images=images,
+		job_id=f"pos_thumbnails:{hashlib.sha1(':'.join(images).encode()).hexdigest()[:16]}",
+		deduplicate=True,
+	)
+
+
+def _get_thumbnail_names(images):
+	"""
+	Return {image: thumbnail name} for the given images.
+
+	Images that can't have a thumbnail map to "". Missing thumbnails of public
+	images are left out and queued for generation, so a later catalog load
+	picks them up.
+	"""
+	window = int(get_datetime(now_datetime()).timestamp() // NAMES_TTL)
+	key = NAMES_KEY.format(window)
+	names = hget_many(key, images)
+
+	found, missing = {}, []
+	for image in set(images) - set(names):
+		source_path = _source_path(image)
+		if not source_path:
+			found[image] = ""
+			continue
+
+		name = _thumbnail_name(image, source_path)
+		if os.path.exists(_thumbnail_path(name)):
+			found[image] = name
+		else:
+			missing.append(image)
+
+	hset_many(key, found, expires_in_sec=NAMES_TTL)
+	enqueue_thumbnails(missing)
+	names.update(found)
+	return names
+
+
+def _thumbnail_url(name):
+	return f"/files/{THUMBNAIL_DIR}/{name}" if name else None
+
+
+def attach_thumbnails(items):
+	"""Set ``thumbnail`` on catalog rows: the thumbnail URL when it exists, else None."""
+	names = _get_thumbnail_names({item["image"] for item in items if item.get("image")})
+	for item in items:
+		item["thumbnail"] = _thumbnail_url(names.get(item.get("image")))
+	return items
+
+
+def get_thumbnail_urls(item_codes):
+	"""Return {item_code: thumbnail URL or None} for the given items."""
+	item_codes = sorted(item_codes)
+	urls = {}
+	for i in range(0, len(item_codes), URL_BATCH_SIZE):
+		rows = frappe.get_all(
+			"Item",
+			filters={"name": ["in", item_codes[i : i + URL_BATCH_SIZE]]},
+			fields=["name", "image"],
+		)
+		names = _get_thumbnail_names({row.image for row in rows if row.image})
+		urls.update((row.name, _thumbnail_url(names.get(row.image))) for row in rows)
+	return urls
+
+
+# doc_events
+
+
+def on_item_update(doc, method=None):
+	"""Item on_update: pre-generate the thumbnail of a new or changed image."""
+	if doc.image and doc.has_value_changed("image"):
+		image = doc.image
+		frappe.db.after_commit.add(lambda: enqueue_thumbnails([image]))
@@ -0,0 +1,103 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Cached closure of nested-set trees (Warehouse, Item Group).
+
+Expanding a group warehouse or item group used to cost an is_group lookup
+plus a lft/rgt descendants query on every call, several times per request.
+This module reads a whole tree once, computes every node's ancestors and
+descendants, and keeps them in a Redis hash (one field per node) so each
+expansion is a single O(1) hget, memoised per request by RedisWrapper.
+
+The hash is dropped whenever a node of the tree is saved, deleted or renamed
+(see hooks.py) and rebuilt on the next read.
+"""
+
+import frappe
+
+from pos_next.services.cache import hset_many
+
+TREE_KEY = "pos_next:tree:{0}"
+
+# Field marking a fully built hash, so a missing node means "not in the tree"
+BUILT_FIELD = "__built__"
+
+
+def _build_tree(doctype):
+	"""Read the tree in lft order and derive every node's closure."""
+	rows = frappe.db.sql(
+		f"SELECT name, lft, rgt, is_group FROM `tab{doctype}` ORDER BY lft",
+		as_dict=True,
+	)
+
+	nodes = {}
+	stack = []
+	for row in rows:
+		# Close the open ancestors whose range ends before this node
+		while stack and stack[-1].rgt < row.lft:
+			stack.pop()
+
+		ancestors = [parent.name for parent in reversed(stack)]
+		nodes[row.name] = {
+			"is_group": row.is_group or 0,
+			"ancestors": ancestors,  # nearest first, like get_ancestors_of
+			"descendants": [],
+		}
+		for ancestor in ancestors:
+			nodes[ancestor]["descendants"].append(row.name)
+		stack.append(row)
+
+	nodes[BUILT_FIELD] = 1
+	hset_many(TREE_KEY.format(doctype), nodes)
+	return nodes
+
+
+def _get_node(doctype, name):
+	cache = frappe.cache()
+	key = TREE_KEY.format(doctype)
+	if not cache.hget(key, BUILT_FIELD):
+		return _build_tree(doctype).get(name)
+	return cache.hget(key, name)
+
+
+def is_group(doctype, name):
+	node = _get_node(doctype, name)
+	return bool(node and node["is_group"])
+
+
+def get_descendants(doctype, name):
+	"""All descendants of ``name`` (excluding itself), like frappe.db.get_descendants."""
+	node = _get_node(doctype, name)
+	return list(node["descendants"]) if node else []
+
+
+def get_ancestors(doctype, name):
+	"""Ancestors of ``name`` nearest first, like frappe.utils.nestedset.get_ancestors_of."""
+	node = _get_node(doctype, name)
+	return list(node["ancestors"]) if node else []
+
+
+def expand_group(doctype, name):
+	"""
+	Return [name] for a leaf, or its descendants for a group node.
+
+	Mirrors the `is_group` check + `get_descendants` pattern used for group
+	warehouses; the list is empty for a group without children, so callers
+	keep their own fallback.
+	"""
+	node = _get_node(doctype, name)
+	if node and node["is_group"]:
+		return list(node["descendants"])
+	return [name]
+
+
+def invalidate_tree(doctype):
+	frappe.cache().delete_value(TREE_KEY.format(doctype))
+
+
+def on_tree_change(doc, method=None, *args, **kwargs):
+	"""doc_events hook for tree doctypes (on_update, on_trash, after_rename)."""
+	invalidate_tree(doc.doctype)
+	# Drop again after commit so a concurrent read can't re-cache the old tree
+	frappe.db.after_commit.add(lambda: invalidate_tree(doc.doctype))
@@ -7,6 +7,8 @@
 import frappe
 from frappe.utils import nowdate, getdate
 
+from pos_next.services.content_version import bump
+
 
 def disable_expired_pricing_rules():
 	"""
@@ -65,6 +67,10 @@ def disable_expired_pricing_rules():
 		# Commit all changes
 		frappe.db.commit()
 
+		# set_value skips doc events, so bump the offers version here
+		if disabled_count:
+			bump("offers")
+
 		# Log summary
 		summary = f"Disabled {disabled_count} expired pricing rule(s)"
 		if errors:
@@ -156,6 +162,10 @@ def disable_expired_promotional_schemes():
 		# Commit all changes
 		frappe.db.commit()
 
+		# set_value skips doc events, so bump the offers version here
+		if disabled_count:
+			bump("offers")
+
 		# Log summary
 		summary = f"Disabled {disabled_count} expired promotional scheme(s)"
 		if errors:
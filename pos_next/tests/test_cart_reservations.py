@@ -0,0 +1,62 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from pos_next.services import cart_reservations
+
+WAREHOUSE = "_Test Cart Reservations - T"
+
+
+class TestCartReservations(FrappeTestCase):
+	def setUp(self):
+		cache = frappe.cache()
+		cache.delete(cache.make_key(cart_reservations.HOLDS_KEY.format(WAREHOUSE)))
+		self.addCleanup(cache.delete, cache.make_key(cart_reservations.HOLDS_KEY.format(WAREHOUSE)))
+		for cart_id, user in (("cart-a", "a@example.com"), ("cart-a", "b@example.com")):
+			self.addCleanup(cart_reservations.release_cart, cart_id, user)
+
+	def test_hold_replaces_previous_holds(self):
+		changed = cart_reservations.hold_cart(
+			"cart-a", {(WAREHOUSE, "ITEM-1"): 2, (WAREHOUSE, "ITEM-2"): 1}, user="a@example.com"
+		)
+		self.assertEqual(changed, {(WAREHOUSE, "ITEM-1"), (WAREHOUSE, "ITEM-2")})
+
+		changed = cart_reservations.hold_cart("cart-a", {(WAREHOUSE, "ITEM-1"): 3}, user="a@example.com")
+		self.assertEqual(changed, {(WAREHOUSE, "ITEM-1"), (WAREHOUSE, "ITEM-2")})
+
+		holder = cart_reservations.get_holder("cart-a", "a@example.com")
+		self.assertEqual(cart_reservations.get_holds([WAREHOUSE]), {(WAREHOUSE, "ITEM-1"): {holder: 3}})
+
+	def test_same_cart_id_of_another_user_is_another_cart(self):
+		cart_reservations.hold_cart("cart-a", {(WAREHOUSE, "ITEM-1"): 2}, user="a@example.com")
+		cart_reservations.hold_cart("cart-a", {(WAREHOUSE, "ITEM-1"): 1}, user="b@example.com")
+		cart_reservations.release_cart("cart-a", user="b@example.com")
+
+		holds = cart_reservations.get_holds([WAREHOUSE])[(WAREHOUSE, "ITEM-1")]
+		self.assertEqual(list(holds.values()), [2])
+
+	def test_held_qty_excludes_own_cart(self):
+		cart_reservations.hold_cart("cart-a", {(WAREHOUSE, "ITEM-1"): 2}, user="a@example.com")
+		cart_reservations.hold_cart("cart-a", {(WAREHOUSE, "ITEM-1"): 1}, user="b@example.com")
+
+		with patch.object(frappe.session, "user", "a@example.com"):
+			held = cart_reservations.get_held_qty(["ITEM-1"], WAREHOUSE, exclude_cart="cart-a")
+		self.assertEqual(held, {"ITEM-1": 1})
+
+	def test_expired_holds_are_dropped(self):
+		cart_reservations.hold_cart("cart-a", {(WAREHOUSE, "ITEM-1"): 2}, ttl=-1, user="a@example.com")
+
+		self.assertEqual(cart_reservations.get_holds([WAREHOUSE]), {})
+
+	def test_stock_rows_carry_totals_only(self):
+		row = cart_reservations.apply_cart_reservations(
+			{"item_code": "ITEM-1", "actual_qty": 10, "reserved_qty": 2}, {"holder-a": 3, "holder-b": 1}
+		)
+
+		self.assertNotIn("cart_reservations", row)
+		self.assertEqual(row["cart_reserved_qty"], 4)
+		self.assertEqual(row["available_qty"], 4)
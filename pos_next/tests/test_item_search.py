@@ -0,0 +1,47 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from pos_next.services import item_search
+
+
+class TestItemSearchTokens(FrappeTestCase):
+	def test_code_and_name_words_are_indexed_by_prefix(self):
+		tokens = item_search.tokenize("ITEM-001 Choco Bar")
+
+		self.assertTrue(
+			{"it", "item", "item-0", "item-001", "00", "001", "ch", "choco", "ba", "bar"} <= tokens
+		)
+		# Only prefixes: nothing starting inside a word
+		self.assertNotIn("hoco", tokens)
+		self.assertNotIn("01", tokens)
+
+	def test_long_words_are_cut(self):
+		tokens = item_search.tokenize("x" * 100)
+
+		self.assertEqual(max(len(token) for token in tokens), item_search.MAX_TOKEN_LENGTH)
+
+	def test_barcodes_are_indexed_whole(self):
+		self.assertEqual(item_search.tokenize_barcode(" 1234 "), {"12", "123", "1234"})
+
+
+class TestSearchCondition(FrappeTestCase):
+	def condition(self, term):
+		with patch.object(item_search, "is_index_ready", return_value=1):
+			return item_search.get_search_condition(term, "Test Co")
+
+	def test_every_word_or_the_barcode_must_match(self):
+		condition, params = self.condition("Choco b BAR")
+
+		self.assertEqual(condition.count("i.name IN"), 3)
+		self.assertEqual(params, ["choco", 0, "Test Co", "bar", 0, "Test Co", "choco b bar", 1, "Test Co"])
+
+	def test_one_character_words_scan(self):
+		self.assertIsNone(self.condition("a b"))
+
+	def test_index_not_ready_scans(self):
+		with patch.object(item_search, "is_index_ready", return_value=0):
+			self.assertIsNone(item_search.get_search_condition("choco"))
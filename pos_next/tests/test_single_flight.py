@@ -0,0 +1,43 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from pos_next.api import items
+from pos_next.services.single_flight import single_flight
+
+
+@single_flight()
+def _echo(value, **kwargs):
+	return {"value": value, "kwargs": kwargs}
+
+
+@single_flight()
+def _echo_strict(value):
+	return {"value": value}
+
+
+class TestSingleFlight(FrappeTestCase):
+	def test_request_arguments_reach_kwargs(self):
+		result = frappe.call(_echo, value=frappe.generate_hash(), format="columnar")
+
+		self.assertEqual(result["kwargs"], {"format": "columnar"})
+
+	def test_unknown_request_arguments_are_dropped(self):
+		value = frappe.generate_hash()
+
+		self.assertEqual(frappe.call(_echo_strict, value=value, _="1700000000"), {"value": value})
+
+	def test_get_items_bulk_accepts_legacy_format(self):
+		with patch.object(items, "versioned_response", side_effect=lambda *args: args) as response:
+			frappe.call(
+				items.get_items_bulk,
+				pos_profile=f"_Test Profile {frappe.generate_hash()}",
+				since_version="0",
+				format="columnar",
+			)
+
+		self.assertEqual(response.call_args.args[-1], "columnar")
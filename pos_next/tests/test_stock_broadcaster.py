@@ -0,0 +1,62 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from pos_next.services import stock_broadcaster
+
+
+class TestStockBroadcaster(FrappeTestCase):
+	def setUp(self):
+		self.cache = frappe.cache()
+		self.cache.delete(self.cache.make_key(stock_broadcaster.PENDING_KEY))
+		self.cache.delete(self.cache.make_key(stock_broadcaster.SCHEDULED_KEY))
+
+		enqueue = patch("frappe.enqueue")
+		self.enqueue = enqueue.start()
+		self.addCleanup(enqueue.stop)
+		sleep = patch.object(stock_broadcaster.time, "sleep")
+		sleep.start()
+		self.addCleanup(sleep.stop)
+
+	def job_ids(self):
+		return [call.kwargs["job_id"] for call in self.enqueue.call_args_list]
+
+	def test_one_flush_per_window(self):
+		stock_broadcaster.queue_stock_changes([("Stores - T", "ITEM-1")])
+		stock_broadcaster.queue_stock_changes([("Stores - T", "ITEM-2")])
+
+		self.assertEqual(self.enqueue.call_count, 1)
+
+	def test_changes_during_flush_get_the_next_flush(self):
+		stock_broadcaster.queue_stock_changes([("Stores - T", "ITEM-1")])
+		scheduled_at = self.enqueue.call_args.kwargs["scheduled_at"]
+
+		published = []
+
+		def publish(pairs):
+			published.append(pairs)
+			# A sale committed while this flush is publishing
+			stock_broadcaster.queue_stock_changes([("Stores - T", "ITEM-2")])
+
+		with patch.object(stock_broadcaster, "_publish", side_effect=publish):
+			stock_broadcaster.flush(scheduled_at)
+
+		self.assertEqual(published, [{("Stores - T", "ITEM-1")}])
+		self.assertEqual(self.enqueue.call_count, 2)
+		self.assertEqual(len(set(self.job_ids())), 2)
+		self.assertEqual(stock_broadcaster._take_pending(), {("Stores - T", "ITEM-2")})
+
+	def test_flush_reschedules_pairs_left_behind(self):
+		def publish(pairs):
+			# A change recorded while another window's flag was still set
+			self.cache.sadd(stock_broadcaster.PENDING_KEY, "Stores - T\nITEM-2")
+
+		self.cache.sadd(stock_broadcaster.PENDING_KEY, "Stores - T\nITEM-1")
+		with patch.object(stock_broadcaster, "_publish", side_effect=publish):
+			stock_broadcaster.flush()
+
+		self.assertEqual(self.enqueue.call_count, 1)
@@ -0,0 +1,87 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from pos_next.api import invoices
+
+WAREHOUSE = "Stores - T"
+
+
+class TestCollectStockErrors(FrappeTestCase):
+	def collect(self, items, available, held=None, cart_id=None):
+		with (
+			patch.object(invoices, "_get_available_stock_map", return_value=available) as stock_map,
+			patch.object(invoices, "get_held_qty", return_value=held or {}),
+		):
+			errors = invoices._collect_stock_errors(items, cart_id=cart_id)
+		return errors, stock_map
+
+	def test_rows_of_one_bin_are_checked_together(self):
+		items = [
+			{"item_code": "ITEM-1", "warehouse": WAREHOUSE, "qty": 3},
+			{"item_code": "ITEM-1", "warehouse": WAREHOUSE, "qty": 1, "conversion_factor": 2},
+		]
+		errors, stock_map = self.collect(items, {("item", "ITEM-1", WAREHOUSE): 4})
+
+		self.assertEqual(
+			errors,
+			[{"item_code": "ITEM-1", "warehouse": WAREHOUSE, "requested_qty": 5, "available_qty": 4}],
+		)
+		# One row per Bin is enough to read its stock
+		self.assertEqual(len(list(stock_map.call_args.args[0])), 1)
+
+	def test_batches_are_checked_apart_from_the_bin(self):
+		items = [
+			{"item_code": "ITEM-1", "warehouse": WAREHOUSE, "qty": 2, "batch_no": "B-1"},
+			{"item_code": "ITEM-1", "warehouse": WAREHOUSE, "qty": 2, "batch_no": "B-2"},
+			{"item_code": "ITEM-1", "warehouse": WAREHOUSE, "qty": 1, "batch_no": "B-2"},
+		]
+		errors, _stock_map = self.collect(
+			items, {("batch", "B-1", WAREHOUSE): 2, ("batch", "B-2", WAREHOUSE): 2}
+		)
+
+		self.assertEqual(
+			[(e["item_code"], e["requested_qty"], e["available_qty"]) for e in errors], [("ITEM-1", 3, 2)]
+		)
+
+	def test_returns_and_rows_without_warehouse(self):
+		items = [
+			{"item_code": "ITEM-1", "warehouse": WAREHOUSE, "qty": -5},
+			{"item_code": "ITEM-2", "qty": 1},
+		]
+		errors, _stock_map = self.collect(items, {})
+
+		self.assertEqual(
+			errors, [{"item_code": "ITEM-2", "warehouse": None, "requested_qty": 1, "available_qty": 0}]
+		)
+
+	def test_other_carts_holds_are_unavailable(self):
+		items = [{"item_code": "ITEM-1", "warehouse": WAREHOUSE, "qty": 3}]
+		available = {("item", "ITEM-1", WAREHOUSE): 4}
+
+		errors, _stock_map = self.collect(items, dict(available), held={"ITEM-1": 2}, cart_id="cart-a")
+		self.assertEqual(errors[0]["available_qty"], 2)
+
+		errors, _stock_map = self.collect(items, dict(available), held={"ITEM-1": 2})
+		self.assertEqual(errors, [])
+
+
+class TestHoldCartItems(FrappeTestCase):
+	def test_non_stock_rows_are_not_held(self):
+		items = [
+			{"item_code": "ITEM-1", "warehouse": WAREHOUSE, "qty": 2, "is_stock_item": 1},
+			{"item_code": "SERVICE-1", "warehouse": WAREHOUSE, "qty": 1, "is_stock_item": 0},
+			{"item_code": "BUNDLE-1", "warehouse": WAREHOUSE, "qty": 1, "is_stock_item": False},
+			{"item_code": "ITEM-2", "warehouse": WAREHOUSE, "qty": 1},
+		]
+		with (
+			patch.object(invoices.frappe.db, "exists", return_value=True),
+			patch.object(invoices.frappe, "has_permission", return_value=True),
+			patch.object(invoices, "hold_cart", return_value=[]) as hold_cart,
+		):
+			invoices._hold_cart_items("cart-a", items)
+
+		self.assertEqual(hold_cart.call_args.args[1], {(WAREHOUSE, "ITEM-1"): 2, (WAREHOUSE, "ITEM-2"): 1})
@@ -0,0 +1,46 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from pos_next.services import thumbnails
+
+IMAGE = "/files/test-pos-thumbnail.png"
+
+
+class TestAttachThumbnails(FrappeTestCase):
+	def setUp(self):
+		frappe.cache().delete_keys(thumbnails.NAMES_KEY.format(""))
+
+	def test_file_checks_are_cached(self):
+		with (
+			patch.object(thumbnails, "_source_path", return_value="/tmp/source.png") as source_path,
+			patch.object(thumbnails, "_thumbnail_name", return_value="abc.webp"),
+			patch.object(thumbnails.os.path, "exists", return_value=True),
+			patch.object(thumbnails, "enqueue_thumbnails"),
+		):
+			for _ in range(2):
+				items = thumbnails.attach_thumbnails([{"image": IMAGE}, {"image": IMAGE}, {"image": None}])
+
+		self.assertEqual(source_path.call_count, 1)
+		self.assertEqual(
+			[item["thumbnail"] for item in items],
+			[f"/files/{thumbnails.THUMBNAIL_DIR}/abc.webp"] * 2 + [None],
+		)
+
+	def test_missing_thumbnails_are_queued_and_not_cached(self):
+		with (
+			patch.object(thumbnails, "_source_path", return_value="/tmp/source.png") as source_path,
+			patch.object(thumbnails, "_thumbnail_name", return_value="abc.webp"),
+			patch.object(thumbnails.os.path, "exists", return_value=False),
+			patch.object(thumbnails, "enqueue_thumbnails") as enqueue,
+		):
+			thumbnails.attach_thumbnails([{"image": IMAGE}])
+			items = thumbnails.attach_thumbnails([{"image": IMAGE}])
+
+		self.assertIsNone(items[0]["thumbnail"])
+		self.assertEqual(source_path.call_count, 2)
+		enqueue.assert_called_with([IMAGE])